@@ -1,124 +1,77 @@
 import streamlit as st
 import os
+import asyncio
+import requests
 from dotenv import load_dotenv
-import json
-from enum import Enum
-
-# --- LangChain Imports ---
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.pydantic_v1 import BaseModel, Field
-from langchain_core.prompts import ChatPromptTemplate
-from typing import List, Optional
-
-# --- Import ALL Our Specialist Data Tools ---
-from samarth_app.data_tools import (
-    get_state_comparison_data,
-    find_district_production_extrema,
-    get_trend_analysis_data,
-    get_policy_analysis_data,
-)
+
+from samarth_app.schemas import QueryResult, QueryType
+from samarth_app.telemetry import enable_export, profiled
 
 # --- Load Environment ---
 load_dotenv()
-if not os.getenv("GOOGLE_API_KEY"):
+API_URL = os.getenv("SAMARTH_API_URL")  # e.g. http://localhost:8000: send questions to server.py instead of answering here
+API_TIMEOUT_SECONDS = 180
+if not API_URL and not os.getenv("GOOGLE_API_KEY"):
     st.error("Google API key not found in the .env file. Please add it to run the application.")
     st.stop()
-
-# --- ARCHITECTURE SETUP: THE ROUTER (with Few-Shot Examples for Accuracy) ---
-class QueryType(str, Enum):
-    STATE_COMPARISON = "state_comparison"
-    DISTRICT_EXTREMA = "district_extrema"
-    TREND_ANALYSIS = "trend_analysis"
-    POLICY_ADVICE = "policy_advice"
-    UNKNOWN = "unknown"
-
-class RouteQuery(BaseModel):
-    query_type: QueryType = Field(..., description="The type of query the user is asking.")
-
-router_llm = ChatGoogleGenerativeAI(model="gemini-pro-latest", temperature=0)
-# This prompt includes examples to make the router much more accurate.
-router_prompt = ChatPromptTemplate.from_messages([
-    ("system", f"""You are an expert at routing a user's query. Classify it into one of the following categories.
-
-Here are some examples to guide you:
-
-- User Query: "Compare the rainfall and top 3 cereals in Gujarat and Rajasthan for 2011."
-- Classification: `{QueryType.STATE_COMPARISON.value}`
-
-- User Query: "Identify the district in Uttar Pradesh with the highest production of Wheat and compare with the lowest in Punjab for the same year."
-- Classification: `{QueryType.DISTRICT_EXTREMA.value}`
-
-- User Query: "Analyze the production trend of Pulses in Maharashtra over the last decade."
-- Classification: `{QueryType.TREND_ANALYSIS.value}`
-
-- User Query: "What are the data-backed arguments to promote Bajra over Sugarcane?"
-- Classification: `{QueryType.POLICY_ADVICE.value}`
-"""),
-    ("human", "{query}")
-])
-router_chain = router_prompt | router_llm.with_structured_output(RouteQuery)
-
-
-# --- SPECIALIST DEFINITIONS (Parsers and Formatters) ---
-
-# Specialist 1: State Comparison
-class StateInput(BaseModel):
-    states: List[str]; year: int; top_n: int; crop_type: Optional[str] = None
-parser_state_chain = (ChatPromptTemplate.from_messages([("system", "Extract the list of states, the single year, the number of top crops, and an optional crop type from the user's query."), ("human", "{query}")]) | router_llm.with_structured_output(StateInput))
-def format_state_comparison(json_string):
-    data = json.loads(json_string)
-    report = "### State-Level Comparison\n"
-    for state, details in data.items():
-        if state == "data_sources_used": continue
-        report += f"\n**Results for {state.title()}:**\n- **Normal Annual Rainfall:** {details.get('normal_annual_rainfall_mm', 'N/A')} mm\n- **Top Crops by Production:**\n"
-        if details.get('top_crops'):
-            for crop in details['top_crops']: report += f"  - {crop.get('Crop', '').title()}: {int(crop.get('Production', 0)):,} tonnes\n"
-        else: report += "  - No crop data found for the specified criteria.\n"
-    if "data_sources_used" in data:
-        report += "\n---\n*Sources:*\n"; [report := report + f"- *{s}*\n" for s in data["data_sources_used"]]
-    return report
-
-# Specialist 2: District Extrema
-class DistrictInput(BaseModel):
-    state_1: str; crop_1: str; state_2: str; crop_2: str; year: int
-parser_district_chain = (ChatPromptTemplate.from_messages([("system", "Extract the two states, the specific crop, and the single year."), ("human", "{query}")]) | router_llm.with_structured_output(DistrictInput))
-def format_district_comparison(h_json, l_json):
-    h, l = json.loads(h_json), json.loads(l_json)
-    if "error" in h or "error" in l: return f"Error:\n- Highest: {h.get('error', 'N/A')}\n- Lowest: {l.get('error', 'N/A')}"
-    report = f"""### District-Level Production Comparison\nFor **{h['year']}**:\n- The district with the **highest** production of **{h['crop']}** in **{h['state']}** was **{h['district']}** ({h['production_tonnes']:,} tonnes).\n- The district with the **lowest** (non-zero) production of **{l['crop']}** in **{l['state']}** was **{l['district']}** ({l['production_tonnes']:,} tonnes)."""
-    if "data_sources_used" in h:
-        report += "\n\n---\n*Source:*\n"; [report := report + f"- *{s}*\n" for s in h["data_sources_used"]]
-    return report
-
-# Specialist 3: Trend Analysis
-class TrendInput(BaseModel):
-    region: str; crop_type: str; start_year: int; end_year: int
-parser_trend_chain = (ChatPromptTemplate.from_messages([("system", "Extract the region, crop type, start and end year for the trend analysis."), ("human", "{query}")]) | router_llm.with_structured_output(TrendInput))
-def format_trend_analysis(json_string):
-    data = json.loads(json_string)
-    if "error" in data: return f"Error: {data['error']}"
-    report = f"### Production Trend for {data['crop_type']} in {data['region']} ({data['period']})\n"
-    for item in data.get('production_trend_tonnes', []): report += f"- **{item['Crop_Year']}**: {int(item['Production']):,} tonnes\n"
-    report += f"\n**Correlation Context:**\n- The normal annual rainfall for this region is **{data.get('normal_annual_rainfall_mm_for_correlation', 'N/A')} mm**. *({data.get('note', '')})*"
-    if "data_sources_used" in data:
-        report += "\n\n---\n*Sources:*\n"; [report := report + f"- *{s}*\n" for s in data["data_sources_used"]]
-    return report
-
-# Specialist 4: Policy Advice
-class PolicyInput(BaseModel):
-    region: str; crop_a: str; crop_b: str; years: int
-parser_policy_chain = (ChatPromptTemplate.from_messages([("system", "Extract the region, the two crops for comparison, and the number of years from the policy query."), ("human", "{query}")]) | router_llm.with_structured_output(PolicyInput))
-def synthesize_arguments(evidence_json: str, crop_a: str, crop_b: str, region: str) -> str:
-    """Takes raw data and uses an LLM to generate reasoned arguments."""
-    s_llm = ChatGoogleGenerativeAI(model="gemini-pro-latest", temperature=0.3)
-    s_prompt = ChatPromptTemplate.from_messages([
-        ("system", "You are an expert policy advisor. Your task is to use the provided data to generate three distinct, compelling, data-backed arguments to support a policy decision. Frame the arguments clearly and concisely."),
-        ("human", """**Policy Proposal:** Promote the cultivation of **{crop_a}** over **{crop_b}** in **{region}**.
-        \n**Supporting Data:**\n```json\n{evidence}\n```\nPlease generate the three most compelling, data-backed arguments based *only* on the data provided.""")
-    ])
-    s_chain = s_prompt | s_llm
-    response = s_chain.invoke({"crop_a": crop_a, "crop_b": crop_b, "region": region, "evidence": evidence_json})
-    return response.content
+if not API_URL:
+    # --- Import the Query Pipeline (router, parsers, data tools and formatters) ---
+    # Only when answering here: importing data_tools loads the datasets, which a thin client never needs.
+    from samarth_app.pipeline import POLICY_REPORT_HEADING, STAGE_LABELS, arun_query, run_query
+    from samarth_app.fast_path import stats as fast_path_stats
+    from samarth_app.llm_cache import get_llm_cache
+    from samarth_app.data_tools import tool_cache
+enable_export()  # traces.jsonl and metrics.prom under data/telemetry/
+
+
+def format_timings(result) -> str:
+    """One-line per-stage latency breakdown shown under each answer."""
+    stages = " · ".join(f"{name}: {seconds:.2f}s" for name, seconds in result.timings.items())
+    if 'fast_path' in result.timings:
+        stages += " · answered by the fast path (no LLM routing)"
+    if result.speculation_hit is not None:
+        stages += f" · speculative parse {'hit' if result.speculation_hit else 'miss'}"
+    return f"⏱️ {stages}"
+
+
+def ask_service(question: str, combined: bool, fast_path: bool) -> QueryResult:
+    """Answers a question through the HTTP service at SAMARTH_API_URL (see server.py)."""
+    response = requests.post(f"{API_URL.rstrip('/')}/query", timeout=API_TIMEOUT_SECONDS,
+                             json={"question": question, "combined": combined, "fast_path": fast_path, "debug": True})
+    if response.status_code != 200:
+        try:
+            detail = response.json().get('detail')
+        except ValueError:  # not JSON, e.g. a proxy's HTML error page
+            detail = response.text[:500]
+        raise RuntimeError(f"the service answered {response.status_code}: {detail}")
+    body = response.json()
+    return QueryResult(QueryType(body['query_type']), body['report'], timings=body['timings'],
+                       speculation_hit=body.get('speculation_hit'), spans=body.get('spans', []))
+
+
+def span_table(spans: list[dict]) -> list[dict]:
+    """Spans in start order, names indented by depth, for the debug panel."""
+    parents = {s['span_id']: s['parent_id'] for s in spans}
+    def depth(span_id):
+        return 0 if parents.get(span_id) is None else 1 + depth(parents[span_id])
+    rows = []
+    for s in sorted(spans, key=lambda s: s['start_time']):
+        rows.append({
+            'span': "\u2003" * depth(s['span_id']) + s['name'], 'ms': round(s['duration_s'] * 1000, 2),
+            'rows scanned': s.get('rows_scanned'), 'result bytes': s.get('result_bytes'),
+            'cache hit': s.get('cache_hit'), 'error': s.get('error'),
+        })
+    return rows
+
+
+def show_debug_panel(result, profile: dict, error: Exception = None):
+    with st.expander("🔍 Debug: stage breakdown and profile", expanded=error is not None):
+        if error is not None:
+            st.exception(error)
+        if result is not None:
+            st.dataframe(span_table(result.spans), hide_index=True, width='stretch')
+        if profile['text']:
+            st.code(profile['text'], language=None)
 
 
 # --- Streamlit UI ---
@@ -130,6 +83,26 @@ st.info("""
 **Ask a complex question about India's agriculture and climate.** The system will automatically identify the question type and perform the correct analysis.
 """)
 
+if API_URL:
+    st.sidebar.caption(f"Answering through the service at {API_URL}")
+concurrent_mode = st.sidebar.toggle(
+    "Concurrent pipeline",
+    help="Start the router and the most likely parsers together and run independent data lookups in parallel.",
+)
+debug_mode = st.sidebar.toggle(
+    "Debug panel",
+    help="Show each answer's span breakdown (stages, data-tool calls, rows scanned, result sizes) and a cProfile summary.",
+)
+combined_mode = st.sidebar.toggle(
+    "Single-call routing",
+    help="Classify the question and extract its arguments in one LLM call instead of two (see evaluate_pipeline.py).",
+)
+fast_path_mode = st.sidebar.toggle(
+    "Gazetteer fast path",
+    value=True,
+    help="Answer template-shaped questions (known states, crops and years) with a local parser, skipping the LLM router.",
+)
+
 user_question = st.text_area(
     "Ask your question:",
     placeholder="e.g., Identify the district in Maharashtra with the highest production of Jowar in 2014 and compare that with the district with the lowest production of Jowar in Karnataka for the same year.",
@@ -138,47 +111,47 @@ user_question = st.text_area(
 
 if st.button("Get Answer"):
     if user_question:
-        try:
-            with st.spinner("1. Routing query to the correct analytical tool..."):
-                route = router_chain.invoke({"query": user_question})
-                # REMOVED: Commented out the info message for a cleaner UI
-                # st.info(f"Query identified as: **{route.query_type.name}**. Executing analysis...")
-
-            with st.spinner("2. Parsing query and fetching data..."):
-                if route.query_type == QueryType.STATE_COMPARISON:
-                    args = parser_state_chain.invoke({"query": user_question})
-                    json_data = get_state_comparison_data(states=args.states, year=args.year, top_n=args.top_n, crop_type=args.crop_type)
-                    report = format_state_comparison(json_data)
-                    st.markdown(report)
-
-                elif route.query_type == QueryType.DISTRICT_EXTREMA:
-                    args = parser_district_chain.invoke({"query": user_question})
-                    h_json = find_district_production_extrema(state=args.state_1, year=args.year, crop=args.crop_1, find='highest')
-                    l_json = find_district_production_extrema(state=args.state_2, year=args.year, crop=args.crop_1, find='lowest') # Use crop_1 for both
-                    report = format_district_comparison(h_json, l_json)
-                    st.markdown(report)
-                
-                elif route.query_type == QueryType.TREND_ANALYSIS:
-                    args = parser_trend_chain.invoke({"query": user_question})
-                    json_data = get_trend_analysis_data(region=args.region, crop_type=args.crop_type, start_year=args.start_year, end_year=args.end_year)
-                    report = format_trend_analysis(json_data)
-                    st.markdown(report)
-
-                elif route.query_type == QueryType.POLICY_ADVICE:
-                    args = parser_policy_chain.invoke({"query": user_question})
-                    evidence_json = get_policy_analysis_data(region=args.region, crop_a=args.crop_a, crop_b=args.crop_b, years=args.years)
-                    with st.spinner("3. Synthesizing data-backed arguments..."):
-                        final_report = synthesize_arguments(evidence_json, crop_a=args.crop_a, crop_b=args.crop_b, region=args.region)
-                        st.markdown("### Policy Recommendation Arguments")
-                        st.markdown(final_report)
-
-                else: # Handles UNKNOWN
-                    st.warning("I am currently equipped to handle four types of queries: State Comparisons, District Comparisons, Trend Analysis, and Policy Advice. Please try rephrasing your question to fit one of these formats.")
-        except Exception as e:
-            st.error(f"A critical error occurred: {e}")
-            # Optionally add more detailed logging for debugging
-            # import traceback
-            # st.error(traceback.format_exc())
+        result = None
+        answer = st.empty()  # policy arguments stream into it as Gemini writes them
+        streamed = []
+        def show_token(chunk: str):
+            streamed.append(chunk)
+            answer.markdown(POLICY_REPORT_HEADING + "".join(streamed) + "▌")
+        with profiled(debug_mode) as profile:
+            try:
+                if API_URL:
+                    with st.spinner("Asking the Samarth service..."):
+                        result = ask_service(user_question, combined=combined_mode, fast_path=fast_path_mode)
+                elif concurrent_mode:
+                    with st.spinner("Routing, parsing and fetching data concurrently..."):
+                        result = asyncio.run(arun_query(user_question, combined=combined_mode, fast_path=fast_path_mode, on_token=show_token))
+                else:
+                    result = run_query(user_question, stage=lambda name: st.spinner(STAGE_LABELS[name]), combined=combined_mode,
+                                       fast_path=fast_path_mode, on_token=show_token)
+                error = None
+            except Exception as e:
+                error = e
+        if error is not None:
+            answer.error(f"A critical error occurred: {error}")
+        elif result.query_type == QueryType.UNKNOWN:
+            answer.warning(result.report)
+        else:
+            answer.markdown(result.report)
+        if result is not None:
+            st.caption(format_timings(result))
+        if debug_mode:
+            show_debug_panel(result, profile, error)
     else:
         st.warning("Please enter a question.")
 
+if not API_URL:  # the service keeps these counters itself (GET /stats)
+    fp = fast_path_stats.snapshot()
+    if fp['queries']:
+        saved = f", ~{fp['estimated_seconds_saved']:.1f}s of LLM latency saved" if fp['estimated_seconds_saved'] is not None else ""
+        st.sidebar.caption(f"Fast path: {fp['hits']}/{fp['queries']} questions ({fp['hit_rate']:.0%}){saved}")
+    cache = get_llm_cache().stats()
+    if cache['hits'] + cache['misses']:
+        st.sidebar.caption(f"LLM cache: {cache['hits']} hits / {cache['misses']} misses ({cache['hit_rate']:.0%}), {cache['entries']} stored answers")
+    tools = tool_cache.stats()
+    if tools['hits'] + tools['misses']:
+        st.sidebar.caption(f"Data-tool cache: {tools['hits']} hits / {tools['misses']} misses ({tools['hit_rate']:.0%})")
@@ -0,0 +1,186 @@
+"""Headless batch runner: answers every question in a JSONL file and streams the reports to JSONL.
+
+python batch_runner.py questions.jsonl -o reports.jsonl
+python batch_runner.py questions.jsonl -o reports.jsonl --resume        # skip questions already answered
+python batch_runner.py questions.jsonl -o reports.jsonl --llm-concurrency 8 --rps 2 --workers 4
+
+Each input line is a JSON object with a question (and optionally an id; the line
+number is used otherwise) or a bare JSON string. Routing, parsing and synthesis go
+to Gemini, with at most --llm-concurrency questions in their LLM stages at once
+and the model calls rate-limited to --rps. The data tools and report formatting run
+in a process pool. Each result is appended to the output as soon as it completes.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from dotenv import load_dotenv
+
+from samarth_app.pipeline import (
+    POLICY_REPORT_HEADING, SYNTHESIS_TEMPERATURE, UNKNOWN_QUERY_MESSAGE, PipelineChains, QueryType,
+    afetch_report, aroute_and_parse, asynthesize_arguments, fetch_report, warm_worker,
+)
+from samarth_app.telemetry import TELEMETRY_DIR, enable_export, span, trace
+
+LLM_CONCURRENCY = 4
+REQUESTS_PER_SECOND = 1.0
+WORKERS = min(4, os.cpu_count() or 1)
+
+
+def load_questions(path: str, id_key: str = 'id', question_key: str = 'question') -> list[tuple[str, str]]:
+    """(id, question) pairs from a JSONL file."""
+    questions = []
+    with open(path) as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                questions.append((str(line_no), item))
+            else:
+                questions.append((str(item.get(id_key, line_no)), item[question_key]))
+    return questions
+
+
+def completed_ids(path: str) -> set[str]:
+    """Ids already answered without error in an existing output file (for --resume)."""
+    if not os.path.exists(path):
+        return set()
+    done = set()
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by an interrupted run
+            if 'error' not in record:
+                done.add(record['id'])
+    return done
+
+
+class BatchRunner:
+    """Runs questions concurrently: LLM stages behind a semaphore, data tools in a process pool (or threads)."""
+
+    def __init__(self, chains: PipelineChains, llm_concurrency: int = LLM_CONCURRENCY,
+                 pool: ProcessPoolExecutor = None, combined: bool = False, fast_path: bool = True):
+        self.chains, self.pool = chains, pool
+        self.combined, self.fast_path = combined, fast_path
+        self.llm_slots = asyncio.Semaphore(llm_concurrency)
+
+    async def _report(self, query_type: QueryType, args) -> str:
+        if self.pool is None:
+            return await afetch_report(query_type, args)
+        return await asyncio.get_running_loop().run_in_executor(self.pool, fetch_report, query_type, args)
+
+    async def answer(self, qid: str, question: str) -> dict:
+        start, record = time.perf_counter(), {'id': qid, 'question': question}
+        with trace('query', mode='batch', id=qid, question=question) as root:
+            await self._answer(question, record)
+            root.set(query_type=record.get('query_type'))
+        record['latency_s'] = time.perf_counter() - start
+        return record
+
+    async def _answer(self, question: str, record: dict):
+        try:
+            query_type, args, timings, _ = await aroute_and_parse(
+                question, self.chains, self.combined, fast_path=self.fast_path, llm_slot=lambda: self.llm_slots)
+            record['query_type'] = query_type.value
+            if query_type == QueryType.UNKNOWN:
+                record['report'] = UNKNOWN_QUERY_MESSAGE
+            else:
+                record['args'] = args.model_dump()
+                t = time.perf_counter()
+                with span('data', query_type=query_type.value):  # tool spans stay in the worker process
+                    report = await self._report(query_type, args)
+                timings['data'] = time.perf_counter() - t
+                if query_type == QueryType.POLICY_ADVICE:
+                    t = time.perf_counter()
+                    async with self.llm_slots:
+                        with span('synthesis'):
+                            report = POLICY_REPORT_HEADING + await asynthesize_arguments(
+                                report, crop_a=args.crop_a, crop_b=args.crop_b, region=args.region, chains=self.chains)
+                    timings['synthesis'] = time.perf_counter() - t
+                record['report'] = report
+            record['timings'] = timings
+        except Exception as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+
+    async def run(self, questions: list[tuple[str, str]], out) -> list[dict]:
+        """Answers all questions, writing each record to `out` as soon as it is ready."""
+        tasks = [asyncio.create_task(self.answer(qid, question)) for qid, question in questions]
+        records = []
+        for finished in asyncio.as_completed(tasks):
+            record = await finished
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+            records.append(record)
+        return records
+
+
+def summarize(records: list[dict], seconds: float) -> str:
+    if not records:
+        return "Nothing to do: every question already has a result."
+    latencies = np.array([r['latency_s'] for r in records])
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    errors = sum('error' in r for r in records)
+    types = Counter(r.get('query_type', 'error') for r in records)
+    return (f"{len(records)} questions in {seconds:.1f}s ({len(records) / seconds:.2f} q/s), {errors} errors\n"
+            f"latency p50 {p50:.2f}s · p95 {p95:.2f}s · p99 {p99:.2f}s · max {latencies.max():.2f}s\n"
+            f"query types: " + ", ".join(f"{qt} {n}" for qt, n in types.most_common()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('input', help="JSONL file of questions.")
+    parser.add_argument('-o', '--output', default='reports.jsonl')
+    parser.add_argument('--resume', action='store_true', help="Append to the output, skipping ids already answered without error.")
+    parser.add_argument('--llm-concurrency', type=int, default=LLM_CONCURRENCY, help="Questions in their LLM stages at once.")
+    parser.add_argument('--rps', type=float, default=REQUESTS_PER_SECOND, help="Maximum Gemini requests per second.")
+    parser.add_argument('--workers', type=int, default=WORKERS, help="Processes for the data tools (0: threads in this process).")
+    parser.add_argument('--combined', action='store_true', help="Single-call routing + extraction.")
+    parser.add_argument('--no-fast-path', action='store_true', help="Send every question through the LLM router.")
+    parser.add_argument('--telemetry', nargs='?', const=TELEMETRY_DIR, metavar='DIR',
+                        help=f"Export span traces (JSONL) and Prometheus metrics to DIR (default {TELEMETRY_DIR}).")
+    parser.add_argument('--id-key', default='id')
+    parser.add_argument('--question-key', default='question')
+    cli_args = parser.parse_args()
+
+    load_dotenv()
+    from langchain_core.rate_limiters import InMemoryRateLimiter
+    from samarth_app.llm_cache import get_llm_cache
+    from samarth_app.llm_clients import get_chat_model
+
+    if cli_args.telemetry:
+        enable_export(cli_args.telemetry)
+    questions = load_questions(cli_args.input, cli_args.id_key, cli_args.question_key)
+    done = completed_ids(cli_args.output) if cli_args.resume else set()
+    pending = [(qid, q) for qid, q in questions if qid not in done]
+    print(f"{len(questions)} questions, {len(done & {qid for qid, _ in questions})} already answered, {len(pending)} to run")
+
+    limiter = InMemoryRateLimiter(requests_per_second=cli_args.rps, max_bucket_size=max(1, cli_args.rps))
+    chains = PipelineChains(
+        get_chat_model(0, limiter), cache=get_llm_cache(), synthesis_llm=get_chat_model(SYNTHESIS_TEMPERATURE, limiter),
+    )
+    # Spawned (not forked) workers: the parent already holds gRPC threads.
+    pool = ProcessPoolExecutor(cli_args.workers, mp_context=multiprocessing.get_context('spawn'), initializer=warm_worker) if cli_args.workers else None
+
+    runner = BatchRunner(chains, cli_args.llm_concurrency, pool, cli_args.combined, not cli_args.no_fast_path)
+    start = time.perf_counter()
+    try:
+        with open(cli_args.output, 'a' if cli_args.resume else 'w') as out:
+            records = asyncio.run(runner.run(pending, out))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    print(summarize(records, time.perf_counter() - start))
+    print(f"✅ Reports written to {cli_args.output}")
+
+
+if __name__ == "__main__":
+    main()
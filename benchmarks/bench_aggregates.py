@@ -0,0 +1,58 @@
+"""Compares per-request aggregation over CropStore slices against the precomputed cube.
+
+Run from the project root:  python -m benchmarks.bench_aggregates [n_rows]
+"""
+import sys
+import timeit
+
+import pandas as pd
+
+from benchmarks.synthetic import make_crop_df
+from samarth_app.aggregates import AggregateCube
+from samarth_app.constants import CROP_TYPE_MAP
+from samarth_app.crop_store import CropStore
+
+REPEAT = 50
+
+
+def slice_and_aggregate(store):
+    """The aggregations the tools recomputed on every request."""
+    pulses = CROP_TYPE_MAP['PULSES']
+    def extrema():
+        df = store.rows('MAHARASHTRA', 2010, crops=['JOWAR'])
+        return df.loc[df['Production'].idxmax()], df[df['Production'] > 0]['Production'].idxmin()
+    return {
+        'get_state_comparison_data': lambda: store.rows('MAHARASHTRA', 2010).groupby('Crop', observed=True)['Production'].sum().nlargest(5),
+        'find_district_production_extrema': extrema,
+        'get_trend_analysis_data': lambda: store.rows('MAHARASHTRA', 2005, 2014, crops=pulses).groupby('Crop_Year')['Production'].sum(),
+    }
+
+
+def cube_lookups(cube):
+    return {
+        'get_state_comparison_data': lambda: cube.crop_production('MAHARASHTRA', 2010).nlargest(5),
+        'find_district_production_extrema': lambda: (cube.district_extrema('MAHARASHTRA', 2010, 'JOWAR', 'highest'), cube.district_extrema('MAHARASHTRA', 2010, 'JOWAR', 'lowest')),
+        'get_trend_analysis_data': lambda: cube.production_trend('MAHARASHTRA', 'PULSES', 2005, 2014),
+    }
+
+
+def best_ms(fn):
+    return min(timeit.repeat(fn, number=1, repeat=REPEAT)) * 1000
+
+
+def main(n_rows: int = 250_000):
+    rain_df = pd.read_csv('data/processed/rainfall_cleaned.csv')
+    crop_df = make_crop_df(n_rows, rain_df)
+    build_s = min(timeit.repeat(lambda: AggregateCube.from_frames(crop_df, rain_df), number=1, repeat=3))
+    store, cube = CropStore(crop_df), AggregateCube.from_frames(crop_df, rain_df)
+    print(f"Rows: {n_rows:,} | cube build: {build_s:.2f} s (offline, in data_cleaner.py)\n")
+    print(f"{'tool':<36}{'slice+groupby (ms)':>20}{'cube (ms)':>12}{'speedup':>10}")
+    before, after = slice_and_aggregate(store), cube_lookups(cube)
+    for name in before:
+        old_ms, new_ms = best_ms(before[name]), best_ms(after[name])
+        print(f"{name:<36}{old_ms:>20.3f}{new_ms:>12.3f}{old_ms / new_ms:>9.1f}x")
+    print("\nget_policy_analysis_data needs per-row yield means, so it still aggregates CropStore slices.")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 250_000)
@@ -0,0 +1,95 @@
+"""Checks that the pandas and DuckDB backends give identical tool JSON, then compares their latency.
+
+Run from the project root:  python -m benchmarks.bench_backends [n_rows] [--repeat N]
+
+The same synthetic rows are loaded into memory (pandas backend) and written as
+Parquet partitioned by state and year (DuckDB backend). Every data tool then
+runs, bypassing its memo, over a grid of states (one of them unknown), years,
+crop types, extrema, periods and crop pairs. The outputs must match byte for
+byte; the script exits non-zero if any differs. Both backends are then timed
+on the suite's tool cases and on two dashboard-sized batch calls.
+"""
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+
+from benchmarks.suite import REPEAT, measure, tool_cases
+from benchmarks.synthetic import CROPS, STATES, YEARS, load_rain_df, make_crop_df
+from samarth_app import data_tools
+from samarth_app.backends import DuckDBBackend, write_parquet_dataset
+
+CROP_TYPES = [None, 'Pulses', 'CEREALS', 'oilseeds', 'Rice']
+
+
+def equivalence_cases() -> dict:
+    """name -> zero-argument call of one tool, for every combination in the grid."""
+    states = ['Kerala', 'MAHARASHTRA', 'Punjab', 'Atlantis']
+    cases = {}
+    for state_pair, year, crop_type, top_n in itertools.product(itertools.combinations(states, 2), YEARS[::3] + [1990], CROP_TYPES, [1, 5]):
+        cases[f'state_comparison{state_pair, year, crop_type, top_n}'] = (
+            lambda a=state_pair, y=year, c=crop_type, n=top_n: data_tools.get_state_comparison_data.uncached(list(a), y, n, c))
+    for state, year, crop, find in itertools.product(states, YEARS[::4], CROPS[::3] + ['Dragonfruit'], ['highest', 'lowest']):
+        cases[f'district_extrema{state, year, crop, find}'] = (
+            lambda s=state, y=year, c=crop, f=find: data_tools.find_district_production_extrema.uncached(s, y, c, f))
+    for state, crop_type, (start, end) in itertools.product(states, CROP_TYPES, [(1997, 2003), (2005, 2015), (2020, 2025)]):
+        cases[f'trend_analysis{state, crop_type, start, end}'] = (
+            lambda s=state, c=crop_type, a=start, b=end: data_tools.get_trend_analysis_data.uncached(s, c, a, b))
+    for state, (crop_a, crop_b), years in itertools.product(states, [('Rice', 'Wheat'), ('BAJRA', 'Sugarcane'), ('Rice', 'Quinoa')], [1, 5, 30]):
+        cases[f'policy_analysis{state, crop_a, crop_b, years}'] = (
+            lambda s=state, a=crop_a, b=crop_b, n=years: data_tools.get_policy_analysis_data.uncached(s, a, b, n))
+    return cases
+
+
+def batch_cases() -> dict:
+    return {
+        'batch:get_state_comparison_batch': lambda i: data_tools.get_state_comparison_batch(STATES, YEARS, ['PULSES', 'CEREALS', None]),
+        'batch:get_trend_analysis_batch': lambda i: data_tools.get_trend_analysis_batch(STATES, ['PULSES', 'CEREALS', None], [(1997, 2006), (2006, 2015)]),
+    }
+
+
+def run_all(cases: dict) -> dict:
+    return {name: call() for name, call in cases.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('n_rows', nargs='?', type=int, default=250_000)
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    cli_args = parser.parse_args()
+
+    rain_df = load_rain_df()
+    crop_df = make_crop_df(cli_args.n_rows, rain_df)
+    with tempfile.TemporaryDirectory() as parquet_dir:
+        write_parquet_dataset(crop_df, rain_df, parquet_dir)
+        data_tools.set_datasets(crop_df, rain_df)
+        backends = {'pandas': data_tools.backend, 'duckdb': DuckDBBackend(parquet_dir)}
+        on_disk = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(parquet_dir) for f in files)
+        print(f"Rows: {cli_args.n_rows:,} | Parquet on disk: {on_disk / 2**20:.1f} MB in {len(backends['duckdb']._partitions)} partitions")
+
+        cases, outputs = equivalence_cases(), {}
+        for name, backend in backends.items():
+            data_tools.set_backend(backend)
+            outputs[name] = run_all(cases)
+        differing = [case for case in cases if outputs['pandas'][case] != outputs['duckdb'][case]]
+        print(f"Equivalence: {len(cases) - len(differing)}/{len(cases)} tool outputs identical")
+        for case in differing[:5]:
+            print(f"  ✗ {case}\n    pandas: {outputs['pandas'][case][:200]}\n    duckdb: {outputs['duckdb'][case][:200]}")
+
+        results = {}
+        for name, backend in backends.items():
+            data_tools.set_backend(backend)
+            results[name] = {case: measure(fn, cli_args.repeat) for case, fn in {**tool_cases(), **batch_cases()}.items()}
+        print(f"\n{'case':<40}{'pandas p50':>12}{'duckdb p50':>12}{'duckdb p95':>12}{'ratio':>9}  (ms)")
+        for case, pandas_result in results['pandas'].items():
+            duckdb_result = results['duckdb'][case]
+            print(f"{case:<40}{pandas_result['p50_ms']:>12.3f}{duckdb_result['p50_ms']:>12.3f}{duckdb_result['p95_ms']:>12.3f}"
+                  f"{duckdb_result['p50_ms'] / pandas_result['p50_ms']:>8.1f}x")
+    if differing:
+        print(f"\n❌ {len(differing)} tool output(s) differ between the backends")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Shows the batch tools' cost growing sub-linearly with the number of regions.
+
+Run from the project root:  python -m benchmarks.bench_batch [n_rows]
+
+For k regions, each batch tool is called once for all k of them over every year
+(state comparison) or three crop groups and two periods (trend analysis). The
+same work done as k single-region calls is shown for comparison. The growth
+column is time(k) / time(1); linear scaling would match k.
+"""
+import sys
+import timeit
+
+from benchmarks.synthetic import STATES, YEARS, load_rain_df, make_crop_df
+from samarth_app import data_tools
+
+REPEAT = 20
+REGION_COUNTS = [1, 2, 4, 8, 16, len(STATES)]
+GROUPS = ['PULSES', 'CEREALS', None]
+PERIODS = [(1997, 2006), (2006, 2015)]
+
+
+def best_ms(fn):
+    return min(timeit.repeat(fn, number=1, repeat=REPEAT)) * 1000
+
+
+def cases(regions: list[str]) -> dict:
+    return {
+        'get_state_comparison_batch': (
+            lambda: data_tools.get_state_comparison_batch(regions, YEARS, GROUPS),
+            lambda: [data_tools.get_state_comparison_batch([r], YEARS, GROUPS) for r in regions],
+        ),
+        'get_trend_analysis_batch': (
+            lambda: data_tools.get_trend_analysis_batch(regions, GROUPS, PERIODS),
+            lambda: [data_tools.get_trend_analysis_batch([r], GROUPS, PERIODS) for r in regions],
+        ),
+    }
+
+
+def main(n_rows: int = 250_000):
+    rain_df = load_rain_df()
+    data_tools.set_datasets(make_crop_df(n_rows, rain_df), rain_df)
+    print(f"Rows: {n_rows:,} | {len(YEARS)} years, crop groups {GROUPS}, periods {PERIODS}")
+    for name in cases(STATES[:1]):
+        print(f"\n{name}")
+        print(f"{'regions':>8}{'batch (ms)':>12}{'growth':>9}{'per region':>12}{'k single calls (ms)':>21}{'speedup':>9}")
+        base = None
+        for k in REGION_COUNTS:
+            batch, singles = cases(STATES[:k])[name]
+            batch_ms, singles_ms = best_ms(batch), best_ms(singles)
+            base = base or batch_ms
+            print(f"{k:>8}{batch_ms:>12.2f}{batch_ms / base:>8.1f}x{batch_ms / k:>12.3f}{singles_ms:>21.2f}{singles_ms / batch_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 250_000)
@@ -0,0 +1,204 @@
+"""Load test: throughput, latency percentiles and a stage breakdown of the HTTP service with a simulated LLM.
+
+Run from the project root:
+  python -m benchmarks.bench_capacity                                          # 1, 8, 32 and 64 users, 10s each
+  python -m benchmarks.bench_capacity --users 16 64 256 --duration 30 --llm-latency lognormal:0.8,2.5
+  python -m benchmarks.bench_capacity --failure-rate 0.02 --llm-concurrency 16 --workers 0
+
+The ASGI app from server.py runs in this process. FakeChatModel stands in for
+Gemini, with latencies drawn from the --llm-latency (routing and parsing) and
+--synthesis-latency (first token) distributions; see latency_distribution in
+samarth_app/fake_llm.py for the syntax. The data-tool workers answer from
+synthetic rows. Closed-loop virtual users each send a question, wait for the
+answer, then send the next, for --duration seconds per level; a 503 makes a user
+wait for its Retry-After. The questions are --questions templated questions over
+the four query types, and the fake model answers them with their known
+arguments. Requests go through httpx's ASGI transport, so the HTTP layer is
+measured but no socket is. The users share the service's event loop, so their
+own overhead counts against the node.
+
+Each level reports answered requests per second, latency percentiles, errors
+and coalesced requests, then where the computed requests spent their time.
+llm_queue and data_queue are waits for an LLM slot and for a worker; other is
+the rest of the client-side latency (HTTP, admission, the event loop). The stage
+whose time grew most between the lightest and heaviest level is what saturates
+first.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+
+import httpx
+import numpy as np
+
+from benchmarks.synthetic import CROPS, STATES, YEARS, load_rain_df, make_crop_df
+from evaluate_pipeline import FixtureResponder
+from samarth_app.fake_llm import FakeChatModel, latency_distribution
+from samarth_app.pipeline import PipelineChains
+from samarth_app.service import LLM_CONCURRENCY, MAX_IN_FLIGHT, REQUEST_TIMEOUT_SECONDS, WORKERS
+from server import create_app
+
+USERS = [1, 8, 32, 64]
+DURATION_SECONDS = 10.0
+QUESTIONS = 200
+STAGES = ['fast_path', 'routing', 'parsing', 'llm_queue', 'data_queue', 'data', 'synthesis']
+GROUPS = ['Pulses', 'Cereals', 'Oilseeds']
+SYNTHESIS_TEXT = " ".join(["A data-backed argument about water use, yield stability and rainfall risk."] * 8)
+
+
+def _state_comparison(rng: random.Random) -> tuple:
+    states, year, top_n, group = [s.title() for s in rng.sample(STATES, 2)], rng.choice(YEARS), rng.randint(1, 5), rng.choice(GROUPS)
+    question = f"Compare the rainfall and the top {top_n} {group.lower()} in {states[0]} and {states[1]} for {year}."
+    return question, {'states': states, 'year': year, 'top_n': top_n, 'crop_type': group}
+
+
+def _district_extrema(rng: random.Random) -> tuple:
+    (state_1, state_2), crop, year = [s.title() for s in rng.sample(STATES, 2)], rng.choice(CROPS).title(), rng.choice(YEARS)
+    question = (f"Identify the district in {state_1} with the highest production of {crop} in {year} and compare "
+                f"that with the district with the lowest production of {crop} in {state_2} for the same year.")
+    return question, {'state_1': state_1, 'crop_1': crop, 'state_2': state_2, 'crop_2': crop, 'year': year}
+
+
+def _trend_analysis(rng: random.Random) -> tuple:
+    region, group, (start, end) = rng.choice(STATES).title(), rng.choice(GROUPS), sorted(rng.sample(YEARS, 2))
+    question = f"Analyze the production trend of {group} in {region} between {start} and {end}."
+    return question, {'region': region, 'crop_type': group, 'start_year': start, 'end_year': end}
+
+
+def _policy_advice(rng: random.Random) -> tuple:
+    region, (crop_a, crop_b), years = rng.choice(STATES).title(), [c.title() for c in rng.sample(CROPS, 2)], rng.randint(3, 10)
+    question = f"What are the data-backed arguments to promote {crop_a} over {crop_b} in {region} based on the last {years} years?"
+    return question, {'region': region, 'crop_a': crop_a, 'crop_b': crop_b, 'years': years}
+
+
+TEMPLATES = {
+    'state_comparison': _state_comparison, 'district_extrema': _district_extrema,
+    'trend_analysis': _trend_analysis, 'policy_advice': _policy_advice,
+}
+
+
+def make_cases(n: int, seed: int = 0) -> list[dict]:
+    """n distinct questions, taking the query types in turn, as evaluation-fixture cases (question, query_type, args)."""
+    rng, cases, seen = random.Random(seed), [], set()
+    while len(cases) < n:
+        query_type = list(TEMPLATES)[len(cases) % len(TEMPLATES)]
+        question, args = TEMPLATES[query_type](rng)
+        if question not in seen:
+            seen.add(question)
+            cases.append({'question': question, 'query_type': query_type, 'args': args})
+    return cases
+
+
+def load_synthetic(n_rows: int):
+    """Answers the data tools from synthetic rows (the same in every process: they are seeded)."""
+    from samarth_app import data_tools
+
+    rain_df = load_rain_df()
+    data_tools.set_datasets(make_crop_df(n_rows, rain_df), rain_df)
+
+
+async def run_level(client: httpx.AsyncClient, cases: list[dict], users: int, duration: float, options: dict, seed: int) -> tuple[list[dict], float]:
+    """Every request's (status, latency_s, body) from `users` closed-loop users, and the seconds the level took."""
+    results, start = [], time.perf_counter()
+    deadline = start + duration
+
+    async def user(number: int):
+        rng = random.Random(seed * 100_003 + number)
+        while time.perf_counter() < deadline:
+            t = time.perf_counter()
+            try:
+                response = await client.post('/query', json={'question': rng.choice(cases)['question'], **options})
+                status, body = response.status_code, response.json()
+            except httpx.HTTPError as e:
+                status, body, response = type(e).__name__, {}, None
+            results.append({'status': status, 'latency_s': time.perf_counter() - t, 'body': body})
+            if status == 503:
+                await asyncio.sleep(float(response.headers.get('Retry-After', 1)))
+
+    await asyncio.gather(*(user(number) for number in range(users)))
+    return results, time.perf_counter() - start
+
+
+def summarize(results: list[dict], seconds: float) -> dict:
+    answered = [r for r in results if r['status'] == 200]
+    latencies = np.array([r['latency_s'] for r in answered]) * 1000 if answered else np.zeros(1)
+    computed = [r for r in answered if not r['body']['coalesced']]
+    mean = lambda values: float(np.mean(values)) * 1000 if values else 0.0
+    stages = {stage: mean([r['body']['timings'].get(stage, 0.0) for r in computed]) for stage in STAGES}
+    stages['other'] = max(0.0, mean([r['latency_s'] for r in computed]) - sum(stages.values()))
+    return {
+        'requests': len(results), 'answered_per_s': len(answered) / seconds,
+        'p50_ms': np.percentile(latencies, 50), 'p95_ms': np.percentile(latencies, 95), 'p99_ms': np.percentile(latencies, 99),
+        'errors': Counter(r['status'] for r in results if r['status'] != 200),
+        'coalesced': len(answered) - len(computed), 'stages_ms': stages,
+    }
+
+
+async def run(cli_args, cases: list[dict]) -> dict:
+    llm = FakeChatModel(
+        responder=FixtureResponder(cases, gold_fallback=True), text=SYNTHESIS_TEXT, token_delay=cli_args.token_delay,
+        structured_latency=latency_distribution(cli_args.llm_latency, cli_args.seed),
+        latency=latency_distribution(cli_args.synthesis_latency, cli_args.seed + 1),
+        failure_rate=cli_args.failure_rate, rng=random.Random(cli_args.seed),
+    )
+    app = create_app(PipelineChains(llm), cli_args.workers, cli_args.llm_concurrency, cli_args.max_in_flight, cli_args.timeout,
+                     initializer=load_synthetic, initargs=(cli_args.rows,))
+    options = {'combined': cli_args.combined, 'fast_path': cli_args.fast_path}
+    summaries = {}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://samarth', timeout=None) as client:
+            for users in cli_args.users:
+                results, seconds = await run_level(client, cases, users, cli_args.duration, options, cli_args.seed + users)
+                summaries[users] = summarize(results, seconds)
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, nargs='+', default=USERS, help="Concurrent users, one level each.")
+    parser.add_argument('--duration', type=float, default=DURATION_SECONDS, help="Seconds per level.")
+    parser.add_argument('--questions', type=int, default=QUESTIONS, help="Distinct questions the users pick from.")
+    parser.add_argument('--rows', type=int, default=250_000, help="Synthetic crop rows.")
+    parser.add_argument('--llm-latency', default='lognormal:0.6,1.5', help="Routing/parsing call latency distribution.")
+    parser.add_argument('--synthesis-latency', default='lognormal:1.0,2.5', help="Synthesis time-to-first-token distribution.")
+    parser.add_argument('--token-delay', type=float, default=0.005, help="Seconds per streamed synthesis word.")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Fraction of LLM calls that fail.")
+    parser.add_argument('--workers', type=int, default=WORKERS, help="Data-tool processes (0: threads).")
+    parser.add_argument('--llm-concurrency', type=int, default=LLM_CONCURRENCY)
+    parser.add_argument('--max-in-flight', type=int, default=MAX_IN_FLIGHT)
+    parser.add_argument('--timeout', type=float, default=REQUEST_TIMEOUT_SECONDS)
+    parser.add_argument('--combined', action='store_true', help="Single-call routing + extraction.")
+    parser.add_argument('--fast-path', action='store_true', help="Let the gazetteer answer template-shaped questions without the LLM.")
+    parser.add_argument('--seed', type=int, default=0)
+    cli_args = parser.parse_args()
+
+    load_synthetic(cli_args.rows)  # the fast path and thread-mode tools run in this process
+    cases = make_cases(cli_args.questions, cli_args.seed)
+    print(f"Rows: {cli_args.rows:,} | {cli_args.questions} questions | workers {cli_args.workers} | "
+          f"LLM slots {cli_args.llm_concurrency} | max in flight {cli_args.max_in_flight}")
+    print(f"LLM latency {cli_args.llm_latency} | synthesis {cli_args.synthesis_latency} + {cli_args.token_delay}s/word | "
+          f"failure rate {cli_args.failure_rate:g} | {'combined' if cli_args.combined else 'two-stage'} routing, "
+          f"fast path {'on' if cli_args.fast_path else 'off'}\n")
+    summaries = asyncio.run(run(cli_args, cases))
+
+    print(f"{'users':>6}{'requests':>10}{'answered/s':>12}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'coalesced':>11}  errors")
+    for users, s in summaries.items():
+        errors = ', '.join(f"{status} x{count}" for status, count in s['errors'].most_common()) or '-'
+        print(f"{users:>6}{s['requests']:>10}{s['answered_per_s']:>12.2f}{s['p50_ms']:>9.0f}{s['p95_ms']:>9.0f}{s['p99_ms']:>9.0f}"
+              f"{s['coalesced']:>11}  {errors}")
+
+    print(f"\n{'mean ms per computed request':<30}" + ''.join(f"{f'{users} users':>12}" for users in summaries))
+    for stage in [*STAGES, 'other']:
+        if not any(s['stages_ms'][stage] for s in summaries.values()):
+            continue  # e.g. the fast path when it is off
+        print(f"{stage:<30}" + ''.join(f"{s['stages_ms'][stage]:>12.1f}" for s in summaries.values()))
+    lightest, heaviest = summaries[min(summaries)]['stages_ms'], summaries[max(summaries)]['stages_ms']
+    if len(summaries) > 1:
+        stage = max(heaviest, key=lambda name: heaviest[name] - lightest[name])
+        print(f"\nGrew most from {min(summaries)} to {max(summaries)} users: {stage} (+{heaviest[stage] - lightest[stage]:.0f} ms per request)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Compares the legacy boolean-mask filters against CropStore slices, per tool.
+
+Run from the project root:  python -m benchmarks.bench_crop_store [n_rows]
+"""
+import sys
+import timeit
+
+import pandas as pd
+
+from benchmarks.synthetic import make_crop_df
+from samarth_app.constants import CROP_TYPE_MAP
+from samarth_app.crop_store import CropStore
+
+REPEAT = 50
+
+
+def legacy_filters(crop_df):
+    """The per-call O(rows) masks the tools used before the store existed."""
+    pulses = CROP_TYPE_MAP['PULSES']
+    return {
+        'get_state_comparison_data': lambda: crop_df[(crop_df['State_Name'] == 'MAHARASHTRA') & (crop_df['Crop_Year'] == 2010)],
+        'find_district_production_extrema': lambda: crop_df[(crop_df['State_Name'] == 'MAHARASHTRA') & (crop_df['Crop_Year'] == 2010) & (crop_df['Crop'] == 'JOWAR')],
+        'get_trend_analysis_data': lambda: crop_df[(crop_df['State_Name'] == 'MAHARASHTRA') & (crop_df['Crop_Year'].between(2005, 2014)) & (crop_df['Crop'].isin(pulses))],
+        'get_policy_analysis_data': lambda: crop_df[(crop_df['State_Name'] == 'MAHARASHTRA') & (crop_df['Crop_Year'].between(2011, 2015)) & (crop_df['Crop'].isin(['BAJRA', 'SUGARCANE']))],
+    }
+
+
+def store_filters(store):
+    pulses = CROP_TYPE_MAP['PULSES']
+    return {
+        'get_state_comparison_data': lambda: store.rows('MAHARASHTRA', 2010),
+        'find_district_production_extrema': lambda: store.rows('MAHARASHTRA', 2010, crops=['JOWAR']),
+        'get_trend_analysis_data': lambda: store.rows('MAHARASHTRA', 2005, 2014, crops=pulses),
+        'get_policy_analysis_data': lambda: store.rows('MAHARASHTRA', 2011, 2015, crops=['BAJRA', 'SUGARCANE']),
+    }
+
+
+def best_ms(fn):
+    return min(timeit.repeat(fn, number=1, repeat=REPEAT)) * 1000
+
+
+def main(n_rows: int = 250_000):
+    rain_df = pd.read_csv('data/processed/rainfall_cleaned.csv')
+    crop_df = make_crop_df(n_rows, rain_df)
+    build_ms = best_ms(lambda: CropStore(crop_df))
+    store = CropStore(crop_df)
+    print(f"Rows: {n_rows:,} | CropStore build: {build_ms:.1f} ms (once, at load)\n")
+    print(f"{'tool':<36}{'mask scan (ms)':>16}{'store slice (ms)':>18}{'speedup':>10}")
+    legacy, indexed = legacy_filters(crop_df), store_filters(store)
+    for name in legacy:
+        assert len(legacy[name]()) == len(indexed[name]()), f"{name}: row counts differ"
+        old_ms, new_ms = best_ms(legacy[name]), best_ms(indexed[name])
+        print(f"{name:<36}{old_ms:>16.3f}{new_ms:>18.3f}{old_ms / new_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 250_000)
@@ -0,0 +1,59 @@
+"""Build time of the entity index and lookup latency for each way a name can resolve.
+
+Run from the project root:  python -m benchmarks.bench_entity_index [n_rows]
+
+Cold fuzzy lookups clear the index's memo before every call; warm ones repeat a
+name already seen, which is what the tools see for a recurring question.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import load_rain_df, make_crop_df
+from samarth_app.entity_index import CROP, DISTRICT, GROUP, RAIN_STATE, STATE, EntityIndex
+
+REPEAT = 2000
+CASES = {
+    'exact': [(STATE, 'Kerala'), (CROP, 'Rice'), (GROUP, 'pulses')],
+    'alias': [(STATE, 'Odisha'), (RAIN_STATE, 'Himachal Pradesh'), (CROP, 'Moong'), (CROP, 'paddy')],
+    'shared words': [(STATE, 'Bengal'), (CROP, 'green gram'), (STATE, 'Andaman and Nicobar')],
+    'fuzzy': [(STATE, 'Maharastra'), (STATE, 'Tamilnadu'), (DISTRICT, 'Ahmednagr'), (GROUP, 'cerels')],
+    'no match': [(STATE, 'Atlantis'), (CROP, 'Quinoa')],
+}
+
+
+def percentiles_us(call, repeat: int, before=None) -> np.ndarray:
+    seconds = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        call()
+        seconds.append(time.perf_counter() - start)
+    return np.percentile(np.array(seconds) * 1e6, [50, 99])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('n_rows', nargs='?', type=int, default=250_000)
+    n_rows = parser.parse_args().n_rows
+
+    rain_df = load_rain_df()
+    crop_df = make_crop_df(n_rows, rain_df)
+    start = time.perf_counter()
+    index = EntityIndex(crop_df, rain_df)
+    print(f"Rows: {n_rows:,} | index built in {(time.perf_counter() - start) * 1000:.1f} ms")
+    print(f"{'match':<14}{'p50 us':>9}{'p99 us':>9}{'cold p50 us':>13}{'cold p99 us':>13}  examples")
+    for match, names in CASES.items():
+        calls = [lambda kind=kind, name=name: index.resolve(kind, name) for kind, name in names]
+        call_all = lambda: [call() for call in calls]
+        clear = lambda: [memo.clear() for memo in (i._memo for i in index._indexes.values())]
+        warm = percentiles_us(call_all, REPEAT) / len(calls)
+        cold = percentiles_us(call_all, REPEAT // 10, before=clear) / len(calls)
+        examples = ', '.join(f"{name} -> {index.resolve(kind, name)}" for kind, name in names[:3])
+        print(f"{match:<14}{warm[0]:>9.1f}{warm[1]:>9.1f}{cold[0]:>13.1f}{cold[1]:>13.1f}  {examples}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Compares cold-start load time of the processed CSV against its Arrow artifact.
+
+Run from the project root:  python -m benchmarks.bench_load [n_rows]
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+import pandas as pd
+
+from benchmarks.synthetic import make_crop_df
+from samarth_app.dataset_io import load_dataset, write_artifact
+
+REPEAT = 5
+
+
+def main(n_rows: int = 250_000):
+    rain_df = pd.read_csv('data/processed/rainfall_cleaned.csv')
+    crop_df = make_crop_df(n_rows, rain_df)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'crop_production_cleaned.csv')
+        crop_df.to_csv(csv_path, index=False)
+        write_artifact(crop_df, csv_path)
+        # The artifact round-trips exactly; the CSV parser can differ from it in the last float bit.
+        assert load_dataset(csv_path).equals(crop_df), "Arrow load does not round-trip"
+        pd.testing.assert_frame_equal(load_dataset(csv_path), pd.read_csv(csv_path))
+
+        csv_s = min(timeit.repeat(lambda: pd.read_csv(csv_path), number=1, repeat=REPEAT))
+        arrow_s = min(timeit.repeat(lambda: load_dataset(csv_path), number=1, repeat=REPEAT))
+        print(f"Rows: {n_rows:,}")
+        print(f"CSV parse        : {csv_s * 1000:8.1f} ms")
+        print(f"Arrow memory-map : {arrow_s * 1000:8.1f} ms  ({csv_s / arrow_s:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 250_000)
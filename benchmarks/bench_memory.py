@@ -0,0 +1,114 @@
+"""Per-worker and host-wide memory of the loaded datasets: full private frames, compact private frames, compact shared frames.
+
+Run from the project root:  python -m benchmarks.bench_memory [n_rows] [--workers N]
+
+Synthetic data is written as a processed directory, the same way data_cleaner.py
+writes it: the CSVs, their Arrow artifacts and the aggregate tables. N spawned
+workers then load it the way the data tools do: the crop dataset, a CropStore
+and the aggregate cube (the rainfall normals, a few hundred rows, are left out). They all stay alive while each one reads its own
+/proc/self/smaps_rollup. RSS counts shared pages in every process that maps
+them. PSS splits them between those processes, so the PSS total is what the
+host really holds. USS is the memory private to one worker. Linux only.
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from benchmarks.synthetic import load_rain_df, make_crop_df
+from samarth_app.aggregates import build_aggregates, save_aggregates
+from samarth_app.constants import CROP_COLUMNS
+from samarth_app.dataset_io import write_artifact
+from samarth_app.shared_data import SHARED_DIR
+
+MODES = {
+    'full': "full frames, private (before)",
+    'compact': "compact frames, private",
+    'shared': "compact frames, shared segment",
+}
+
+
+def memory_mb() -> dict:
+    """RSS, PSS and USS of this process in MB."""
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {'rss': fields['Rss'], 'pss': fields['Pss'], 'uss': fields['Private_Clean'] + fields['Private_Dirty']}
+
+
+def write_processed(directory: str, n_rows: int) -> tuple[str, str, str]:
+    rain_df = load_rain_df()
+    crop_df = make_crop_df(n_rows, rain_df)
+    crop_file, rain_file = os.path.join(directory, 'crop_production_cleaned.csv'), os.path.join(directory, 'rainfall_cleaned.csv')
+    aggregates_dir = os.path.join(directory, 'aggregates')
+    for df, path in ((crop_df, crop_file), (rain_df, rain_file)):
+        df.to_csv(path, index=False)
+        write_artifact(df, path)
+    save_aggregates(build_aggregates(crop_df, rain_df), aggregates_dir)
+    return crop_file, rain_file, aggregates_dir
+
+
+def worker(mode: str, paths: tuple, segment_dir: str, barrier, results):
+    from samarth_app.aggregates import AggregateCube, load_aggregates
+    from samarth_app.crop_store import CropStore
+    from samarth_app.dataset_io import load_dataset
+    from samarth_app.shared_data import compact_frame, load_shared
+
+    crop_file, rain_file, aggregates_dir = paths
+    before = memory_mb()
+    if mode == 'shared':
+        crop_df = load_shared('crop', crop_file, CROP_COLUMNS, segment_dir)
+    elif mode == 'compact':
+        crop_df = compact_frame(load_dataset(crop_file), CROP_COLUMNS)
+    else:
+        crop_df = load_dataset(crop_file)
+    store = CropStore(crop_df)
+    cube = AggregateCube(load_aggregates(aggregates_dir, [crop_file, rain_file]))
+    barrier.wait()  # every worker holds its data before any of them measures
+    after = memory_mb()
+    results.put({key: (before[key], after[key]) for key in after})
+    barrier.wait()  # and keeps holding it until all have measured
+    del store, cube
+
+
+def run(mode: str, paths: tuple, segment_dir: str, n_workers: int) -> list[dict]:
+    ctx = multiprocessing.get_context('spawn')  # the data tools' pools spawn their workers too
+    barrier, results = ctx.Barrier(n_workers), ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(mode, paths, segment_dir, barrier, results)) for _ in range(n_workers)]
+    for p in procs:
+        p.start()
+    samples = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('n_rows', nargs='?', type=int, default=250_000)
+    parser.add_argument('--workers', type=int, default=4)
+    cli_args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp()
+    segment_dir = tempfile.mkdtemp(prefix='samarth-bench-', dir=os.path.dirname(SHARED_DIR))
+    try:
+        paths = write_processed(data_dir, cli_args.n_rows)
+        print(f"Rows: {cli_args.n_rows:,} | {cli_args.workers} workers | MB after loading (growth since start)")
+        print(f"{'mode':<34}{'RSS/worker':>16}{'USS/worker':>16}{'RSS total':>11}{'PSS total':>11}")
+        for mode, label in MODES.items():
+            samples = run(mode, paths, segment_dir, cli_args.workers)
+            mean = lambda key, i: sum(s[key][i] for s in samples) / len(samples)
+            total = lambda key: sum(s[key][1] for s in samples)
+            per_worker = lambda key: f"{mean(key, 1):.0f} (+{mean(key, 1) - mean(key, 0):.0f})"
+            print(f"{label:<34}{per_worker('rss'):>16}{per_worker('uss'):>16}{total('rss'):>11.0f}{total('pss'):>11.0f}")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+        shutil.rmtree(segment_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Time to first token and total latency of policy synthesis, before and after the shared streaming client.
+
+Run from the project root:
+  python -m benchmarks.bench_streaming                 # stubbed model with simulated generation time
+  python -m benchmarks.bench_streaming --live          # Gemini (needs GOOGLE_API_KEY; makes real calls)
+
+"before" builds a new ChatGoogleGenerativeAI for every call and waits for the whole
+answer, as synthesize_arguments used to. Nothing reaches the page until the answer
+is complete, so its first token arrives at the total latency. "after" streams
+through the shared model from samarth_app.llm_clients. Neither variant uses the
+LLM cache. The stub makes no network connections, so offline runs show only the
+streaming gain. Live runs also include the cost of opening a new channel.
+"""
+import argparse
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.output_parsers import StrOutputParser
+
+from benchmarks.synthetic import load_rain_df, make_crop_df
+from samarth_app import data_tools
+from samarth_app.fake_llm import FakeChatModel
+from samarth_app.pipeline import SYNTHESIS_TEMPERATURE, PipelineChains, synthesis_prompt, synthesize_arguments
+
+REPEAT = 5
+STUB_TEXT = " ".join(["A data-backed argument about water use, yield stability and rainfall risk."] * 12)
+
+
+def evidence() -> str:
+    if data_tools.crop_df.empty:
+        data_tools.set_datasets(make_crop_df(50_000, load_rain_df()), load_rain_df())
+    return data_tools.get_policy_analysis_data(region='Maharashtra', crop_a='Bajra', crop_b='Sugarcane', years=5)
+
+
+def measure(call, repeat: int) -> dict:
+    """p50/p95 of (time to first token, total) over `repeat` calls of call(on_token)."""
+    ttft, total = [], []
+    for _ in range(repeat):
+        start, first = time.perf_counter(), []
+        def on_token(chunk):
+            if not first:
+                first.append(time.perf_counter())
+        call(on_token)
+        end = time.perf_counter()
+        ttft.append((first[0] if first else end) - start)
+        total.append(end - start)
+    stats = lambda xs: np.percentile(np.array(xs) * 1000, [50, 95])
+    return {'ttft': stats(ttft), 'total': stats(total)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--live', action='store_true', help="Call Gemini instead of the stub.")
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--latency', type=float, default=0.8, help="Stub: seconds before the first token.")
+    parser.add_argument('--token-delay', type=float, default=0.02, help="Stub: seconds per streamed word.")
+    cli_args = parser.parse_args()
+
+    inputs = {'crop_a': 'BAJRA', 'crop_b': 'SUGARCANE', 'region': 'MAHARASHTRA', 'evidence': evidence()}
+    if cli_args.live:
+        load_dotenv()
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        from samarth_app.llm_clients import MODEL_NAME, get_chat_model
+        new_model = lambda: ChatGoogleGenerativeAI(model=MODEL_NAME, temperature=SYNTHESIS_TEMPERATURE)
+        shared = PipelineChains(get_chat_model(0), synthesis_llm=get_chat_model(SYNTHESIS_TEMPERATURE))
+    else:
+        stub = FakeChatModel(responder=lambda schema, messages: None, text=STUB_TEXT,
+                             latency=cli_args.latency, token_delay=cli_args.token_delay)
+        new_model = lambda: stub
+        shared = PipelineChains(stub)
+
+    def before(on_token):
+        on_token((synthesis_prompt | new_model() | StrOutputParser()).invoke(inputs))
+
+    def after(on_token):
+        synthesize_arguments(inputs['evidence'], inputs['crop_a'], inputs['crop_b'], inputs['region'], chains=shared, on_token=on_token)
+
+    print(f"Policy synthesis, {'Gemini' if cli_args.live else 'stubbed model'}, {cli_args.repeat} runs each")
+    print(f"{'variant':<36}{'ttft p50':>10}{'ttft p95':>10}{'total p50':>11}{'total p95':>11}  (ms)")
+    for name, call in (('before: new client, blocking', before), ('after: shared client, streaming', after)):
+        r = measure(call, cli_args.repeat)
+        print(f"{name:<36}{r['ttft'][0]:>10.0f}{r['ttft'][1]:>10.0f}{r['total'][0]:>11.0f}{r['total'][1]:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""Benchmark suite: data tools, report formatters and the stubbed end-to-end pipeline at several data scales.
+
+Run from the project root:
+  python -m benchmarks.suite                                   # 250k rows
+  python -m benchmarks.suite --scale 250k 2.5m 25m             # 25m needs ~10 GB of RAM
+  python -m benchmarks.suite --save benchmarks/baseline.json   # record a baseline
+  python -m benchmarks.suite --compare benchmarks/baseline.json
+
+Each case reports latency percentiles over --repeat runs and the peak traced
+memory of one extra run. The tools run uncached (memoization would time dict
+lookups), and the end-to-end cases answer the evaluation fixture through a
+stubbed LLM, so only local work is measured. --compare flags every case whose
+p50 or peak memory grew by more than --threshold, and exits non-zero if any did.
+No baseline is committed: timings depend on the machine, so record one with
+--save on the machine you compare on. --compare fails before running anything
+if the baseline file is missing, and fails if it holds none of the requested scales.
+"""
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import SCALES, load_rain_df, make_crop_df
+from evaluate_pipeline import FixtureResponder, load_cases
+from samarth_app import data_tools
+from samarth_app.aggregates import AggregateCube
+from samarth_app.crop_store import CropStore
+from samarth_app.fake_llm import FakeChatModel
+from samarth_app.pipeline import (
+    PipelineChains, format_district_comparison, format_state_comparison, format_trend_analysis, run_query,
+)
+
+REPEAT = 30
+BUILD_REPEAT = 3
+THRESHOLD = 1.25
+NOISE_FLOOR_MS = 0.05  # smaller differences are noise, never regressions
+NOISE_FLOOR_MB = 1.0
+STATES = ['MAHARASHTRA', 'UTTAR PRADESH', 'KARNATAKA', 'PUNJAB', 'TAMIL NADU']
+YEARS = range(2000, 2015)
+CROPS = ['RICE', 'WHEAT', 'JOWAR', 'MAIZE', 'BAJRA']
+GROUPS = [None, 'PULSES', 'CEREALS', 'OILSEEDS']
+
+
+def measure(fn, repeat: int) -> dict:
+    """Latency percentiles of fn(i) over `repeat` calls, plus peak traced memory of one more call."""
+    fn(0)  # warm-up
+    seconds = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        seconds.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn(repeat)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    ms = np.array(seconds) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {'runs': repeat, 'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99, 'mean_ms': ms.mean(), 'peak_mb': peak / 2**20}
+
+
+def tool_cases() -> dict:
+    """Each data tool (bypassing its memo) over a cycle of argument sets."""
+    args = list(itertools.product(STATES, YEARS))
+    pick = lambda i: args[i % len(args)]
+    return {
+        'tool:get_state_comparison_data': lambda i: data_tools.get_state_comparison_data.uncached(
+            states=[pick(i)[0], STATES[(i + 1) % len(STATES)]], year=pick(i)[1], top_n=5, crop_type=GROUPS[i % len(GROUPS)]),
+        'tool:find_district_production_extrema': lambda i: data_tools.find_district_production_extrema.uncached(
+            state=pick(i)[0], year=pick(i)[1], crop=CROPS[i % len(CROPS)], find=('highest', 'lowest')[i % 2]),
+        'tool:get_trend_analysis_data': lambda i: data_tools.get_trend_analysis_data.uncached(
+            region=pick(i)[0], crop_type=GROUPS[1 + i % 3], start_year=2000, end_year=2012),
+        'tool:get_policy_analysis_data': lambda i: data_tools.get_policy_analysis_data.uncached(
+            region=pick(i)[0], crop_a='RICE', crop_b=CROPS[1 + i % 4], years=5),
+    }
+
+
+def format_cases() -> dict:
+    """The report builders, on tool outputs computed once up front."""
+    states = [data_tools.get_state_comparison_data.uncached(states=[s, STATES[(i + 1) % len(STATES)]], year=2010, top_n=5) for i, s in enumerate(STATES)]
+    extrema = [(data_tools.find_district_production_extrema.uncached(state=s, year=2010, crop='RICE', find='highest'),
+                data_tools.find_district_production_extrema.uncached(state=s, year=2010, crop='RICE', find='lowest')) for s in STATES]
+    trends = [data_tools.get_trend_analysis_data.uncached(region=s, crop_type='PULSES', start_year=2000, end_year=2012) for s in STATES]
+    return {
+        'format:format_state_comparison': lambda i: format_state_comparison(states[i % len(states)]),
+        'format:format_district_comparison': lambda i: format_district_comparison(*extrema[i % len(extrema)]),
+        'format:format_trend_analysis': lambda i: format_trend_analysis(trends[i % len(trends)]),
+    }
+
+
+def e2e_cases() -> dict:
+    """run_query over the fixture questions of each type with a stubbed LLM and a cold tool memo."""
+    cases = load_cases()
+    chains = PipelineChains(FakeChatModel(responder=FixtureResponder(cases, gold_fallback=True)))
+    by_type = {}
+    for case in cases:
+        if case['query_type'] != 'unknown':
+            by_type.setdefault(case['query_type'], []).append(case['question'])
+
+    def run(questions):
+        def call(i):
+            data_tools.tool_cache.clear()
+            return run_query(questions[i % len(questions)], chains, fast_path=False)
+        return call
+    return {f'e2e:{query_type}': run(questions) for query_type, questions in sorted(by_type.items())}
+
+
+def run_scale(scale: str, repeat: int) -> dict:
+    rain_df = load_rain_df()
+    t = time.perf_counter()
+    crop_df = make_crop_df(SCALES[scale], rain_df)
+    print(f"\n== {scale}: {len(crop_df):,} crop rows, {len(rain_df):,} rainfall rows (generated in {time.perf_counter() - t:.1f}s)")
+    results = {
+        'build:CropStore': measure(lambda i: CropStore(crop_df), BUILD_REPEAT),
+        'build:AggregateCube': measure(lambda i: AggregateCube.from_frames(crop_df, rain_df), BUILD_REPEAT),
+    }
+    data_tools.set_datasets(crop_df, rain_df)
+    for name, fn in {**tool_cases(), **format_cases(), **e2e_cases()}.items():
+        results[name] = measure(fn, repeat)
+    results['process:max_rss_mb'] = {'peak_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+    print_results(results)
+    return results
+
+
+def print_results(results: dict):
+    print(f"{'case':<44}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak MB':>10}")
+    for name, r in results.items():
+        if 'p50_ms' in r:
+            print(f"{name:<44}{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}{r['p99_ms']:>10.3f}{r['peak_mb']:>10.2f}")
+        else:
+            print(f"{name:<44}{'':>30}{r['peak_mb']:>10.1f}")
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Cases present in both runs whose p50 or peak memory grew by more than `threshold`x."""
+    regressions = []
+    print(f"\n{'scale / case':<52}{'p50 ratio':>11}{'mem ratio':>11}")
+    for scale, cases in current.items():
+        for name, now in cases.items():
+            before = baseline.get(scale, {}).get(name)
+            if before is None:
+                continue
+            time_ratio = now['p50_ms'] / before['p50_ms'] if 'p50_ms' in now and before['p50_ms'] > 0 else None
+            mem_ratio = now['peak_mb'] / before['peak_mb'] if before['peak_mb'] > 0 else None
+            slower = time_ratio is not None and time_ratio > threshold and now['p50_ms'] - before['p50_ms'] > NOISE_FLOOR_MS
+            bigger = mem_ratio is not None and mem_ratio > threshold and now['peak_mb'] - before['peak_mb'] > NOISE_FLOOR_MB
+            flag = '  REGRESSION' if slower or bigger else ''
+            fmt = lambda ratio: f"{ratio:>10.2f}x" if ratio is not None else f"{'-':>11}"
+            print(f"{scale + ' / ' + name:<52}{fmt(time_ratio)}{fmt(mem_ratio)}{flag}")
+            if flag:
+                regressions.append(f"{scale} / {name}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', nargs='+', default=['250k'], choices=list(SCALES))
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--save', metavar='PATH', help="Write the results as a baseline JSON file.")
+    parser.add_argument('--compare', metavar='PATH', help="Compare against a saved baseline.")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="Slowdown/growth ratio that counts as a regression.")
+    cli_args = parser.parse_args()
+    if cli_args.compare and not os.path.exists(cli_args.compare):
+        parser.error(f"no baseline at {cli_args.compare}; record one on this machine first with --save {cli_args.compare}")
+
+    results = {scale: run_scale(scale, cli_args.repeat) for scale in cli_args.scale}
+    if cli_args.save:
+        meta = {
+            'created': datetime.datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+            'pandas': pd.__version__, 'numpy': np.__version__, 'machine': platform.machine(), 'repeat': cli_args.repeat,
+        }
+        with open(cli_args.save, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2)
+        print(f"\n✅ Baseline saved to {cli_args.save}")
+    if cli_args.compare:
+        with open(cli_args.compare) as f:
+            baseline = json.load(f)
+        if not set(results) & set(baseline['results']):
+            print(f"\n❌ {cli_args.compare} has no results for scale(s) {', '.join(results)}; it holds {', '.join(baseline['results'])}")
+            sys.exit(1)
+        regressions = compare(results, baseline['results'], cli_args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {cli_args.threshold}x: " + ", ".join(regressions))
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {cli_args.threshold}x against {cli_args.compare}")
+
+
+if __name__ == "__main__":
+    main()
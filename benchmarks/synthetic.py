@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from samarth_app.constants import CROP_TYPE_MAP
+
+# --- Synthetic Crop Data ---
+# Mirrors the schema written by data_cleaner.py so the tools can be exercised
+# at realistic sizes without the (large) raw crop production file.
+YEARS = list(range(1997, 2016))
+SEASONS = ['KHARIF', 'RABI', 'WHOLE YEAR', 'SUMMER', 'AUTUMN', 'WINTER']
+OTHER_CROPS = ['SUGARCANE', 'COTTON(LINT)', 'POTATO', 'ONION', 'BANANA', 'COCONUT', 'JUTE', 'TURMERIC']
+CROPS = sorted({crop for crops in CROP_TYPE_MAP.values() for crop in crops} | set(OTHER_CROPS))
+
+
+RAIN_FILE = 'data/processed/rainfall_cleaned.csv'
+MONTHS = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
+SEASON_MONTHS = {'Jan-Feb': MONTHS[0:2], 'Mar-May': MONTHS[2:5], 'Jun-Sep': MONTHS[5:9], 'Oct-Dec': MONTHS[9:12]}
+STATES = [
+    'ANDHRA PRADESH', 'ASSAM', 'BIHAR', 'CHHATTISGARH', 'GUJARAT', 'HARYANA', 'HIMACHAL PRADESH', 'JHARKHAND',
+    'KARNATAKA', 'KERALA', 'MADHYA PRADESH', 'MAHARASHTRA', 'ODISHA', 'PUNJAB', 'RAJASTHAN', 'TAMIL NADU',
+    'TELANGANA', 'UTTAR PRADESH', 'UTTARAKHAND', 'WEST BENGAL',
+]
+# Named scales for the benchmark suite: the real crop file is ~250k rows.
+SCALES = {'250k': 250_000, '2.5m': 2_500_000, '25m': 25_000_000}
+
+
+def make_rain_df(districts_per_state: int = 30, seed: int = 0) -> pd.DataFrame:
+    """Generates a cleaned rainfall-normals frame (one row per district) with the real schema."""
+    rng = np.random.default_rng(seed)
+    rows = [(state, f"{state.split()[0]} DISTRICT {i + 1}") for state in STATES for i in range(districts_per_state)]
+    df = pd.DataFrame(rows, columns=['State_Name', 'District_Name'])
+    monsoon = np.array([0.2, 0.2, 0.3, 0.5, 1.0, 4.0, 7.0, 6.0, 4.0, 1.5, 0.6, 0.3])
+    scale = rng.gamma(4.0, 25.0, (len(df), 1))
+    df[MONTHS] = (monsoon * scale * rng.uniform(0.7, 1.3, (len(df), len(MONTHS)))).round(1)
+    df['ANNUAL'] = df[MONTHS].sum(axis=1).round(1)
+    for season, months in SEASON_MONTHS.items():
+        df[season] = df[months].sum(axis=1).round(1)
+    return df
+
+
+def load_rain_df() -> pd.DataFrame:
+    """The processed rainfall normals if present, otherwise a synthetic frame with the same schema."""
+    return pd.read_csv(RAIN_FILE) if os.path.exists(RAIN_FILE) else make_rain_df()
+
+
+def make_crop_df(n_rows: int, rain_df: pd.DataFrame, seed: int = 0) -> pd.DataFrame:
+    """Generates a cleaned crop production frame over the states/districts in rain_df.
+
+    Text columns index shared object arrays, so even 25M rows hold no per-row strings.
+    """
+    rng = np.random.default_rng(seed)
+    districts = rain_df[['State_Name', 'District_Name']].drop_duplicates().to_numpy()
+    picks = districts[rng.integers(0, len(districts), n_rows)]
+    area = rng.gamma(2.0, 2000.0, n_rows).round(0)
+    production = (area * rng.gamma(2.0, 1.5, n_rows)).round(0)
+    production[rng.random(n_rows) < 0.05] = 0
+    df = pd.DataFrame({
+        'State_Name': picks[:, 0],
+        'District_Name': picks[:, 1],
+        'Crop_Year': np.array(YEARS)[rng.integers(0, len(YEARS), n_rows)],
+        'Season': np.array(SEASONS, dtype=object)[rng.integers(0, len(SEASONS), n_rows)],
+        'Crop': np.array(CROPS, dtype=object)[rng.integers(0, len(CROPS), n_rows)],
+        'Area': area,
+        'Production': production,
+    })
+    df['Yield'] = np.divide(df['Production'], df['Area']).replace([np.inf, -np.inf], 0).fillna(0)
+    return df
@@ -1,7 +1,18 @@
+import argparse
+import hashlib
+import io
+import itertools
+import json
 import pandas as pd
 import numpy as np
 import os # Import the os module to handle file paths robustly
 
+from samarth_app.aggregates import (
+    build_aggregates, finalize_aggregates, merge_partial_aggregates, partial_aggregates, save_aggregates,
+)
+from samarth_app.backends import MANIFEST_NAME, ParquetDatasetWriter, write_parquet_dataset
+from samarth_app.dataset_io import SCHEMA_VERSION, TableWriter, artifact_path, file_sha256, read_table, write_artifact, write_table
+
 # --- Define Correct File Paths ---
 # This tells the script to look inside the correct sub-folders.
 RAW_DATA_DIR = 'data/raw/'
@@ -13,66 +24,206 @@ RAIN_DATA_FILE = os.path.join(RAW_DATA_DIR, 'district wise rainfall normal.csv')
 
 CLEANED_CROP_FILE = os.path.join(PROCESSED_DATA_DIR, 'crop_production_cleaned.csv')
 CLEANED_RAIN_FILE = os.path.join(PROCESSED_DATA_DIR, 'rainfall_cleaned.csv')
-
-
-# --- Load the Datasets ---
-try:
-    # Use the full paths we just defined
-    crop_df = pd.read_csv(CROP_DATA_FILE)
-    rain_df = pd.read_csv(RAIN_DATA_FILE)
-    print("✅ Datasets loaded successfully from 'data/raw/' folder!")
-except FileNotFoundError as e:
-    print(f"❌ Error: {e}")
-    print("Please make sure your raw data files are inside the 'data/raw/' folder.")
-    exit()
-
-# --- 1. Clean the Crop Production Data ---
-print("\nCleaning Crop Production data...")
-
-# Handle missing Production values
-initial_missing = crop_df['Production'].isnull().sum()
-crop_df['Production'].fillna(0, inplace=True)
-print(f"   - Handled {initial_missing} missing values in 'Production' column.")
-
-# Standardize text columns
-text_cols = ['State_Name', 'District_Name', 'Season', 'Crop']
-for col in text_cols:
-    crop_df[col] = crop_df[col].str.strip().str.upper()
-print("   - Standardized text columns to uppercase and stripped whitespace.")
-
-# Feature Engineering: Calculate Yield
-# Use np.divide for safe division to avoid errors when Area is 0
-crop_df['Yield'] = np.divide(crop_df['Production'], crop_df['Area'])
-# Replace any infinite values (from division by zero) with 0
-crop_df.replace([np.inf, -np.inf], 0, inplace=True)
-crop_df['Yield'].fillna(0, inplace=True)
-print("   - Engineered 'Yield' feature (Production / Area).")
-
-
-# --- 2. Clean the Rainfall Data ---
-print("\nCleaning Rainfall data...")
-
-# Rename columns for consistency
-rain_df.rename(columns={'STATE_UT_NAME': 'State_Name', 'DISTRICT': 'District_Name'}, inplace=True)
-print("   - Renamed columns to match crop data.")
-
-# Standardize text columns
-rain_df['State_Name'] = rain_df['State_Name'].str.strip().str.upper()
-rain_df['District_Name'] = rain_df['District_Name'].str.strip().str.upper()
-print("   - Standardized text columns.")
-
-
-# --- 3. Save the Cleaned Data ---
-try:
+AGGREGATES_DIR = os.path.join(PROCESSED_DATA_DIR, 'aggregates')
+# Crop rows as Parquet partitioned by state and year, for the DuckDB backend (--parquet).
+PARQUET_DIR = os.path.join(PROCESSED_DATA_DIR, 'parquet')
+
+# Incremental mode keeps one cleaned Arrow part per raw row block, plus a manifest of block hashes.
+CROP_PARTS_DIR = os.path.join(PROCESSED_DATA_DIR, 'crop_parts')
+CROP_MANIFEST_FILE = os.path.join(CROP_PARTS_DIR, 'manifest.json')
+
+DEFAULT_CHUNK_ROWS = 100_000
+# Bump whenever clean_crop_data changes what it writes: incremental runs only reuse
+# cleaned parts made by the same version.
+CLEANER_VERSION = 1
+CROP_TEXT_COLUMNS = ['State_Name', 'District_Name', 'Season', 'Crop']
+# Explicit dtypes keep every streamed chunk on the same schema.
+CROP_DTYPES = {'State_Name': str, 'District_Name': str, 'Crop_Year': 'int64', 'Season': str, 'Crop': str, 'Area': 'float64', 'Production': 'float64'}
+
+
+# --- 1. Cleaning Steps ---
+def clean_crop_data(crop_df: pd.DataFrame) -> tuple[pd.DataFrame, int]:
+    """Cleans a full crop frame or a single chunk; returns it with its count of missing Production values."""
+    missing = int(crop_df['Production'].isnull().sum())
+    # Standardize text columns and handle missing Production values in one pass
+    crop_df = crop_df.assign(
+        **{col: crop_df[col].str.strip().str.upper() for col in CROP_TEXT_COLUMNS},
+        Production=crop_df['Production'].fillna(0),
+    )
+    # Feature Engineering: Calculate Yield
+    # Use np.divide for safe division; division by zero gives inf/NaN, which become 0
+    crop_df['Yield'] = np.divide(crop_df['Production'], crop_df['Area'])
+    numeric = ['Area', 'Production', 'Yield']
+    crop_df[numeric] = crop_df[numeric].replace([np.inf, -np.inf], 0)
+    crop_df['Yield'] = crop_df['Yield'].fillna(0)
+    return crop_df, missing
+
+
+def clean_rain_data(rain_df: pd.DataFrame) -> pd.DataFrame:
+    # Rename columns for consistency with the crop data and standardize text columns
+    rain_df = rain_df.rename(columns={'STATE_UT_NAME': 'State_Name', 'DISTRICT': 'District_Name'})
+    rain_df['State_Name'] = rain_df['State_Name'].str.strip().str.upper()
+    rain_df['District_Name'] = rain_df['District_Name'].str.strip().str.upper()
+    return rain_df
+
+
+def save_outputs(crop_df: pd.DataFrame, rain_df: pd.DataFrame, parquet: bool = False):
     # Use the full paths for saving the cleaned files
     crop_df.to_csv(CLEANED_CROP_FILE, index=False)
     rain_df.to_csv(CLEANED_RAIN_FILE, index=False)
     print("\n✅ Successfully saved cleaned data to the 'data/processed/' folder.")
-except Exception as e:
-    print(f"\n❌ Error saving files: {e}")
-
-# --- Display a sample of the cleaned data ---
-print("\n--- Sample of Cleaned Crop Data ---")
-print(crop_df.head())
-print("\n--- Sample of Cleaned Rainfall Data ---")
-print(rain_df.head())
+    # Typed binary copies for fast, memory-mapped loading in samarth_app/data_tools.py
+    write_artifact(crop_df, CLEANED_CROP_FILE)
+    write_artifact(rain_df, CLEANED_RAIN_FILE)
+    print("✅ Wrote Arrow artifacts (.arrow) next to the cleaned CSVs.")
+    # Materialized aggregates the data tools answer from without touching raw rows
+    save_aggregates(build_aggregates(crop_df, rain_df), AGGREGATES_DIR)
+    print("✅ Wrote precomputed aggregate tables to 'data/processed/aggregates/'.")
+    if parquet:
+        write_parquet_dataset(crop_df, rain_df, PARQUET_DIR)
+        print("✅ Wrote the partitioned Parquet dataset to 'data/processed/parquet/'.")
+
+
+# --- 2. Streaming & Incremental Pipeline ---
+def iter_raw_blocks(path: str, rows_per_block: int):
+    """Yields (header, lines) blocks of the raw CSV. Assumes no quoted newlines, which holds for this dataset."""
+    with open(path, 'r', encoding='utf-8') as f:
+        header = f.readline()
+        while True:
+            lines = ''.join(itertools.islice(f, rows_per_block))
+            if not lines:
+                return
+            yield header, lines
+
+
+def load_manifest() -> dict:
+    try:
+        with open(CROP_MANIFEST_FILE) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def run_streaming(rows_per_block: int, incremental: bool = False, parquet: bool = False):
+    """Cleans the crop file chunk by chunk, so memory is bounded by the chunk size and the aggregates.
+
+    In incremental mode each raw row block is fingerprinted; blocks whose hash is
+    unchanged reuse their cleaned Arrow part instead of being parsed and cleaned again,
+    as long as the part was written by the same CLEANER_VERSION and schema version. A
+    part that no longer reads (another schema version, a damaged file) is re-cleaned.
+    Only the cleaning is incremental: every run still rewrites the whole cleaned CSV,
+    its Arrow artifact, the Parquet dataset and the aggregate tables from all parts,
+    because the data tools read each of them as one file or table set.
+    """
+    manifest = load_manifest() if incremental else {}
+    fingerprint = {
+        'schema_version': SCHEMA_VERSION, 'cleaner_version': CLEANER_VERSION, 'rows_per_block': rows_per_block,
+        'crop_sha256': file_sha256(CROP_DATA_FILE), 'rain_sha256': file_sha256(RAIN_DATA_FILE),
+    }
+    outputs = [CLEANED_CROP_FILE, CLEANED_RAIN_FILE, artifact_path(CLEANED_CROP_FILE), AGGREGATES_DIR] + ([os.path.join(PARQUET_DIR, MANIFEST_NAME)] if parquet else [])
+    if incremental and all(manifest.get(k) == v for k, v in fingerprint.items()) and all(map(os.path.exists, outputs)):
+        print("✅ Raw files are unchanged since the last run; nothing to do.")
+        return
+
+    rain_df = clean_rain_data(pd.read_csv(RAIN_DATA_FILE))
+    reusable = all(manifest.get(k) == fingerprint[k] for k in ('schema_version', 'cleaner_version', 'rows_per_block'))
+    previous_blocks = manifest.get('blocks', []) if reusable else []
+    block_hashes, partials = [], []
+    missing, rows, reused = 0, 0, 0
+    if incremental:
+        os.makedirs(CROP_PARTS_DIR, exist_ok=True)
+
+    print(f"\nCleaning Crop Production data in blocks of {rows_per_block:,} rows...")
+    parquet_out = ParquetDatasetWriter(PARQUET_DIR) if parquet else None
+    with open(CLEANED_CROP_FILE, 'w', newline='') as csv_out, TableWriter(artifact_path(CLEANED_CROP_FILE)) as arrow_out:
+        for i, (header, lines) in enumerate(iter_raw_blocks(CROP_DATA_FILE, rows_per_block)):
+            part_path = os.path.join(CROP_PARTS_DIR, f'part-{i:05d}.arrow')
+            block_hash = hashlib.sha256((header + lines).encode()).hexdigest()
+            block_hashes.append(block_hash)
+            chunk = None
+            if incremental and i < len(previous_blocks) and previous_blocks[i] == block_hash and os.path.exists(part_path):
+                try:
+                    chunk = read_table(part_path).to_pandas()
+                    reused += 1
+                except (ValueError, OSError):
+                    pass  # another schema version or a damaged part: clean the block again
+            if chunk is None:
+                chunk, chunk_missing = clean_crop_data(pd.read_csv(io.StringIO(header + lines), dtype=CROP_DTYPES))
+                missing += chunk_missing
+                if incremental:
+                    write_table(chunk, part_path)
+
+            chunk.to_csv(csv_out, index=False, header=(i == 0))
+            arrow_out.write(chunk)
+            if parquet_out is not None:
+                parquet_out.write_crop(chunk)
+            partials.append(partial_aggregates(chunk, row_offset=rows))
+            rows += len(chunk)
+
+    print(f"   - Processed {rows:,} rows in {len(block_hashes)} blocks ({reused} unchanged blocks reused).")
+    print(f"   - Handled {missing} missing values in 'Production' column of re-cleaned blocks.")
+    rain_df.to_csv(CLEANED_RAIN_FILE, index=False)
+    write_artifact(rain_df, CLEANED_RAIN_FILE)
+    save_aggregates(finalize_aggregates(merge_partial_aggregates(partials), rain_df), AGGREGATES_DIR)
+    if parquet_out is not None:
+        parquet_out.write_rain(rain_df)
+        parquet_out.close()
+    print("\n✅ Saved cleaned CSVs, Arrow artifacts and aggregate tables to 'data/processed/'.")
+
+    if incremental:
+        # Drop parts left over from a longer previous input, then record the new fingerprints.
+        for stale in range(len(block_hashes), len(previous_blocks)):
+            stale_path = os.path.join(CROP_PARTS_DIR, f'part-{stale:05d}.arrow')
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+        with open(CROP_MANIFEST_FILE, 'w') as f:
+            json.dump({**fingerprint, 'blocks': block_hashes}, f, indent=2)
+
+
+# --- 3. In-Memory Pipeline (default) ---
+def run_in_memory(parquet: bool = False):
+    # --- Load the Datasets ---
+    crop_df = pd.read_csv(CROP_DATA_FILE)
+    rain_df = pd.read_csv(RAIN_DATA_FILE)
+    print("✅ Datasets loaded successfully from 'data/raw/' folder!")
+
+    print("\nCleaning Crop Production data...")
+    crop_df, missing = clean_crop_data(crop_df)
+    print(f"   - Handled {missing} missing values in 'Production' column.")
+    print("   - Standardized text columns to uppercase and stripped whitespace.")
+    print("   - Engineered 'Yield' feature (Production / Area).")
+
+    print("\nCleaning Rainfall data...")
+    rain_df = clean_rain_data(rain_df)
+    print("   - Renamed columns to match crop data and standardized text columns.")
+
+    try:
+        save_outputs(crop_df, rain_df, parquet)
+    except Exception as e:
+        print(f"\n❌ Error saving files: {e}")
+
+    # --- Display a sample of the cleaned data ---
+    print("\n--- Sample of Cleaned Crop Data ---")
+    print(crop_df.head())
+    print("\n--- Sample of Cleaned Rainfall Data ---")
+    print(rain_df.head())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean the raw crop and rainfall datasets into data/processed/.")
+    parser.add_argument('--stream', action='store_true', help="Process the crop file in chunks with bounded memory.")
+    parser.add_argument('--incremental', action='store_true', help="Stream, and only re-clean raw row blocks whose hash changed.")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help="Rows per streamed chunk / fingerprinted block.")
+    parser.add_argument('--parquet', action='store_true', help="Also write the Parquet dataset the DuckDB backend queries.")
+    cli_args = parser.parse_args()
+
+    missing_files = [p for p in (CROP_DATA_FILE, RAIN_DATA_FILE) if not os.path.exists(p)]
+    if missing_files:
+        print(f"❌ Error: missing raw file(s): {missing_files}")
+        print("Please make sure your raw data files are inside the 'data/raw/' folder.")
+        exit()
+
+    if cli_args.stream or cli_args.incremental:
+        run_streaming(cli_args.chunk_rows, incremental=cli_args.incremental, parquet=cli_args.parquet)
+    else:
+        run_in_memory(cli_args.parquet)
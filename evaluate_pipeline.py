@@ -0,0 +1,172 @@
+"""Offline evaluation of two-stage (router + parser) vs single-call (combined) query parsing,
+and of the gazetteer fast path in front of the two-stage chains.
+
+python evaluate_pipeline.py                  # stubbed LLM replaying fixture answers, no network
+python evaluate_pipeline.py --live           # real Gemini calls (needs GOOGLE_API_KEY)
+python evaluate_pipeline.py --live --record  # ...and store Gemini's answers in the fixture for offline replays
+
+Offline, the stub replays the answers recorded in the fixture. The committed
+recordings are hand-written, mistakes included (a misrouted trend question, swapped
+crops, a wrong year window, a combined answer with its arguments left empty), so
+the modes score differently; a live --record run replaces them with Gemini's.
+Questions without a recording for a mode are counted as unrecorded and left out of
+its accuracy, though the calls they made still count; a mode with no recordings at
+all reports "no recordings" instead of a score. The fast path needs the
+processed crop data (run data_cleaner.py); without it every question falls back to the LLM.
+"""
+import argparse
+import json
+import os
+import time
+
+from dotenv import load_dotenv
+
+from samarth_app.fake_llm import FakeChatModel, question_of
+from samarth_app.fast_path import stats as fast_path_stats
+from samarth_app.pipeline import (
+    CombinedQuery, DistrictInput, PipelineChains, PolicyInput, QueryType, RouteQuery, StateInput, TrendInput,
+    get_chains, route_and_parse,
+)
+
+FIXTURE_FILE = os.path.join('data', 'eval', 'routing_questions.jsonl')
+PARSER_SCHEMAS = {
+    QueryType.STATE_COMPARISON: StateInput, QueryType.DISTRICT_EXTREMA: DistrictInput,
+    QueryType.TREND_ANALYSIS: TrendInput, QueryType.POLICY_ADVICE: PolicyInput,
+}
+MODES = {
+    'two_stage': {'combined': False, 'fast_path': False},
+    'combined': {'combined': True, 'fast_path': False},
+    'fast_path': {'combined': False, 'fast_path': True},
+}
+
+
+def load_cases(path: str = FIXTURE_FILE) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class NoRecording(LookupError):
+    """Raised by FixtureResponder when a case has no recorded answer for a schema."""
+
+
+class FixtureResponder:
+    """Answers structured-output calls from each case's recordings.
+
+    With gold_fallback, unrecorded answers are built from the case's gold labels
+    instead: right for load tests and wiring checks, meaningless for accuracy.
+    """
+
+    def __init__(self, cases: list[dict], gold_fallback: bool = False):
+        self.cases = {case['question']: case for case in cases}
+        self.gold_fallback = gold_fallback
+
+    def __call__(self, schema, messages):
+        case = self.cases[question_of(messages)]
+        recorded = case.get('recorded', {})
+        if schema.__name__ in recorded:
+            return schema.model_validate(recorded[schema.__name__])
+        if not self.gold_fallback:
+            raise NoRecording(f"No recorded {schema.__name__} answer for: {case['question']!r}")
+        gold = QueryType(case['query_type'])
+        if schema is RouteQuery:
+            return RouteQuery(query_type=gold)
+        if schema is CombinedQuery:
+            return CombinedQuery(query_type=gold, **({gold.value: case['args']} if case['args'] else {}))
+        if PARSER_SCHEMAS.get(gold) is schema:
+            return schema(**case['args'])
+        raise ValueError(f"No recorded {schema.__name__} answer for: {case['question']!r}")
+
+
+def normalize(value):
+    if isinstance(value, str):
+        return value.strip().lower()
+    if isinstance(value, list):
+        return sorted(normalize(v) for v in value)
+    return value
+
+
+def args_match(args, gold_args: dict) -> bool:
+    if gold_args is None:
+        return args is None
+    if args is None:
+        return False
+    predicted = args.model_dump()
+    return all(normalize(predicted.get(key)) == normalize(expected) for key, expected in gold_args.items())
+
+
+def recording_of(query_type: QueryType, args, combined: bool) -> dict:
+    """The structured answers behind one parse, in the shape FixtureResponder replays."""
+    if combined:
+        return {'CombinedQuery': CombinedQuery(query_type=query_type, **({query_type.value: args} if args else {})).model_dump(mode='json')}
+    recording = {'RouteQuery': {'query_type': query_type.value}}
+    if args is not None:
+        recording[type(args).__name__] = args.model_dump(mode='json')
+    return recording
+
+
+def evaluate(cases: list[dict], chains: PipelineChains, combined: bool, record: bool = False, fast_path: bool = False,
+             stub: FakeChatModel = None) -> dict:
+    """Accuracy and LLM calls of one mode. With the offline stub, calls are read from its
+    counter, so questions that failed or had no recording still count the calls they made."""
+    stats = {'type_correct': 0, 'args_correct': 0, 'errors': 0, 'unrecorded': 0, 'llm_calls': 0, 'seconds': 0.0}
+    stub_calls = lambda: sum(stub.calls.values()) if stub is not None else 0
+    for case in cases:
+        start, calls_before = time.perf_counter(), stub_calls()
+        try:
+            query_type, args, calls, _ = route_and_parse(case['question'], chains, combined=combined, fast_path=fast_path)
+        except NoRecording:
+            stats['unrecorded'] += 1
+            continue
+        except Exception as e:
+            stats['errors'] += 1
+            print(f"   ❌ {case['question'][:60]!r}: {e}")
+            continue
+        finally:
+            stats['seconds'] += time.perf_counter() - start
+            stats['llm_calls'] += stub_calls() - calls_before
+        if stub is None:
+            stats['llm_calls'] += calls
+        if query_type.value == case['query_type']:
+            stats['type_correct'] += 1
+            stats['args_correct'] += args_match(args, case['args'])
+        if record and calls:  # fast-path hits involve no model answers
+            case.setdefault('recorded', {}).update(recording_of(query_type, args, combined))
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--live', action='store_true', help="Call Gemini instead of the stubbed LLM.")
+    parser.add_argument('--record', action='store_true', help="With --live, save Gemini's answers into the fixture.")
+    parser.add_argument('--fixture', default=FIXTURE_FILE)
+    cli_args = parser.parse_args()
+
+    cases = load_cases(cli_args.fixture)
+    stub = None
+    if cli_args.live:
+        load_dotenv()
+        chains = get_chains()
+    else:
+        stub = FakeChatModel(responder=FixtureResponder(cases))
+        chains = PipelineChains(stub)
+
+    print(f"Evaluating {len(cases)} questions ({'live Gemini' if cli_args.live else 'stubbed LLM'})\n")
+    print(f"{'mode':<12}{'type acc':>10}{'args acc':>10}{'errors':>8}{'unrecorded':>12}{'LLM calls':>11}{'calls/q':>9}{'s/q':>8}")
+    for mode, options in MODES.items():
+        s = evaluate(cases, chains, record=cli_args.live and cli_args.record and not options['fast_path'], stub=stub, **options)
+        n = len(cases) - s['unrecorded']  # accuracy only counts questions the model (or its recording) answered
+        accuracy = f"{s['type_correct'] / n:>10.1%}{s['args_correct'] / n:>10.1%}" if n else f"{'no recordings':>20}"
+        print(f"{mode:<12}{accuracy}{s['errors']:>8}{s['unrecorded']:>12}"
+              f"{s['llm_calls']:>11}{s['llm_calls'] / len(cases):>9.2f}{s['seconds'] / len(cases):>8.3f}")
+    fp = fast_path_stats.snapshot()
+    print(f"\nFast path: {fp['hits']}/{fp['queries']} questions answered without the LLM ({fp['hit_rate']:.1%})")
+
+    if cli_args.live and cli_args.record:
+        with open(cli_args.fixture, 'w') as f:
+            for case in cases:
+                f.write(json.dumps(case) + '\n')
+        print(f"\n✅ Recorded answers saved to {cli_args.fixture}")
+
+
+if __name__ == "__main__":
+    main()
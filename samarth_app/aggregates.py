@@ -0,0 +1,266 @@
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+
+from samarth_app.constants import CROP_COLUMNS, CROP_TYPE_MAP, RAIN_COLUMNS
+from samarth_app.dataset_io import read_table, write_table
+
+# --- Materialized Aggregate Layer ---
+# data_cleaner.py precomputes the aggregations the tools used to redo on every
+# request. Built in one pass, every table is grouped straight from the raw rows
+# in their original order, so sums and idxmax/idxmin tie-breaks match a scan of
+# the raw frame. The streaming cleaner merges per-chunk partials instead, whose
+# sums can differ from a one-pass build in the last float bit.
+ALL_CROPS = 'ALL CROPS'
+TABLE_NAMES = ['cube', 'group_rollup', 'district_extrema', 'state_rainfall']
+CROP_TO_GROUP = {crop: group for group, crops in CROP_TYPE_MAP.items() for crop in crops}
+
+
+KEYS = ['State_Name', 'Crop_Year', 'Crop']
+
+
+def partial_aggregates(crop_df: pd.DataFrame, row_offset: int = 0) -> dict:
+    """Mergeable aggregates of one chunk of cleaned crop rows.
+
+    row_offset is the global position of the chunk's first row; it breaks
+    extrema ties in favour of the earliest row, as idxmax/idxmin do.
+    """
+    # Highest and lowest non-zero producing district candidates per state/year/crop.
+    rows = crop_df.assign(_Row=np.arange(row_offset, row_offset + len(crop_df)))
+    columns = KEYS + ['District_Name', 'Production', '_Row']
+    highest = rows.loc[rows.groupby(KEYS, observed=True)['Production'].idxmax(), columns]
+    non_zero = rows[rows['Production'] > 0]
+    lowest = non_zero.loc[non_zero.groupby(KEYS, observed=True)['Production'].idxmin(), columns]
+
+    return {**production_partials(crop_df), 'highest': highest, 'lowest': lowest}
+
+
+def production_partials(crop_df: pd.DataFrame) -> dict:
+    """The cube and group roll-up of some crop rows, still indexed by their keys.
+
+    Each key's sums only involve that key's rows, so the rows of any set of
+    (state, year) keys give exactly the values a build over every row holds for them.
+    """
+    # State x year x crop production and area.
+    cube = crop_df.groupby(KEYS, sort=True, observed=True).agg(Production=('Production', 'sum'), Area=('Area', 'sum'), Rows=('Production', 'size'))
+
+    # Per-year production rolled up by CROP_TYPE_MAP group, plus an all-crops total.
+    groups = crop_df['Crop'].map(CROP_TO_GROUP)
+    by_group = crop_df[groups.notna()].groupby([groups.dropna().rename('Crop_Group'), 'State_Name', 'Crop_Year'], observed=True)['Production'].sum()
+    all_crops = pd.concat({ALL_CROPS: crop_df.groupby(['State_Name', 'Crop_Year'], observed=True)['Production'].sum()}, names=['Crop_Group'])
+    return {'cube': cube, 'group_rollup': pd.concat([by_group, all_crops])}
+
+
+def _pick_extrema(candidates: pd.DataFrame, ascending: bool) -> pd.DataFrame:
+    ordered = candidates.sort_values(['Production', '_Row'], ascending=[ascending, True], kind='stable')
+    return ordered.drop_duplicates(KEYS).sort_values(KEYS, kind='stable')
+
+
+def merge_partial_aggregates(partials: list[dict]) -> dict:
+    """Combines the partial aggregates of many chunks with one concat and group-by per table.
+
+    Merge once at the end: folding chunks in one at a time regroups everything
+    accumulated so far on every step, which is quadratic in the number of chunks.
+    """
+    return {
+        'cube': pd.concat([p['cube'] for p in partials]).groupby(level=[0, 1, 2]).sum(),
+        'group_rollup': pd.concat([p['group_rollup'] for p in partials]).groupby(level=[0, 1, 2]).sum(),
+        'highest': _pick_extrema(pd.concat([p['highest'] for p in partials]), ascending=False),
+        'lowest': _pick_extrema(pd.concat([p['lowest'] for p in partials]), ascending=True),
+    }
+
+
+def finalize_aggregates(partials: dict, rain_df: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    """Turns (merged) partial aggregates plus the rainfall frame into the flat aggregate tables."""
+    cube = partials['cube'].copy()
+    cube['Yield'] = np.divide(cube['Production'], cube['Area']).replace([np.inf, -np.inf], 0).fillna(0)
+
+    highest, lowest = (partials[name].drop(columns='_Row') for name in ('highest', 'lowest'))
+    district_extrema = highest.merge(lowest, on=KEYS, how='left', suffixes=('_Highest', '_Lowest'))
+
+    # Series.mean per state (not groupby mean) so rounding matches the per-state mask it replaces.
+    state_rainfall = pd.DataFrame(
+        [(state, annual.mean()) for state, annual in rain_df.groupby('State_Name', observed=True)['ANNUAL']], columns=['State_Name', 'ANNUAL']
+    )
+
+    return {
+        'cube': cube.reset_index(), 'group_rollup': partials['group_rollup'].sort_index().reset_index(),
+        'district_extrema': district_extrema, 'state_rainfall': state_rainfall,
+    }
+
+
+def build_aggregates(crop_df: pd.DataFrame, rain_df: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    """Builds the flat aggregate tables from the full cleaned crop and rainfall frames."""
+    return finalize_aggregates(partial_aggregates(crop_df), rain_df)
+
+
+def save_aggregates(tables: dict[str, pd.DataFrame], directory: str):
+    """Writes each aggregate table as an Arrow IPC file in directory."""
+    os.makedirs(directory, exist_ok=True)
+    for name, table in tables.items():
+        write_table(table, os.path.join(directory, f'{name}.arrow'))
+
+
+def load_aggregates(directory: str, source_paths: list[str]) -> dict[str, pd.DataFrame]:
+    """Loads the aggregate tables, or returns None if any is missing or older than its sources."""
+    paths = {name: os.path.join(directory, f'{name}.arrow') for name in TABLE_NAMES}
+    if not all(os.path.exists(p) for p in paths.values()):
+        return None
+    newest_source = max((os.path.getmtime(p) for p in source_paths if os.path.exists(p)), default=0)
+    if min(os.path.getmtime(p) for p in paths.values()) < newest_source:
+        return None
+    try:
+        return {name: read_table(path).to_pandas() for name, path in paths.items()}
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Ignoring unusable aggregate tables: {e}")
+        return None
+
+
+class AggregateCube:
+    """Lookups over the aggregate tables, answering the tools in O(1)/O(k).
+
+    The cube and the group roll-up stay flat tables sorted by their keys, kept as
+    column arrays. A dict maps each (state, year) and (crop group, state) key to
+    its row positions. A batch lookup gathers the positions of every requested
+    key and takes all of them at once.
+    """
+
+    def __init__(self, tables: dict[str, pd.DataFrame]):
+        cube = tables['cube']
+        self._cube = {name: cube[name].to_numpy(dtype=object if name in ('State_Name', 'Crop') else None)
+                      for name in ('State_Name', 'Crop_Year', 'Crop', 'Production')}
+        self._cube['Crop_Group'] = np.array([CROP_TO_GROUP.get(crop) for crop in self._cube['Crop']], dtype=object)
+        self._cube_rows = cube.groupby(['State_Name', 'Crop_Year'], sort=False, observed=True).indices
+
+        rollup = tables['group_rollup']
+        self._rollup = {name: rollup[name].to_numpy(dtype=object if name in ('Crop_Group', 'State_Name') else None)
+                        for name in ('Crop_Group', 'State_Name', 'Crop_Year', 'Production')}
+        self._rollup_rows = rollup.groupby(['Crop_Group', 'State_Name'], sort=False, observed=True).indices
+
+        extrema = tables['district_extrema']
+        self._extrema = {
+            (row.State_Name, row.Crop_Year, row.Crop): row
+            for row in extrema.itertuples(index=False)
+        }
+        rainfall = tables['state_rainfall']
+        self._rainfall = dict(zip(rainfall['State_Name'], rainfall['ANNUAL']))
+
+    @staticmethod
+    def _positions(index: dict, keys: list) -> tuple[np.ndarray, np.ndarray]:
+        """Row positions of every key present in index, in key order, and each row's key number."""
+        found = [(i, index[key]) for i, key in enumerate(keys) if key in index]
+        if not found:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        key_ids, positions = zip(*found)
+        return np.concatenate(positions), np.repeat(key_ids, [len(p) for p in positions])
+
+    @classmethod
+    def from_frames(cls, crop_df: pd.DataFrame, rain_df: pd.DataFrame):
+        """Builds the cube in memory, for when data_cleaner.py has not written the tables."""
+        # An unloaded dataset still yields (empty) tables, so lookups simply find nothing.
+        if crop_df.empty:
+            crop_df = pd.DataFrame(columns=CROP_COLUMNS)
+        if rain_df.empty:
+            rain_df = pd.DataFrame(columns=RAIN_COLUMNS)
+        return cls(build_aggregates(crop_df, rain_df))
+
+    @classmethod
+    def from_rows(cls, crop_df: pd.DataFrame):
+        """A cube over the production tables of some crop rows only (no extrema or rainfall).
+
+        Backends that fetch the rows of the requested states and years per query use it
+        to answer crop_production_batch and production_trend_batch. crop_df needs the
+        State_Name, Crop_Year, Crop, Area and Production columns.
+        """
+        partials = production_partials(crop_df)
+        return cls({
+            'cube': partials['cube'].reset_index(), 'group_rollup': partials['group_rollup'].sort_index().reset_index(),
+            'district_extrema': pd.DataFrame(columns=KEYS), 'state_rainfall': pd.DataFrame(columns=['State_Name', 'ANNUAL']),
+        })
+
+    def crop_production(self, state: str, year: int, crops: list[str] = None) -> pd.Series:
+        """Total production per crop (sorted by crop name) for a state in one year."""
+        rows, _ = self._positions(self._cube_rows, [(state, year)])
+        production = pd.Series(self._cube['Production'][rows], index=pd.Index(self._cube['Crop'][rows], name='Crop'), name='Production')
+        return production[production.index.isin(crops)] if crops is not None else production
+
+    def crop_production_batch(self, states: list[str], years: list[int], crop_groups: list[str] = (ALL_CROPS,), top_n: int = None) -> pd.DataFrame:
+        """Total production per crop for every (crop group, state, year) combination.
+
+        A tidy frame with columns Crop_Group, State_Name, Crop_Year, Crop and Production,
+        sorted by crop group, state, year and crop name. ALL_CROPS selects every crop.
+        With top_n, only the n largest producers of each combination are kept, largest
+        first (ties in crop-name order), and a Rank column is added. attrs['rows_scanned']
+        counts the rows considered before that cut. Years are int64 however the cube
+        stores them, so every backend returns the same dtypes.
+        """
+        keys = list(itertools.product(sorted(set(states)), sorted(set(years))))
+        rows, key_ids = self._positions(self._cube_rows, keys)
+        row_groups = self._cube['Crop_Group'][rows]
+        parts = []
+        for number, group in enumerate(sorted(set(crop_groups))):
+            selected = slice(None) if group == ALL_CROPS else row_groups == group
+            parts.append((group, rows[selected], key_ids[selected] + number * len(keys)))
+        labels = np.repeat(np.array([group for group, _, _ in parts], dtype=object), [len(r) for _, r, _ in parts])
+        rows = np.concatenate([r for _, r, _ in parts]) if parts else rows[:0]
+        blocks = np.concatenate([b for _, _, b in parts]) if parts else key_ids[:0]
+        scanned, ranks = len(rows), None
+        if top_n is not None:
+            order = np.lexsort((-self._cube['Production'][rows], blocks))  # stable: ties keep crop-name order
+            rank = np.arange(len(order)) - np.searchsorted(blocks, blocks, side='left')
+            keep = order[rank < top_n]
+            rows, labels, ranks = rows[keep], labels[keep], rank[rank < top_n] + 1
+        columns = {
+            'Crop_Group': labels, 'State_Name': self._cube['State_Name'][rows], 'Crop_Year': self._cube['Crop_Year'][rows].astype(np.int64),
+            'Rank': ranks, 'Crop': self._cube['Crop'][rows], 'Production': self._cube['Production'][rows],
+        }
+        frame = pd.DataFrame({name: values for name, values in columns.items() if values is not None})
+        frame.attrs['rows_scanned'] = scanned
+        return frame
+
+    def production_trend(self, state: str, crop_group: str, start_year: int, end_year: int) -> pd.Series:
+        """Total production per year for a crop group (or ALL_CROPS) in a state."""
+        rows, _ = self._positions(self._rollup_rows, [(crop_group, state)])
+        trend = pd.Series(self._rollup['Production'][rows], index=pd.Index(self._rollup['Crop_Year'][rows], name='Crop_Year'), name='Production')
+        return trend.loc[start_year:end_year]
+
+    def production_trend_batch(self, states: list[str], crop_groups: list[str], periods: list[tuple[int, int]]) -> pd.DataFrame:
+        """Total production per year for every (crop group, state, period) combination.
+
+        A tidy frame with columns Crop_Group, State_Name, Start_Year, End_Year, Crop_Year
+        and Production, in that sort order. A year in overlapping periods appears under each.
+        """
+        periods = sorted(set(periods))
+        rows, key_ids = self._positions(self._rollup_rows, list(itertools.product(sorted(set(crop_groups)), sorted(set(states)))))
+        years = self._rollup['Crop_Year'][rows]
+        parts = [(number, rows[(years >= start) & (years <= end)], key_ids[(years >= start) & (years <= end)])
+                 for number, (start, end) in enumerate(periods)]
+        period_ids = np.repeat([number for number, _, _ in parts], [len(r) for _, r, _ in parts]).astype(np.intp)
+        rows = np.concatenate([r for _, r, _ in parts]) if parts else rows[:0]
+        blocks = np.concatenate([k for _, _, k in parts]) * len(periods) + period_ids if parts else key_ids[:0]
+        order = np.argsort(blocks, kind='stable')
+        rows, period_ids = rows[order], period_ids[order]
+        bounds = np.array(periods, dtype=np.int64).reshape(-1, 2)
+        return pd.DataFrame({
+            'Crop_Group': self._rollup['Crop_Group'][rows], 'State_Name': self._rollup['State_Name'][rows],
+            'Start_Year': bounds[period_ids, 0], 'End_Year': bounds[period_ids, 1],
+            'Crop_Year': self._rollup['Crop_Year'][rows].astype(np.int64), 'Production': self._rollup['Production'][rows],
+        })
+
+    def district_extrema(self, state: str, year: int, crop: str, find: str):
+        """Returns (district, production) for the highest/lowest non-zero producer, or None."""
+        row = self._extrema.get((state, year, crop))
+        if row is None:
+            return None
+        suffix = 'Highest' if find == 'highest' else 'Lowest'
+        district = getattr(row, f'District_Name_{suffix}')
+        return None if pd.isna(district) else (district, getattr(row, f'Production_{suffix}'))
+
+    def has_extrema_key(self, state: str, year: int, crop: str) -> bool:
+        return (state, year, crop) in self._extrema
+
+    def state_rainfall(self, state: str):
+        """Mean normal annual rainfall across a state's districts, or None if unknown."""
+        return self._rainfall.get(state)
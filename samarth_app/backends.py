@@ -0,0 +1,273 @@
+import glob
+import json
+import os
+import shutil
+from collections import defaultdict
+from urllib.parse import unquote
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from samarth_app.aggregates import ALL_CROPS, CROP_TO_GROUP, AggregateCube
+from samarth_app.constants import CROP_COLUMNS
+from samarth_app.crop_store import CropStore
+from samarth_app.dataset_io import SCHEMA_VERSION
+from samarth_app.telemetry import span
+
+# --- Data Backends ---
+# The data tools format JSON from a handful of lookups, and a backend answers
+# them. PandasBackend keeps everything in memory: a CropStore over the rows and
+# the precomputed AggregateCube. DuckDBBackend keeps the crop rows on disk as
+# Parquet partitioned by state and year, and reads only the partitions a query
+# names. Predicates on the other columns are pushed down into the Parquet scan.
+# Each query returns the matching rows in their original order (the _Row column).
+# The float sums and means are then computed from those rows by the same pandas
+# code the cube is built with. DuckDB's SUM and AVG accumulate in a different
+# order, which would change the last digits, and identical JSON matters more.
+# Both backends take uppercase names.
+PARTITION_COLUMNS = ['State_Name', 'Crop_Year']
+PRODUCTION_COLUMNS = ['State_Name', 'Crop_Year', 'Crop', 'Area', 'Production']
+MANIFEST_NAME = 'manifest.json'
+
+
+class DataBackend:
+    """The lookups behind the data tools."""
+
+    name = None
+
+    @property
+    def empty(self) -> bool:
+        raise NotImplementedError
+
+    def crop_production_batch(self, states: list[str], years: list[int], crop_groups: list[str], top_n: int = None) -> pd.DataFrame:
+        """See AggregateCube.crop_production_batch."""
+        raise NotImplementedError
+
+    def production_trend_batch(self, states: list[str], crop_groups: list[str], periods: list[tuple[int, int]]) -> pd.DataFrame:
+        """See AggregateCube.production_trend_batch."""
+        raise NotImplementedError
+
+    def has_extrema_key(self, state: str, year: int, crop: str) -> bool:
+        raise NotImplementedError
+
+    def district_extrema(self, state: str, year: int, crop: str, find: str):
+        """(district, production) of the highest/lowest non-zero producer, or None."""
+        raise NotImplementedError
+
+    def count_rows(self, state: str, year: int, crop: str) -> int:
+        """Number of crop rows for one crop in a state and year."""
+        raise NotImplementedError
+
+    def state_rainfall(self, state: str):
+        """Mean normal annual rainfall across a state's districts, or None if unknown."""
+        raise NotImplementedError
+
+    def latest_year(self) -> int:
+        raise NotImplementedError
+
+    def crop_rows(self, state: str, start_year: int, end_year: int, crops: list[str]) -> pd.DataFrame:
+        """A state's rows for some crops over an inclusive year range, in their original order."""
+        raise NotImplementedError
+
+
+class PandasBackend(DataBackend):
+    """In-memory frames: a CropStore over the crop rows and the aggregate cube."""
+
+    name = 'pandas'
+
+    def __init__(self, crop_store: CropStore, aggregate_cube: AggregateCube):
+        self.crop_store, self.aggregate_cube = crop_store, aggregate_cube
+
+    @property
+    def empty(self) -> bool:
+        return self.crop_store.empty
+
+    def crop_production_batch(self, states, years, crop_groups, top_n=None):
+        return self.aggregate_cube.crop_production_batch(states, years, crop_groups, top_n=top_n)
+
+    def production_trend_batch(self, states, crop_groups, periods):
+        return self.aggregate_cube.production_trend_batch(states, crop_groups, periods)
+
+    def has_extrema_key(self, state, year, crop):
+        return self.aggregate_cube.has_extrema_key(state, year, crop)
+
+    def district_extrema(self, state, year, crop, find):
+        return self.aggregate_cube.district_extrema(state, year, crop, find)
+
+    def count_rows(self, state, year, crop):
+        return self.crop_store.count(state, year, crop)
+
+    def state_rainfall(self, state):
+        return self.aggregate_cube.state_rainfall(state)
+
+    def latest_year(self):
+        return self.crop_store.latest_year()
+
+    def crop_rows(self, state, start_year, end_year, crops):
+        return self.crop_store.rows(state, start_year, end_year, crops=crops)
+
+
+class DuckDBBackend(DataBackend):
+    """Queries a Parquet dataset written by ParquetDatasetWriter with an embedded DuckDB.
+
+    The partition files are listed once, so a query opens only the files of
+    the (state, year) partitions it names. Raises FileNotFoundError if the
+    dataset has no manifest and ValueError if it has another schema version.
+    """
+
+    name = 'duckdb'
+
+    def __init__(self, directory: str):
+        import duckdb  # optional: only this backend needs it
+
+        with open(os.path.join(directory, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        if manifest.get('schema_version') != SCHEMA_VERSION:
+            raise ValueError(f"Parquet dataset schema version {manifest.get('schema_version')!r} does not match {SCHEMA_VERSION}.")
+        self.directory = directory
+        self._partitions = defaultdict(list)  # (state, year) -> Parquet files
+        for path in sorted(glob.glob(os.path.join(directory, 'crop', 'State_Name=*', 'Crop_Year=*', '*.parquet'))):
+            state_dir, year_dir = path.split(os.sep)[-3:-1]
+            self._partitions[(unquote(state_dir.split('=', 1)[1]), int(year_dir.split('=', 1)[1]))].append(path)
+        self._rain_file = os.path.join(directory, 'rain', 'rainfall.parquet')
+        self._rainfall = {}
+        self._connection = duckdb.connect()
+
+    def _query(self, sql: str, params: list) -> pd.DataFrame:
+        cursor = self._connection.cursor()  # a connection must not be shared between threads; its cursors can
+        try:
+            return cursor.execute(sql, params).df()
+        finally:
+            cursor.close()
+
+    def _files(self, states, keep_year) -> list[str]:
+        states = set(states)
+        return [path for (state, year), paths in sorted(self._partitions.items()) if state in states and keep_year(year) for path in paths]
+
+    def _crop_query(self, columns: list[str], files: list[str], where: str = None, params: list = (),
+                    order_by: str = None, limit: int = None) -> pd.DataFrame:
+        """columns of the rows in files matching where, in their original order unless order_by comes first."""
+        if not files:
+            return pd.DataFrame({column: [] for column in columns})
+        sql = f"SELECT {', '.join(columns)} FROM read_parquet(?, hive_partitioning = true)"
+        sql += f" WHERE {where}" if where else ''
+        sql += f" ORDER BY {order_by + ', ' if order_by else ''}_Row" + (f" LIMIT {int(limit)}" if limit else '')
+        with span('duckdb', files=len(files)) as s:
+            frame = self._query(sql, [files, *params])
+            s.set(rows=len(frame))
+        return frame
+
+    def _production_rows(self, files: list[str], crop_groups) -> pd.DataFrame:
+        if ALL_CROPS in crop_groups:
+            return self._crop_query(PRODUCTION_COLUMNS, files)
+        crops = [crop for crop, group in CROP_TO_GROUP.items() if group in set(crop_groups)]
+        return self._crop_query(PRODUCTION_COLUMNS, files, 'list_contains(?, Crop)', [crops])
+
+    @property
+    def empty(self) -> bool:
+        return not self._partitions
+
+    def crop_production_batch(self, states, years, crop_groups, top_n=None):
+        rows = self._production_rows(self._files(states, set(years).__contains__), crop_groups)
+        return AggregateCube.from_rows(rows).crop_production_batch(states, years, crop_groups, top_n=top_n)
+
+    def production_trend_batch(self, states, crop_groups, periods):
+        in_a_period = lambda year: any(start <= year <= end for start, end in periods)
+        rows = self._production_rows(self._files(states, in_a_period), crop_groups)
+        return AggregateCube.from_rows(rows).production_trend_batch(states, crop_groups, periods)
+
+    def has_extrema_key(self, state, year, crop):
+        return not self._crop_query(['Crop'], self._partitions.get((state, year), []), 'Crop = ?', [crop], limit=1).empty
+
+    def district_extrema(self, state, year, crop, find):
+        # First row of the (descending or ascending) production order; ties go to the earliest row, as idxmax/idxmin do.
+        if find == 'highest':
+            where, order_by = 'Crop = ? AND NOT isnan(Production)', 'Production DESC'
+        else:
+            where, order_by = 'Crop = ? AND Production > 0 AND NOT isnan(Production)', 'Production'
+        found = self._crop_query(['District_Name', 'Production'], self._partitions.get((state, year), []), where, [crop], order_by, limit=1)
+        return None if found.empty else (found['District_Name'].iloc[0], found['Production'].iloc[0])
+
+    def count_rows(self, state, year, crop):
+        files = self._partitions.get((state, year), [])
+        if not files:
+            return 0
+        return int(self._query("SELECT COUNT(*) AS n FROM read_parquet(?, hive_partitioning = true) WHERE Crop = ?", [files, crop])['n'].iloc[0])
+
+    def state_rainfall(self, state):
+        if state not in self._rainfall:
+            annual = self._query("SELECT ANNUAL FROM read_parquet(?) WHERE State_Name = ? ORDER BY _Row", [self._rain_file, state])['ANNUAL']
+            self._rainfall[state] = annual.mean() if len(annual) else None  # Series.mean, as in the aggregate tables
+        return self._rainfall[state]
+
+    def latest_year(self):
+        return max((year for _, year in self._partitions), default=None)
+
+    def crop_rows(self, state, start_year, end_year, crops):
+        files = self._files([state], lambda year: start_year <= year <= end_year)
+        return self._crop_query(CROP_COLUMNS, files, 'list_contains(?, Crop)', [list(crops)])
+
+    def crop_names(self) -> pd.DataFrame:
+        """Distinct (State_Name, District_Name, Crop) rows, for the fast-path gazetteer."""
+        files = [path for paths in self._partitions.values() for path in paths]
+        if not files:
+            return pd.DataFrame()
+        return self._query("SELECT DISTINCT State_Name, District_Name, Crop FROM read_parquet(?, hive_partitioning = true)", [files])
+
+    def rain_frame(self) -> pd.DataFrame:
+        return self._query("SELECT * EXCLUDE (_Row) FROM read_parquet(?) ORDER BY _Row", [self._rain_file])
+
+
+class ParquetDatasetWriter:
+    """Streams cleaned crop chunks into a Parquet dataset partitioned by State_Name and Crop_Year.
+
+    Every chunk writes its own files into the partitions it touches. Each row
+    is stored with its global position as _Row, so queries can restore the
+    original order. The rainfall rows go into one file. The manifest is written
+    on close, and DuckDBBackend only opens a dataset that has one.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.crop_rows, self.rain_rows, self._parts = 0, 0, 0
+        if os.path.exists(os.path.join(directory, MANIFEST_NAME)):
+            os.remove(os.path.join(directory, MANIFEST_NAME))  # readers ignore the dataset until close() writes a new one
+        for stale in ('crop', 'rain'):
+            shutil.rmtree(os.path.join(directory, stale), ignore_errors=True)
+        os.makedirs(os.path.join(directory, 'rain'))
+
+    def write_crop(self, df: pd.DataFrame):
+        rows = np.arange(self.crop_rows, self.crop_rows + len(df))
+        ds.write_dataset(
+            pa.Table.from_pandas(df.assign(_Row=rows), preserve_index=False), os.path.join(self.directory, 'crop'),
+            format='parquet', partitioning=PARTITION_COLUMNS, partitioning_flavor='hive',
+            basename_template=f'part-{self._parts:05d}-{{i}}.parquet', existing_data_behavior='overwrite_or_ignore',
+        )
+        self.crop_rows, self._parts = self.crop_rows + len(df), self._parts + 1
+
+    def write_rain(self, df: pd.DataFrame):
+        table = pa.Table.from_pandas(df.assign(_Row=np.arange(len(df))), preserve_index=False)
+        pq.write_table(table, os.path.join(self.directory, 'rain', 'rainfall.parquet'))
+        self.rain_rows = len(df)
+
+    def close(self):
+        with open(os.path.join(self.directory, MANIFEST_NAME), 'w') as f:
+            json.dump({'schema_version': SCHEMA_VERSION, 'crop_rows': self.crop_rows, 'rain_rows': self.rain_rows,
+                       'partitioning': PARTITION_COLUMNS}, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+
+
+def write_parquet_dataset(crop_df: pd.DataFrame, rain_df: pd.DataFrame, directory: str):
+    """Writes the cleaned crop and rainfall frames as a Parquet dataset for DuckDBBackend."""
+    with ParquetDatasetWriter(directory) as writer:
+        writer.write_crop(crop_df)
+        writer.write_rain(rain_df)
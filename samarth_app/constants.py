@@ -0,0 +1,50 @@
+# --- Intelligence Layer: Mappings and Constants ---
+# Shared by the data tools and by data_cleaner.py, which imports it without
+# loading the datasets into memory.
+CROP_TYPE_MAP = {
+    'PULSES': ['ARHAR/TUR', 'GRAM', 'MOONG(GREEN GRAM)', 'URAD', 'OTHER KHARIF PULSES', 'OTHER RABI PULSES', 'MASOOR', 'PEAS & BEANS (PULSES)'],
+    'OILSEEDS': ['GROUNDNUT', 'SESAMUM', 'RAPESEED & MUSTARD', 'SUNFLOWER', 'SOYABEAN', 'NIGER SEED', 'CASTOR-SEED', 'LINSEED', 'SAFFLOWER'],
+    'CEREALS': ['RICE', 'WHEAT', 'MAIZE', 'BAJRA', 'JOWAR', 'RAGI', 'BARLEY', 'SMALL MILLETS'],
+}
+
+# The columns of the cleaned datasets that the tools and aggregates read; the
+# crop Season and the monthly and seasonal rainfall normals are never read.
+CROP_COLUMNS = ['State_Name', 'District_Name', 'Crop_Year', 'Crop', 'Area', 'Production', 'Yield']
+RAIN_COLUMNS = ['State_Name', 'District_Name', 'ANNUAL']
+
+# Other names for the crop groups, as users write them.
+GROUP_ALIASES = {'PULSES': ['pulse'], 'OILSEEDS': ['oilseed', 'oil seeds', 'oil seed'], 'CEREALS': ['cereal']}
+
+# Names that mean the same state or crop. The datasets spell some states
+# differently from each other (the rainfall normals use the older names), and
+# users write crops by their common names. Each entry resolves to whichever of
+# its names a dataset actually uses.
+STATE_ALIASES = [
+    ['ODISHA', 'ORISSA'],
+    ['CHHATTISGARH', 'CHATISGARH', 'CHATTISGARH'],
+    ['UTTARAKHAND', 'UTTARANCHAL'],
+    ['PUDUCHERRY', 'PONDICHERRY'],
+    ['HIMACHAL PRADESH', 'HIMACHAL'],
+    ['ANDAMAN AND NICOBAR ISLANDS', 'ANDAMAN AND NICOBAR', 'ANDAMAN NICOBAR'],
+    ['DADRA AND NAGAR HAVELI', 'DADAR NAGAR HAVELI'],
+    ['DAMAN AND DIU', 'DAMAN AND DUI'],
+    ['JAMMU AND KASHMIR', 'J&K', 'JAMMU KASHMIR'],
+    ['DELHI', 'NCT OF DELHI', 'NEW DELHI'],
+]
+CROP_ALIASES = [
+    ['ARHAR/TUR', 'TOOR', 'PIGEON PEA'],
+    ['MOONG(GREEN GRAM)', 'MUNG'],
+    ['URAD', 'BLACK GRAM'],
+    ['GRAM', 'CHANA', 'CHICKPEA', 'BENGAL GRAM'],
+    ['MASOOR', 'LENTIL'],
+    ['SESAMUM', 'SESAME', 'TIL'],
+    ['SOYABEAN', 'SOYBEAN', 'SOYA'],
+    ['BAJRA', 'PEARL MILLET'],
+    ['JOWAR', 'SORGHUM'],
+    ['RAGI', 'FINGER MILLET'],
+    ['RICE', 'PADDY'],
+    ['GROUNDNUT', 'PEANUT'],
+    ['CASTOR-SEED', 'CASTOR'],
+    ['NIGER SEED', 'NIGER'],
+    ['PEAS & BEANS (PULSES)', 'PEAS AND BEANS'],
+]
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+
+class CropStore:
+    """Pre-indexed view of the crop production data.
+
+    The rows keep their original order in `frame`, which may be a read-only
+    shared frame (see samarth_app.shared_data). The store builds a stable sort
+    permutation by (State, Crop_Year, Crop) plus the sorted year and crop-code
+    arrays. Every state/year/crop query is then a contiguous range of that
+    permutation, found by binary search instead of a boolean mask over the
+    whole frame. The matching rows are taken in their original order, so sums,
+    means and idxmax/idxmin tie-breaks are identical to scanning the raw frame.
+    """
+
+    def __init__(self, crop_df: pd.DataFrame):
+        self.frame = crop_df
+        if crop_df.empty or 'State_Name' not in crop_df.columns:
+            self._states, self._crops = {}, {}
+            self._state_offsets = {}
+            self._years = np.empty(0, dtype=np.int64)
+            self._crop_codes = np.empty(0, dtype=np.int32)
+            self._order = np.empty(0, dtype=np.int64)
+            return
+
+        # Codes in sorted-name order, so sorting by code is sorting by name.
+        state_names, state_codes = _sorted_codes(crop_df['State_Name'])
+        crop_names, crop_codes = _sorted_codes(crop_df['Crop'])
+        years = crop_df['Crop_Year'].to_numpy()
+        order = np.lexsort((crop_codes, years, state_codes))  # stable: equal keys keep their original order
+        self._order = order.astype(np.int32) if len(order) < 2**31 else order  # half the size of the int64 permutation
+        self._states = {name: code for code, name in enumerate(state_names)}
+        self._crops = {name: code for code, name in enumerate(crop_names)}
+        self._years = years[self._order]
+        self._crop_codes = crop_codes[self._order]
+
+        # Offsets of each state's block: state code -> (start, stop).
+        bounds = np.searchsorted(state_codes[self._order], np.arange(len(self._states) + 1))
+        self._state_offsets = {code: (int(bounds[code]), int(bounds[code + 1])) for code in range(len(self._states))}
+
+    @property
+    def empty(self) -> bool:
+        return self.frame.empty
+
+    def _year_range(self, state: str, start_year: int, end_year: int) -> tuple[int, int]:
+        """Returns the (start, stop) row offsets for a state over an inclusive year range."""
+        code = self._states.get(state)
+        if code is None:
+            return 0, 0
+        lo, hi = self._state_offsets[code]
+        years = self._years[lo:hi]
+        return lo + int(np.searchsorted(years, start_year, 'left')), lo + int(np.searchsorted(years, end_year, 'right'))
+
+    def rows(self, state: str, start_year: int, end_year: int = None, crops: list[str] = None) -> pd.DataFrame:
+        """Returns the rows for a state over a year range, optionally restricted to some crops."""
+        end_year = start_year if end_year is None else end_year
+        start, stop = self._year_range(state, start_year, end_year)
+        if start == stop:
+            return self.frame.iloc[:0]
+        if crops is None:
+            return self._in_original_order(np.arange(start, stop))
+
+        codes = sorted({self._crops[c] for c in crops if c in self._crops})
+        if start_year == end_year:
+            # Single year: each crop is its own contiguous sub-block.
+            block = self._crop_codes[start:stop]
+            lows = np.searchsorted(block, codes, 'left')
+            highs = np.searchsorted(block, codes, 'right')
+            positions = [np.arange(start + lo, start + hi) for lo, hi in zip(lows, highs) if hi > lo]
+            positions = np.concatenate(positions) if positions else np.empty(0, dtype=np.int64)
+        else:
+            positions = start + np.flatnonzero(np.isin(self._crop_codes[start:stop], codes))
+        return self._in_original_order(positions)
+
+    def count(self, state: str, year: int, crop: str) -> int:
+        """Number of rows for one crop in a state and year, without taking them."""
+        start, stop = self._year_range(state, year, year)
+        code = self._crops.get(crop)
+        if start == stop or code is None:
+            return 0
+        block = self._crop_codes[start:stop]
+        return int(np.searchsorted(block, code, 'right') - np.searchsorted(block, code, 'left'))
+
+    def _in_original_order(self, positions: np.ndarray) -> pd.DataFrame:
+        return self.frame.iloc[np.sort(self._order[positions])]
+
+    def latest_year(self) -> int:
+        return int(self._years.max()) if len(self._years) else None
+
+
+def _sorted_codes(column: pd.Series) -> tuple[list, np.ndarray]:
+    """(sorted distinct names, each row's code into them); missing values get -1."""
+    if isinstance(column.dtype, pd.CategoricalDtype) and column.cat.categories.is_monotonic_increasing:
+        return list(column.cat.categories), column.cat.codes.to_numpy()
+    categorical = pd.Categorical(column, categories=sorted(column.dropna().unique()))
+    return list(categorical.categories), categorical.codes
@@ -1,99 +1,275 @@
 import pandas as pd
+import numpy as np
 import os
 import json
+import threading
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from samarth_app.aggregates import ALL_CROPS, AggregateCube, load_aggregates
+from samarth_app.backends import MANIFEST_NAME, DataBackend, DuckDBBackend, PandasBackend
+from samarth_app.constants import CROP_COLUMNS, RAIN_COLUMNS
+from samarth_app.crop_store import CropStore
+from samarth_app.dataset_io import artifact_path
+from samarth_app.entity_index import CROP, GROUP, RAIN_STATE, STATE, EntityIndex
+from samarth_app.shared_data import compact_frame, load_shared
+from samarth_app.telemetry import add_rows, span
+from samarth_app.tool_cache import DatasetWatcher, ToolCache, memoized
 
 # --- File Paths and Data Loading ---
-try:
-    script_dir = os.path.dirname(os.path.realpath(__file__))
-    project_root = os.path.dirname(script_dir)
-    processed_data_path = os.path.join(project_root, 'data', 'processed')
-
-    crop_df = pd.read_csv(os.path.join(processed_data_path, 'crop_production_cleaned.csv'))
-    rain_df = pd.read_csv(os.path.join(processed_data_path, 'rainfall_cleaned.csv'))
-    print("✅ Data tools initialized: Cleaned datasets loaded into memory.")
-except FileNotFoundError:
-    # This provides a fallback if the script is run in an unexpected environment.
-    crop_df = pd.DataFrame()
-    rain_df = pd.DataFrame()
+script_dir = os.path.dirname(os.path.realpath(__file__))
+project_root = os.path.dirname(script_dir)
+processed_data_path = os.path.join(project_root, 'data', 'processed')
+CROP_DATA_FILE = os.path.join(processed_data_path, 'crop_production_cleaned.csv')
+RAIN_DATA_FILE = os.path.join(processed_data_path, 'rainfall_cleaned.csv')
+AGGREGATES_DIR = os.path.join(processed_data_path, 'aggregates')
+PARQUET_DIR = os.path.join(processed_data_path, 'parquet')
+# 'pandas' (in memory) or 'duckdb' (the Parquet dataset written by data_cleaner.py --parquet).
+DATA_BACKEND = os.getenv('SAMARTH_DATA_BACKEND', 'pandas')
+
+@dataclass(frozen=True)
+class Datasets:
+    """Everything the tools read. A reload builds a new one and swaps it in whole."""
+    crop_df: pd.DataFrame
+    rain_df: pd.DataFrame
+    crop_store: Optional[CropStore]
+    aggregate_cube: Optional[AggregateCube]
+    backend: DataBackend
+    entity_index: EntityIndex
+
+def _in_memory(crop_df: pd.DataFrame, rain_df: pd.DataFrame, tables: dict = None) -> Datasets:
+    """Datasets answered by PandasBackend from compact frames, with precomputed aggregate tables if given."""
+    # Built once at load: every tool below slices this store instead of scanning crop_df.
+    crop_store = CropStore(crop_df)
+    aggregate_cube = AggregateCube(tables) if tables else AggregateCube.from_frames(crop_df, rain_df)
+    return Datasets(crop_df, rain_df, crop_store, aggregate_cube, PandasBackend(crop_store, aggregate_cube),
+                    EntityIndex(crop_df, rain_df))
+
+def load_datasets():
+    """(Re)loads the processed datasets and rebuilds the data backend."""
+    if DATA_BACKEND == 'duckdb':
+        try:
+            backend = DuckDBBackend(PARQUET_DIR)
+            # The crop rows stay on disk; the fast-path gazetteer and the name index only need their names.
+            crop_df, rain_df = backend.crop_names(), backend.rain_frame()
+            swap_datasets(Datasets(crop_df, rain_df, None, None, backend, EntityIndex(crop_df, rain_df)))
+            print("✅ Data tools initialized: querying the Parquet dataset with DuckDB.")
+            return
+        except (ImportError, FileNotFoundError, ValueError) as e:
+            print(f"⚠️ DuckDB backend unavailable, loading the datasets into memory instead: {e}")
+    try:
+        # Compact frames attached from shared memory; the first worker on the host publishes
+        # them from the Arrow artifacts written by data_cleaner.py (or from the CSVs).
+        crop_df = load_shared('crop', CROP_DATA_FILE, CROP_COLUMNS)
+        rain_df = load_shared('rain', RAIN_DATA_FILE, RAIN_COLUMNS)
+        print("✅ Data tools initialized: Cleaned datasets loaded into memory.")
+    except FileNotFoundError:
+        # This provides a fallback if the script is run in an unexpected environment.
+        crop_df = pd.DataFrame()
+        rain_df = pd.DataFrame()
+
+    # Precomputed by data_cleaner.py; rebuilt in memory if the tables are missing or stale.
+    swap_datasets(_in_memory(crop_df, rain_df, load_aggregates(AGGREGATES_DIR, [CROP_DATA_FILE, RAIN_DATA_FILE])))
+
+# --- The Loaded Datasets ---
+# One Datasets object, replaced by a single assignment: a thread answering a tool
+# while another reloads sees either the old datasets or the new ones, never a mix.
+# Each tool reads `datasets` once per call. data_tools.crop_df, .backend and the
+# other fields stay readable as module attributes.
+datasets: Datasets = None
+_swap_lock = threading.Lock()  # serializes swaps; readers never take it
+_reload_lock = threading.Lock()
+
+def swap_datasets(new: Datasets) -> Datasets:
+    """Makes `new` the datasets the tools answer from and drops memoized results; returns the previous ones."""
+    global datasets
+    with _swap_lock:
+        previous, datasets = datasets, new
+        tool_cache.clear()
+    return previous
+
+def __getattr__(name: str):
+    if name in Datasets.__dataclass_fields__:
+        return getattr(datasets, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Memoized tool results; dropped whenever the data behind them changes.
+tool_cache = ToolCache()
+_watcher = DatasetWatcher([CROP_DATA_FILE, artifact_path(CROP_DATA_FILE), RAIN_DATA_FILE, artifact_path(RAIN_DATA_FILE),
+                           os.path.join(PARQUET_DIR, MANIFEST_NAME)])
+load_datasets()
+
+def set_datasets(new_crop_df: pd.DataFrame, new_rain_df: pd.DataFrame):
+    """Swaps in new datasets (e.g. synthetic benchmark data, compacted here) and answers from them in memory."""
+    swap_datasets(_in_memory(compact_frame(new_crop_df, CROP_COLUMNS), compact_frame(new_rain_df, RAIN_COLUMNS)))
+
+def set_backend(new_backend: DataBackend):
+    """Answers the tools from another backend, e.g. a DuckDBBackend over some Parquet dataset."""
+    with _reload_lock:  # not interleaved with a reload, which would drop it
+        swap_datasets(replace(datasets, backend=new_backend))
+
+def _reload_if_changed():
+    """Reloads the datasets (and drops memoized results) once data_cleaner.py has rewritten them.
+
+    One thread reloads; the others keep answering from the current datasets meanwhile.
+    """
+    if not _reload_lock.acquire(blocking=False):
+        return
+    try:
+        if _watcher.changed():
+            load_datasets()
+    finally:
+        _reload_lock.release()
+
+def _rainfall_mm(data: Datasets, state_upper: str):
+    rainfall = data.backend.state_rainfall(_rain_state(data, state_upper))
+    return round(rainfall, 2) if rainfall is not None and pd.notna(rainfall) else "N/A"
+
+def _to_json(payload, **kwargs) -> str:
+    """json.dumps, timed as the tool's `serialize` span."""
+    with span('serialize'):
+        return json.dumps(payload, **kwargs)
 
 # --- Intelligence Layer: Mappings and Constants ---
-CROP_TYPE_MAP = {
-    'PULSES': ['ARHAR/TUR', 'GRAM', 'MOONG(GREEN GRAM)', 'URAD', 'OTHER KHARIF PULSES', 'OTHER RABI PULSES', 'MASOOR', 'PEAS & BEANS (PULSES)'],
-    'OILSEEDS': ['GROUNDNUT', 'SESAMUM', 'RAPESEED & MUSTARD', 'SUNFLOWER', 'SOYABEAN', 'NIGER SEED', 'CASTOR-SEED', 'LINSEED', 'SAFFLOWER'],
-    'CEREALS': ['RICE', 'WHEAT', 'MAIZE', 'BAJRA', 'JOWAR', 'RAGI', 'BARLEY', 'SMALL MILLETS'],
-}
 DATA_SOURCES = [
     "Crop Production Data: Directorate of Economics and Statistics, Ministry of Agriculture & Farmers Welfare.",
     "Rainfall Data: India Meteorological Department (IMD) - District Wise Rainfall Normals."
 ]
 
+# --- Canonical Tool Arguments ---
+# Memo keys use the datasets' names for states and crops, resolved through the
+# entity index (aliases, shared words, then trigram + edit-distance matching),
+# sorted state lists and crop groups from CROP_TYPE_MAP. The tools then run on
+# the title-cased canonical names, so "Orissa", "odisha" and "Odisha " share one
+# result. A name the index cannot resolve is kept, stripped and uppercased.
+def _name(value: str) -> str:
+    return value.strip().upper()
+
+def _resolve(kind: str, value: str, index: EntityIndex = None) -> str:
+    return (index or datasets.entity_index).resolve(kind, value) or _name(value)
+
+def _rain_state(data: Datasets, state_upper: str) -> str:
+    """The rainfall dataset's name for a state (it uses some older spellings, e.g. ORISSA)."""
+    return data.entity_index.resolve(RAIN_STATE, state_upper) or state_upper
+
+def _crop_group(crop_type: str, index: EntityIndex = None):
+    """The CROP_TYPE_MAP group a crop type names, or None."""
+    return (index or datasets.entity_index).resolve(GROUP, crop_type) if crop_type else None
+
+def _state_comparison_args(states: list[str], year: int, top_n: int = 5, crop_type: str = None):
+    states = sorted({_resolve(STATE, s) for s in states})
+    group = _crop_group(crop_type)
+    return (tuple(states), int(year), int(top_n), group), {
+        'states': [s.title() for s in states], 'year': int(year), 'top_n': int(top_n), 'crop_type': group.title() if group else None}
+
+def _district_extrema_args(state: str, year: int, crop: str, find: str):
+    state, crop, find = _resolve(STATE, state), _resolve(CROP, crop), find.strip().lower()
+    return (state, int(year), crop, find), {'state': state.title(), 'year': int(year), 'crop': crop.title(), 'find': find}
+
+def _trend_analysis_args(region: str, crop_type: str, start_year: int, end_year: int):
+    region, crop_type = _resolve(STATE, region), _crop_group(crop_type) or (_name(crop_type) if crop_type else None)
+    return (region, crop_type, int(start_year), int(end_year)), {
+        'region': region.title(), 'crop_type': crop_type.title() if crop_type else None, 'start_year': int(start_year), 'end_year': int(end_year)}
+
+def _policy_analysis_args(region: str, crop_a: str, crop_b: str, years: int):
+    region, crop_a, crop_b = _resolve(STATE, region), _resolve(CROP, crop_a), _resolve(CROP, crop_b)
+    return (region, crop_a, crop_b, int(years)), {'region': region.title(), 'crop_a': crop_a.title(), 'crop_b': crop_b.title(), 'years': int(years)}
+
+# --- Batch Variants: Many States, Years and Crop Types at Once ---
+# Dashboards compare every state over decades. These gather all requested
+# combinations from the backend in one take and return tidy frames; the
+# single-query tools below are thin wrappers that serialize one slice of them.
+# Crop types outside CROP_TYPE_MAP (or None) mean all crops, as in the tools.
+def get_state_comparison_batch(states: list[str], years: list[int], crop_types: list[str] = (None,), top_n: int = 5) -> pd.DataFrame:
+    """Top crops by production for every (crop type, state, year) combination.
+
+    Columns: Crop_Group, State_Name, Crop_Year, Rank, Crop, Production and
+    Normal_Annual_Rainfall_mm. Ties keep crop-name order.
+    """
+    return _state_comparison_batch(datasets, states, years, crop_types, top_n)
+
+def _state_comparison_batch(data: Datasets, states, years, crop_types, top_n) -> pd.DataFrame:
+    index = data.entity_index
+    top = data.backend.crop_production_batch([_resolve(STATE, s, index) for s in states], [int(y) for y in years], [_crop_group(c, index) or ALL_CROPS for c in crop_types], top_n=int(top_n))
+    add_rows(top.attrs['rows_scanned'])
+    top['Normal_Annual_Rainfall_mm'] = _rainfall_column(data, top['State_Name'])
+    return top
+
+def get_trend_analysis_batch(regions: list[str], crop_types: list[str], periods: list[tuple[int, int]]) -> pd.DataFrame:
+    """Yearly production for every (crop type, region, period) combination.
+
+    Columns: Crop_Group, State_Name, Start_Year, End_Year, Crop_Year, Production and
+    Normal_Annual_Rainfall_mm.
+    """
+    return _trend_analysis_batch(datasets, regions, crop_types, periods)
+
+def _trend_analysis_batch(data: Datasets, regions, crop_types, periods) -> pd.DataFrame:
+    index = data.entity_index
+    trend = data.backend.production_trend_batch([_resolve(STATE, r, index) for r in regions], [_crop_group(c, index) or ALL_CROPS for c in crop_types], [(int(a), int(b)) for a, b in periods])
+    add_rows(len(trend))
+    trend['Normal_Annual_Rainfall_mm'] = _rainfall_column(data, trend['State_Name'])
+    return trend
+
+def _records(frame: pd.DataFrame, columns: list[str]) -> list[dict]:
+    """frame[columns].to_dict('records'), without building the narrower frame first."""
+    return [dict(zip(columns, values)) for values in zip(*(frame[column].tolist() for column in columns))]
+
+def _rainfall_column(data: Datasets, state_names: pd.Series) -> np.ndarray:
+    rainfall = {state: data.backend.state_rainfall(_rain_state(data, state)) for state in state_names.unique()}
+    return np.array([rainfall[state] for state in state_names.to_numpy()], dtype=float)
+
 # --- Specialist Tool 1: State-Level Comparison ---
+@memoized(tool_cache, _state_comparison_args, before=_reload_if_changed)
 def get_state_comparison_data(states: list[str], year: int, top_n: int = 5, crop_type: str = None) -> str:
     """Fetches and compares rainfall and top crops for a list of states in a single year."""
+    data = datasets
+    top = _state_comparison_batch(data, states, [year], [crop_type], top_n)
+    top_by_state = {state: rows for state, rows in top.groupby('State_Name', sort=False, observed=True)}
     results = {}
     for state in states:
         state_upper = state.strip().upper()
-        state_data = {}
-        # Rainfall
-        rain_state_df = rain_df[rain_df['State_Name'] == state_upper]
-        state_data['normal_annual_rainfall_mm'] = round(rain_state_df['ANNUAL'].mean(), 2) if not rain_state_df.empty else "N/A"
-        # Crops
-        crop_state_year_df = crop_df[(crop_df['State_Name'] == state_upper) & (crop_df['Crop_Year'] == year)]
-        if crop_type and crop_type.upper() in CROP_TYPE_MAP:
-            crop_list = CROP_TYPE_MAP[crop_type.upper()]
-            crop_state_year_df = crop_state_year_df[crop_state_year_df['Crop'].isin(crop_list)]
-        
-        if not crop_state_year_df.empty:
-            top_crops = (crop_state_year_df.groupby('Crop')['Production'].sum().nlargest(top_n).reset_index())
-            state_data['top_crops'] = top_crops.to_dict('records')
-        else:
-            state_data['top_crops'] = []
-        results[state] = state_data
+        rows = top_by_state.get(state_upper)
+        results[state] = {
+            'normal_annual_rainfall_mm': _rainfall_mm(data, state_upper),
+            'top_crops': _records(rows, ['Crop', 'Production']) if rows is not None else [],
+        }
     results["data_sources_used"] = DATA_SOURCES
-    return json.dumps(results, indent=2)
+    return _to_json(results, indent=2)
 
 # --- Specialist Tool 2: District-Level Extrema ---
+@memoized(tool_cache, _district_extrema_args, before=_reload_if_changed)
 def find_district_production_extrema(state: str, year: int, crop: str, find: str) -> str:
     """Finds the district with the highest or lowest production of a specific crop."""
-    if crop_df.empty: return json.dumps({"error": "Crop data not loaded."})
+    backend = datasets.backend
+    if backend.empty: return _to_json({"error": "Crop data not loaded."})
     state_upper, crop_upper = state.strip().upper(), crop.strip().upper()
-    df = crop_df[(crop_df['State_Name'] == state_upper) & (crop_df['Crop_Year'] == year) & (crop_df['Crop'] == crop_upper)]
-    if df.empty: return json.dumps({"error": f"No data for '{crop}' in '{state}' for {year}."})
-    
-    result_df = None
-    if find == 'highest':
-        result_df = df.loc[df['Production'].idxmax()]
-    elif find == 'lowest':
-        non_zero_df = df[df['Production'] > 0]
-        if not non_zero_df.empty:
-            result_df = non_zero_df.loc[non_zero_df['Production'].idxmin()]
+    if not backend.has_extrema_key(state_upper, year, crop_upper): return _to_json({"error": f"No data for '{crop}' in '{state}' for {year}."})
     
-    if result_df is None or result_df.empty:
-        return json.dumps({"error": f"Could not find a {find} (non-zero) production district."})
+    found = backend.district_extrema(state_upper, year, crop_upper, find) if find in ('highest', 'lowest') else None
+    add_rows(backend.count_rows(state_upper, year, crop_upper))
+    if found is None:
+        return _to_json({"error": f"Could not find a {find} (non-zero) production district."})
     
-    return json.dumps({
-        "state": state, "district": result_df['District_Name'].title(), "crop": result_df['Crop'].title(),
-        "year": int(result_df['Crop_Year']), "production_tonnes": int(result_df['Production']),
+    district, production = found
+    return _to_json({
+        "state": state, "district": district.title(), "crop": crop_upper.title(),
+        "year": int(year), "production_tonnes": int(production),
         "data_sources_used": [DATA_SOURCES[0]]
     })
 
 # --- Specialist Tool 3: Trend Analysis ---
+@memoized(tool_cache, _trend_analysis_args, before=_reload_if_changed)
 def get_trend_analysis_data(region: str, crop_type: str, start_year: int, end_year: int) -> str:
     """Analyzes production trends for a crop type in a region over a range of years."""
-    region_upper = region.strip().upper()
-    df = crop_df[(crop_df['State_Name'] == region_upper) & (crop_df['Crop_Year'].between(start_year, end_year))]
-    
-    if crop_type and crop_type.upper() in CROP_TYPE_MAP:
-        df = df[df['Crop'].isin(CROP_TYPE_MAP[crop_type.upper()])]
+    data = datasets
+    trend = _trend_analysis_batch(data, [region], [crop_type], [(start_year, end_year)])
     
-    if df.empty: return json.dumps({"error": f"No data found for '{crop_type}' in '{region}' between {start_year}-{end_year}."})
+    if trend.empty: return _to_json({"error": f"No data found for '{crop_type}' in '{region}' between {start_year}-{end_year}."})
     
-    trend = df.groupby('Crop_Year')['Production'].sum().reset_index().to_dict('records')
-    
-    rain_df_region = rain_df[rain_df['State_Name'] == region_upper]
-    normal_rainfall = round(rain_df_region['ANNUAL'].mean(), 2) if not rain_df_region.empty else "N/A"
+    trend = _records(trend, ['Crop_Year', 'Production'])
+    normal_rainfall = _rainfall_mm(data, region.strip().upper())
 
-    return json.dumps({
+    return _to_json({
         "analysis_type": "Production Trend Analysis",
         "region": region, "crop_type": crop_type, "period": f"{start_year}-{end_year}",
         "production_trend_tonnes": trend,
@@ -103,40 +279,37 @@ def get_trend_analysis_data(region: str, crop_type: str, start_year: int, end_ye
     }, indent=2)
 
 # --- Specialist Tool 4: Policy Analysis Data Gatherer ---
+@memoized(tool_cache, _policy_analysis_args, before=_reload_if_changed)
 def get_policy_analysis_data(region: str, crop_a: str, crop_b: str, years: int) -> str:
     """Gathers data for a policy comparison between two crops in a region over N years."""
-    if crop_df.empty: return json.dumps({"error": "Crop data not loaded."})
+    data = datasets
+    if data.backend.empty: return _to_json({"error": "Crop data not loaded."})
 
-    latest_year = int(crop_df['Crop_Year'].max())
+    latest_year = data.backend.latest_year()
     start_year = latest_year - years + 1
 
     region_upper = region.strip().upper()
     crops_upper = [crop_a.strip().upper(), crop_b.strip().upper()]
     
-    df = crop_df[
-        (crop_df['State_Name'] == region_upper) &
-        (crop_df['Crop_Year'].between(start_year, latest_year)) &
-        (crop_df['Crop'].isin(crops_upper))
-    ]
+    df = data.backend.crop_rows(region_upper, start_year, latest_year, crops_upper)
+    add_rows(len(df))
     
-    if df.empty or len(df['Crop'].unique()) < 2:
-        return json.dumps({"error": f"Not enough comparative data found for '{crop_a}' and '{crop_b}' in '{region}' for the last {years} years."})
+    if df.empty or df['Crop'].nunique() < 2:
+        return _to_json({"error": f"Not enough comparative data found for '{crop_a}' and '{crop_b}' in '{region}' for the last {years} years."})
 
-    analysis = df.groupby('Crop').agg(
+    analysis = df.groupby('Crop', observed=True).agg(
         average_yield_tonnes_per_hectare=('Yield', 'mean'),
         total_production_tonnes=('Production', 'sum'),
         years_of_data=('Crop_Year', 'nunique')
     ).reset_index()
 
-    rainfall = rain_df[rain_df['State_Name'] == region_upper]['ANNUAL'].mean()
-
     result = {
         "region": region,
         "comparison_period": f"{start_year}-{latest_year} ({years} years)",
         "crop_comparison_metrics": analysis.to_dict('records'),
-        "rainfall_context_mm": round(rainfall, 2) if pd.notna(rainfall) else "N/A",
+        "rainfall_context_mm": _rainfall_mm(data, region_upper),
         "data_sources_used": DATA_SOURCES
     }
     
-    return json.dumps(result, indent=2)
+    return _to_json(result, indent=2)
 
@@ -0,0 +1,97 @@
+import hashlib
+import os
+
+import pandas as pd
+import pyarrow as pa
+
+# --- Binary Dataset Artifacts ---
+# data_cleaner.py writes each processed CSV together with an Arrow IPC file
+# next to it. The Arrow file carries its own schema and a version header, so
+# loading it is a memory-map instead of a full CSV parse with type inference.
+SCHEMA_VERSION = 1
+VERSION_KEY = b'samarth_schema_version'
+ARTIFACT_EXTENSION = '.arrow'
+
+
+def file_sha256(path: str) -> str:
+    """Hex SHA-256 of a file's contents, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def artifact_path(csv_path: str) -> str:
+    """Returns the Arrow artifact path that belongs to a processed CSV."""
+    return os.path.splitext(csv_path)[0] + ARTIFACT_EXTENSION
+
+
+class TableWriter:
+    """Streams DataFrame chunks into one versioned Arrow IPC file.
+
+    The schema is fixed by the first chunk; later chunks are cast to it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._sink, self._writer, self._schema = None, None, None
+
+    def write(self, df: pd.DataFrame):
+        if self._writer is None:
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
+            self._schema = schema.with_metadata({**(schema.metadata or {}), VERSION_KEY: str(SCHEMA_VERSION).encode()})
+            self._sink = pa.OSFile(self.path, 'wb')
+            self._writer = pa.ipc.new_file(self._sink, self._schema)
+        self._writer.write_table(pa.Table.from_pandas(df, schema=self._schema, preserve_index=False))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_table(df: pd.DataFrame, path: str) -> str:
+    """Writes df as a typed Arrow IPC file, stamped with the schema version."""
+    with TableWriter(path) as writer:
+        writer.write(df)
+    return path
+
+
+def read_table(path: str) -> pa.Table:
+    """Memory-maps an Arrow IPC file; raises ValueError if its schema version does not match."""
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    version = (table.schema.metadata or {}).get(VERSION_KEY)
+    if version != str(SCHEMA_VERSION).encode():
+        raise ValueError(f"Artifact schema version {version!r} does not match {SCHEMA_VERSION}.")
+    return table
+
+
+def write_artifact(df: pd.DataFrame, csv_path: str) -> str:
+    """Writes df as an Arrow artifact alongside csv_path."""
+    return write_table(df, artifact_path(csv_path))
+
+
+def is_artifact_fresh(csv_path: str) -> bool:
+    """An artifact is usable only if it exists and is not older than its CSV."""
+    path = artifact_path(csv_path)
+    if not os.path.exists(path):
+        return False
+    return not os.path.exists(csv_path) or os.path.getmtime(path) >= os.path.getmtime(csv_path)
+
+
+def load_dataset(csv_path: str) -> pd.DataFrame:
+    """Loads a processed dataset from its Arrow artifact, falling back to the CSV if it is missing or stale."""
+    if is_artifact_fresh(csv_path):
+        try:
+            return read_table(artifact_path(csv_path)).to_pandas()
+        except (OSError, ValueError, pa.ArrowInvalid) as e:
+            print(f"⚠️ Ignoring unusable artifact for '{os.path.basename(csv_path)}': {e}")
+    return pd.read_csv(csv_path)
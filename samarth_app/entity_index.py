@@ -0,0 +1,146 @@
+import re
+from collections import Counter, defaultdict
+
+import pandas as pd
+
+from samarth_app.constants import CROP_ALIASES, CROP_TYPE_MAP, GROUP_ALIASES, STATE_ALIASES
+
+# --- Entity Resolution ---
+# The parsers pass names as the user wrote them ("Orissa", "Moong", "Andaman And
+# Nicobar"), while the datasets key rows by their own uppercase spellings. The
+# index is built once per load. It resolves a name in four steps, each tried
+# only if the previous one found nothing:
+#   1. Exact match of the normalized name: uppercase, '&' read as AND, and
+#      punctuation reduced to single spaces. The candidates are the dataset
+#      names, the alias tables in constants.py and the parts of compound crop
+#      names, e.g. MOONG and GREEN GRAM for MOONG(GREEN GRAM).
+#   2. Whole words that only one name contains, e.g. BENGAL -> WEST BENGAL.
+#   3. Names sharing trigrams with the query, ranked by edit distance. The best
+#      one wins if it is similar enough and no other name ties with it.
+#   4. Nothing: the caller keeps the name as given.
+# Fuzzy results are memoized, so repeated names cost a dict lookup.
+STATE, RAIN_STATE, DISTRICT, CROP, GROUP = 'state', 'rain_state', 'district', 'crop', 'group'
+MIN_SIMILARITY = 0.8  # 1 - edit distance / length of the longer name
+MAX_CANDIDATES = 8
+MEMO_SIZE = 4096
+
+
+def name_key(name: str) -> str:
+    """Uppercase words of a name, with '&' read as AND: 'Rapeseed &Mustard' -> 'RAPESEED AND MUSTARD'."""
+    return ' '.join(re.sub(r'[^A-Z0-9]+', ' ', str(name).upper().replace('&', ' AND ')).split())
+
+
+def _trigrams(key: str) -> set[str]:
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance between two strings."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+class _NameIndex:
+    """Resolution over the names of one kind (e.g. the crop dataset's states)."""
+
+    def __init__(self, surface_forms: dict[str, str]):
+        # surface form key -> dataset name; forms claimed by two names are ambiguous and dropped.
+        self._exact = {form: name for form, name in surface_forms.items() if name is not None}
+        self._forms = list(self._exact.items())
+        self._gram_counts = [len(_trigrams(form)) for form, _ in self._forms]
+        self._grams = defaultdict(list)
+        self._words = defaultdict(set)
+        for number, (form, name) in enumerate(self._forms):
+            for gram in _trigrams(form):
+                self._grams[gram].append(number)
+            for word in form.split():
+                self._words[word].add(name)
+        self._memo = {}
+
+    def resolve(self, key: str):
+        if key in self._exact:
+            return self._exact[key]
+        if key not in self._memo:
+            if len(self._memo) >= MEMO_SIZE:
+                self._memo.clear()
+            self._memo[key] = self._by_words(key) or self._by_similarity(key)
+        return self._memo[key]
+
+    def _by_words(self, key: str):
+        names = None
+        for word in key.split():
+            names = self._words.get(word, set()) if names is None else names & self._words.get(word, set())
+            if not names:
+                return None
+        return next(iter(names)) if names and len(names) == 1 else None
+
+    def _by_similarity(self, key: str):
+        grams = _trigrams(key)
+        shared = Counter(number for gram in grams for number in self._grams.get(gram, ()))
+        # Dice coefficient of the trigram sets picks the candidates; edit distance ranks them.
+        candidates = sorted(shared, key=lambda n: -2 * shared[n] / (len(grams) + self._gram_counts[n]))[:MAX_CANDIDATES]
+        scored = sorted((1 - edit_distance(key, self._forms[n][0]) / max(len(key), len(self._forms[n][0])), self._forms[n][1]) for n in candidates)
+        if not scored or scored[-1][0] < MIN_SIMILARITY:
+            return None
+        best_score, best_name = scored[-1]
+        if any(score == best_score and name != best_name for score, name in scored[:-1]):
+            return None  # two different names are equally close
+        return best_name
+
+
+def _surface_forms(names, alias_groups: list[list[str]] = (), split_parts: bool = False, reserved: set[str] = frozenset()) -> dict:
+    """Surface form key -> dataset name for a set of names, their aliases and (optionally) compound-name parts."""
+    forms = {name_key(name): name for name in names}
+    extra = {}
+
+    def claim(form: str, name: str):
+        if form and form not in forms and form not in reserved:
+            extra[form] = name if extra.get(form, name) == name else None
+
+    for group in alias_groups:
+        present = [name for name in names if name_key(name) in {name_key(alias) for alias in group}]
+        if present:
+            for alias in group:
+                claim(name_key(alias), present[0])
+    if split_parts:
+        for name in names:
+            for part in re.split(r'[()/&]', name):
+                claim(name_key(part), name)
+    return {**extra, **forms}
+
+
+class EntityIndex:
+    """Resolves user-written state, district, crop and crop-group names to the names the datasets use.
+
+    STATE resolves to the crop dataset's states and RAIN_STATE to the rainfall
+    dataset's, which spell some states differently. resolve() returns None when
+    no name matches closely enough.
+    """
+
+    def __init__(self, crop_df: pd.DataFrame, rain_df: pd.DataFrame):
+        def unique(df: pd.DataFrame, column: str) -> list[str]:
+            return sorted(df[column].dropna().unique()) if column in df.columns else []
+
+        groups = {group: [group, *aliases] for group, aliases in GROUP_ALIASES.items()}
+        group_forms = {name_key(form) for forms in groups.values() for form in forms}
+        crops = sorted(set(unique(crop_df, 'Crop')) | {crop for crops in CROP_TYPE_MAP.values() for crop in crops})
+        self._indexes = {
+            STATE: _NameIndex(_surface_forms(unique(crop_df, 'State_Name'), STATE_ALIASES)),
+            RAIN_STATE: _NameIndex(_surface_forms(unique(rain_df, 'State_Name'), STATE_ALIASES)),
+            DISTRICT: _NameIndex(_surface_forms(sorted(set(unique(crop_df, 'District_Name')) | set(unique(rain_df, 'District_Name'))))),
+            CROP: _NameIndex(_surface_forms(crops, CROP_ALIASES, split_parts=True, reserved=group_forms)),
+            GROUP: _NameIndex(_surface_forms(sorted(CROP_TYPE_MAP), list(groups.values()))),
+        }
+
+    def resolve(self, kind: str, name: str):
+        """The dataset's name for `name`, or None."""
+        key = name_key(name) if name else ''
+        return self._indexes[kind].resolve(key) if key else None
@@ -0,0 +1,124 @@
+import asyncio
+import math
+import random
+import re
+import time
+from collections import Counter
+from typing import Any, Callable
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import Field
+
+Z_95 = 1.6449  # standard normal quantile of the 95th percentile
+
+
+class SimulatedLLMError(RuntimeError):
+    """A model failure injected by FakeChatModel's failure_rate."""
+
+
+def latency_distribution(spec: str, seed: int = None) -> Callable[[], float]:
+    """A zero-argument callable drawing seconds from a distribution written as text.
+
+    '0.5' or 'fixed:0.5'       always 0.5s
+    'uniform:0.2,1.5'          uniform between 0.2s and 1.5s
+    'exponential:0.5'          exponential with a mean of 0.5s
+    'lognormal:0.8,2.0'        log-normal with a median of 0.8s and a p95 of 2.0s (long-tailed, like a hosted model)
+    """
+    kind, _, params = spec.partition(':') if ':' in spec else ('fixed', '', spec)
+    values = [float(value) for value in params.split(',')]
+    rng = random.Random(seed)
+    if kind == 'fixed' and len(values) == 1:
+        return lambda: values[0]
+    if kind == 'uniform' and len(values) == 2:
+        return lambda: rng.uniform(*values)
+    if kind == 'exponential' and len(values) == 1:
+        return lambda: rng.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+    if kind == 'lognormal' and len(values) == 2:
+        median, p95 = values
+        sigma = math.log(p95 / median) / Z_95 if p95 > median > 0 else 0.0
+        return lambda: rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+    raise ValueError(f"Unknown latency distribution {spec!r}; expected fixed:s, uniform:low,high, exponential:mean or lognormal:median,p95.")
+
+
+class FakeChatModel(BaseChatModel):
+    """Offline stand-in for ChatGoogleGenerativeAI.
+
+    Structured-output chains call responder(schema, messages), which returns an
+    instance of schema; plain chat calls return `text`, streamed word by word.
+    Plain calls wait `latency` seconds before the first word and `token_delay`
+    after each one, to mimic generation time; structured calls wait
+    `structured_latency`. Either latency may be a number or a zero-argument
+    callable drawing one (see latency_distribution). A `failure_rate` fraction of
+    calls raise SimulatedLLMError after their latency. Async calls sleep without
+    blocking the event loop. Every call is counted in `calls`, keyed by schema
+    name (or 'text').
+    """
+    responder: Callable[[type, list], Any]
+    text: str = "Stubbed response."
+    latency: Any = 0.0
+    token_delay: float = 0.0
+    structured_latency: Any = 0.0
+    failure_rate: float = 0.0
+    rng: random.Random = Field(default_factory=random.Random)
+    calls: Counter = Field(default_factory=Counter)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _delay(self, latency) -> float:
+        """Seconds one call waits: the latency itself, or a draw from it."""
+        return latency() if callable(latency) else latency
+
+    def _check_failure(self):
+        if self.failure_rate and self.rng.random() < self.failure_rate:
+            raise SimulatedLLMError("Simulated model failure.")
+
+    def _words(self) -> list[str]:
+        return re.findall(r'\s*\S+\s*|\s+', self.text)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text = ''.join(chunk.text for chunk in self._stream(messages, stop, run_manager, **kwargs))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text = ''.join([chunk.text async for chunk in self._astream(messages, stop, run_manager, **kwargs)])
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls['text'] += 1
+        time.sleep(self._delay(self.latency))
+        self._check_failure()
+        for word in self._words():
+            time.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls['text'] += 1
+        await asyncio.sleep(self._delay(self.latency))
+        self._check_failure()
+        for word in self._words():
+            await asyncio.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+
+    def with_structured_output(self, schema, **kwargs):
+        def respond(prompt_value):
+            self.calls[schema.__name__] += 1
+            time.sleep(self._delay(self.structured_latency))
+            self._check_failure()
+            return self.responder(schema, prompt_value.to_messages())
+
+        async def arespond(prompt_value):
+            self.calls[schema.__name__] += 1
+            await asyncio.sleep(self._delay(self.structured_latency))
+            self._check_failure()
+            return self.responder(schema, prompt_value.to_messages())
+        return RunnableLambda(respond, afunc=arespond)
+
+
+def question_of(messages: list) -> str:
+    """The user's question: the last (human) message of a router/parser prompt."""
+    return messages[-1].content
@@ -0,0 +1,230 @@
+import re
+import threading
+import time
+
+from samarth_app import data_tools
+from samarth_app.constants import CROP_TYPE_MAP, GROUP_ALIASES
+from samarth_app.schemas import DistrictInput, PolicyInput, QueryType, StateInput, TrendInput
+
+# --- Deterministic Fast Path ---
+# Most questions follow the router's few-shot templates and name states, crops or
+# crop groups and explicit years. A gazetteer matched with Aho-Corasick fills the
+# query type and its input model locally; anything it is not sure about returns
+# None and goes through the LLM chains as before.
+STATE, DISTRICT, CROP, GROUP = 'state', 'district', 'crop', 'group'
+NUMBER_WORDS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10}
+NUMBER = r'(\d{1,2}|' + '|'.join(NUMBER_WORDS) + r')'
+
+YEAR_RE = re.compile(r'\b(?:19|20)\d{2}\b')
+TOP_N_RE = re.compile(r'\b(?:top|biggest|largest|leading)\s+' + NUMBER + r'\b')
+LAST_N_YEARS_RE = re.compile(r'\b(?:last|past|previous)\s+' + NUMBER + r'\s+years?\b')
+PROMOTE_ORDER_RE = re.compile(r'\b(?:over|instead of|rather than|versus|vs)\b')
+# Negations and exclusions flip what a mention means ("excluding Punjab", "against
+# promoting rice"); the templates cannot express them, so the LLM gets those.
+NEGATION_RE = re.compile(r'\b(?:not|no|nor|never|except|excluding|exclude|excludes|other than|against|without)\b|\Bn t\b')
+
+
+def normalize(text: str) -> str:
+    """Lowercases and reduces text to space-separated words, padded so matches stay on word boundaries."""
+    return ' ' + ' '.join(re.sub(r'[^a-z0-9]+', ' ', text.lower()).split()) + ' '
+
+
+def crop_aliases(crop: str) -> list[str]:
+    """Surface forms of a dataset crop name, e.g. 'MOONG(GREEN GRAM)' -> moong green gram, moong, green gram."""
+    forms = {crop, *re.split(r'[()/&]', crop)}
+    return [form for form in forms if normalize(form).strip()]
+
+
+class AhoCorasick:
+    """Multi-pattern matcher: finds every pattern occurrence in one pass over the text."""
+
+    def __init__(self):
+        self._goto, self._fail, self._out = [{}], [0], [[]]
+
+    def add(self, pattern: str, payload):
+        node = 0
+        for ch in pattern:
+            if ch not in self._goto[node]:
+                self._goto.append({}); self._fail.append(0); self._out.append([])
+                self._goto[node][ch] = len(self._goto) - 1
+            node = self._goto[node][ch]
+        self._out[node].append((len(pattern), payload))
+
+    def build(self):
+        queue = list(self._goto[0].values())
+        while queue:
+            node = queue.pop(0)
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+        return self
+
+    def find(self, text: str):
+        """Yields (start, end, payload) for every match."""
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for length, payload in self._out[node]:
+                yield i - length + 1, i + 1, payload
+
+
+class Gazetteer:
+    """States, districts, crops and crop groups from the loaded datasets."""
+
+    def __init__(self, crop_df, rain_df):
+        entries = []  # (surface form, (kind, canonical name))
+        for df in (crop_df, rain_df):
+            if 'State_Name' in df.columns:
+                entries += [(name, (STATE, name)) for name in df['State_Name'].dropna().unique()]
+                entries += [(name, (DISTRICT, name)) for name in df['District_Name'].dropna().unique()]
+        crops = set(crop_df['Crop'].dropna().unique()) if 'Crop' in crop_df.columns else set()
+        crops |= {crop for group in CROP_TYPE_MAP.values() for crop in group}
+        group_forms = {normalize(form) for group, aliases in GROUP_ALIASES.items() for form in [group, *aliases]}
+        for crop in crops:
+            entries += [(form, (CROP, crop)) for form in crop_aliases(crop) if normalize(form) not in group_forms]
+        for group, aliases in GROUP_ALIASES.items():
+            entries += [(form, (GROUP, group)) for form in [group, *aliases]]
+
+        self._matcher = AhoCorasick()
+        for form, payload in entries:
+            self._matcher.add(normalize(form), payload)
+        self._matcher.build()
+
+    def entities(self, text: str) -> list[tuple[int, str, str]]:
+        """Leftmost-longest, non-overlapping entity mentions as (position, kind, name); states win ties."""
+        matches = sorted(self._matcher.find(text), key=lambda m: (m[0], -(m[1] - m[0]), m[2][0] != STATE))
+        found, covered_to = [], -1
+        for start, end, (kind, name) in matches:
+            if start >= covered_to:  # neighbouring matches share one padding space
+                found.append((start, kind, name))
+                covered_to = end - 1
+        return found
+
+
+def _number(token: str) -> int:
+    return int(token) if token.isdigit() else NUMBER_WORDS[token]
+
+
+def _unique(names: list[str]) -> list[str]:
+    return list(dict.fromkeys(names))
+
+
+class FastPathRouter:
+    """Fills QueryType + input model from the gazetteer when exactly one template matches cleanly."""
+
+    def __init__(self, gazetteer: Gazetteer):
+        self.gazetteer = gazetteer
+
+    def parse(self, question: str):
+        """Returns (query_type, args) or None when the question needs the LLM."""
+        text = normalize(question)
+        if NEGATION_RE.search(text):
+            return None
+        mentions = self.gazetteer.entities(text)
+        if any(kind == DISTRICT for _, kind, _ in mentions):
+            return None  # named districts are outside the templates
+        states = _unique([name for _, kind, name in mentions if kind == STATE])
+        crops = _unique([name for _, kind, name in mentions if kind == CROP])
+        groups = _unique([name for _, kind, name in mentions if kind == GROUP])
+        years = [int(y) for y in YEAR_RE.findall(text)]
+        candidates = [c for c in (
+            self._district_extrema(text, mentions, states, crops, groups, years),
+            self._trend(text, states, crops, groups, years),
+            self._policy(text, mentions, states, crops, groups, years),
+            self._state_comparison(text, states, crops, groups, years),
+        ) if c is not None]
+        return candidates[0] if len(candidates) == 1 else None
+
+    def _district_extrema(self, text, mentions, states, crops, groups, years):
+        high, low = re.search(r'\b(?:highest|most|largest|top)\b', text), re.search(r'\b(?:lowest|least|smallest)\b', text)
+        if ' district' not in text or not high or not low or len(states) != 2 or len(crops) != 1 or groups or len(years) != 1:
+            return None
+        # The state mentioned first belongs to whichever extreme is mentioned first.
+        state_1, state_2 = states if high.start() < low.start() else states[::-1]
+        return QueryType.DISTRICT_EXTREMA, DistrictInput(state_1=state_1.title(), crop_1=crops[0].title(), state_2=state_2.title(), crop_2=crops[0].title(), year=years[0])
+
+    def _trend(self, text, states, crops, groups, years):
+        if not re.search(r'\b(?:trend|changed|change|evolved)\b', text) or len(states) != 1 or len(groups) != 1 or crops or len(years) != 2:
+            return None
+        return QueryType.TREND_ANALYSIS, TrendInput(region=states[0].title(), crop_type=groups[0].title(), start_year=min(years), end_year=max(years))
+
+    def _policy(self, text, mentions, states, crops, groups, years):
+        last_n = LAST_N_YEARS_RE.search(text)
+        if not re.search(r'\b(?:promote|promoting|policy|arguments?|encourage|encouraging)\b', text):
+            return None
+        if len(states) != 1 or len(crops) != 2 or groups or years or not last_n:
+            return None
+        # "promote A over/instead of B": the connective must sit between the two crops.
+        positions = [pos for pos, kind, _ in mentions if kind == CROP]
+        connective = PROMOTE_ORDER_RE.search(text, positions[0])
+        if not connective or connective.start() > positions[-1]:
+            return None
+        return QueryType.POLICY_ADVICE, PolicyInput(region=states[0].title(), crop_a=crops[0].title(), crop_b=crops[1].title(), years=_number(last_n.group(1)))
+
+    def _state_comparison(self, text, states, crops, groups, years):
+        top_n = TOP_N_RE.search(text)
+        if not top_n or not states or crops or len(groups) > 1 or len(years) != 1 or ' district' in text:
+            return None
+        return QueryType.STATE_COMPARISON, StateInput(states=[s.title() for s in states], year=years[0], top_n=_number(top_n.group(1)), crop_type=groups[0].title() if groups else None)
+
+
+# --- Hit-Rate and Latency Accounting ---
+class FastPathStats:
+    """Counts fast-path hits/misses and estimates the LLM latency the hits avoided."""
+
+    def __init__(self):
+        self.hits, self.misses = 0, 0
+        self.llm_seconds = 0.0  # route+parse time spent on misses
+        self.fast_seconds = 0.0  # local parse time spent on hits
+        self._lock = threading.Lock()
+
+    def record_hit(self, seconds: float):
+        with self._lock:
+            self.hits += 1; self.fast_seconds += seconds
+
+    def record_miss(self, llm_seconds: float):
+        with self._lock:
+            self.misses += 1; self.llm_seconds += llm_seconds
+
+    def snapshot(self) -> dict:
+        total = self.hits + self.misses
+        avg_llm = self.llm_seconds / self.misses if self.misses else None
+        avg_fast = self.fast_seconds / self.hits if self.hits else 0.0
+        return {
+            'queries': total, 'hits': self.hits, 'hit_rate': self.hits / total if total else 0.0,
+            'avg_llm_route_parse_s': avg_llm,
+            'estimated_seconds_saved': (avg_llm - avg_fast) * self.hits if avg_llm is not None else None,
+        }
+
+
+stats = FastPathStats()
+_router, _router_key = None, None
+_router_lock = threading.Lock()
+
+
+def get_fast_path() -> FastPathRouter:
+    """The fast-path router for the currently loaded datasets (rebuilt if they are swapped)."""
+    global _router, _router_key
+    data = data_tools.datasets
+    key = (id(data.crop_df), id(data.rain_df))
+    with _router_lock:
+        if _router_key != key:
+            _router, _router_key = FastPathRouter(Gazetteer(data.crop_df, data.rain_df)), key
+        return _router
+
+
+def try_fast_path(question: str):
+    """Returns (query_type, args) from the local parser, or None; hits are recorded in `stats`."""
+    router = get_fast_path()  # the one-off gazetteer build is not counted as parse time
+    start = time.perf_counter()
+    parsed = router.parse(question)
+    if parsed is not None:
+        stats.record_hit(time.perf_counter() - start)
+    return parsed
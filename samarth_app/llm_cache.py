@@ -0,0 +1,236 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel
+
+# --- Persistent LLM Response Cache ---
+# Router, parser and synthesis answers are stored in SQLite. Each answer is
+# keyed on the chain name, the normalized inputs, the model, the temperature
+# and a hash of the prompt template (plus output schema). Editing a prompt
+# therefore changes the key, and the stale rows for that chain are dropped the
+# first time the new chain is built.
+CACHE_FILE = os.path.join('data', 'cache', 'llm_cache.sqlite')
+MAX_ENTRIES = 10_000
+MAX_BYTES = 50 * 1024 * 1024
+TTL_SECONDS = 30 * 24 * 3600
+QUERY_KEYS = ('query',)  # inputs holding the user's free text; other inputs are keyed verbatim
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    chain TEXT NOT NULL,
+    prompt_hash TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+CREATE INDEX IF NOT EXISTS responses_chain ON responses (chain, prompt_hash);
+"""
+
+
+def normalize_query(text: str) -> str:
+    """Case, whitespace and trailing punctuation do not change the key."""
+    return ' '.join(text.casefold().split()).rstrip(' ?!.')
+
+
+def near_duplicate_query(text: str) -> str:
+    """Token-sorted form: reordered wordings of the same question share a key.
+
+    Word order is lost, so "promote Bajra over Rice" and "promote Rice over Bajra"
+    collide; use it only where that trade-off is acceptable.
+    """
+    return ' '.join(sorted(re.findall(r'[a-z0-9]+', text.casefold())))
+
+
+def prompt_hash(prompt, schema: type = None) -> str:
+    """Fingerprint of a prompt template and the structured-output schema it is bound to."""
+    parts = [prompt.pretty_repr()]
+    if schema is not None:
+        parts.append(json.dumps(schema.model_json_schema(), sort_keys=True))
+    return hashlib.sha256('\n'.join(parts).encode()).hexdigest()[:16]
+
+
+def model_identity(llm) -> tuple[str, float]:
+    """(model name, temperature) of a chat model; stubs fall back to their _llm_type."""
+    return getattr(llm, 'model', None) or llm._llm_type, getattr(llm, 'temperature', None)
+
+
+class LLMCache:
+    """SQLite-backed response cache with TTL expiry and size-bounded LRU eviction.
+
+    Hit/miss counters are per process and kept per chain name.
+    """
+
+    def __init__(self, path: str = CACHE_FILE, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES,
+                 ttl_seconds: float = TTL_SECONDS, near_duplicates: bool = False):
+        self.path = path
+        self.max_entries, self.max_bytes, self.ttl_seconds = max_entries, max_bytes, ttl_seconds
+        self.near_duplicates = near_duplicates
+        self.hits, self.misses = Counter(), Counter()
+        self._checked = set()  # (chain, prompt_hash) pairs already purged of stale rows
+        self._lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.executescript(SCHEMA)
+
+    def key(self, chain: str, inputs: dict, model: str, p_hash: str, temperature) -> str:
+        as_query = near_duplicate_query if self.near_duplicates else normalize_query
+        keyed = {name: as_query(value) if name in QUERY_KEYS else value for name, value in inputs.items()}
+        material = json.dumps([chain, keyed, model, p_hash, temperature], sort_keys=True, default=str)
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def get(self, key: str, chain: str = '') -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT value, created_at FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                row = None
+            if row is None:
+                self.misses[chain] += 1
+                return None
+            self._conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (now, key))
+            self.hits[chain] += 1
+            return row[0]
+
+    def put(self, key: str, chain: str, p_hash: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                               (key, chain, p_hash, value, len(value.encode()), now, now))
+            self._evict(now)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+
+    def _evict(self, now: float):
+        """Drops expired rows, then the least recently used ones beyond the entry and byte limits."""
+        self._conn.execute('DELETE FROM responses WHERE created_at < ?', (now - self.ttl_seconds,))
+        self._conn.execute('DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)',
+                           (self.max_entries,))
+        self._conn.execute('DELETE FROM responses WHERE key IN (SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY last_access DESC, key) AS running FROM responses) WHERE running > ?)',
+                           (self.max_bytes,))
+
+    def invalidate_stale(self, chain: str, p_hash: str) -> int:
+        """Deletes a chain's rows written under any other prompt hash; returns how many."""
+        with self._lock:
+            if (chain, p_hash) in self._checked:
+                return 0
+            self._checked.add((chain, p_hash))
+            return self._conn.execute('DELETE FROM responses WHERE chain = ? AND prompt_hash != ?', (chain, p_hash)).rowcount
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        hits, misses = sum(self.hits.values()), sum(self.misses.values())
+        return {
+            'hits': hits, 'misses': misses, 'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            'entries': entries, 'bytes': size,
+            'by_chain': {chain: {'hits': self.hits[chain], 'misses': self.misses[chain]} for chain in sorted(self.hits | self.misses)},
+        }
+
+    def wrap(self, name: str, prompt, llm, chain, schema: type = None, streaming: bool = False):
+        """Returns `chain` (prompt | llm ...) with its answers served from and stored in the cache.
+
+        Structured answers are stored as JSON and rebuilt as `schema` instances; anything
+        else must be JSON-serializable (e.g. the string from a StrOutputParser). With
+        streaming (text chains only), a miss passes the model's chunks through as they
+        arrive and stores the joined text once the stream completes; a hit is one chunk.
+        A None answer is never stored, and a stored answer that no longer decodes is
+        deleted and treated as a miss.
+        """
+        model, temperature = model_identity(llm)
+        p_hash = prompt_hash(prompt, schema)
+        self.invalidate_stale(name, p_hash)
+        encode = lambda out: out.model_dump_json() if isinstance(out, BaseModel) else json.dumps(out)
+        decode = schema.model_validate_json if schema is not None else json.loads
+
+        def lookup(key):
+            cached = self.get(key, name)
+            if cached is None:
+                return None
+            try:
+                return decode(cached)
+            except ValueError:  # e.g. a pydantic ValidationError: the row would fail every hit until it expired
+                self.delete(key)
+                self.hits[name] -= 1
+                self.misses[name] += 1
+                return None
+
+        def store(key, out):
+            if out is not None:  # a structured-output call that parsed nothing; asking again may do better
+                self.put(key, name, p_hash, encode(out))
+
+        def invoke(inputs):
+            key = self.key(name, inputs, model, p_hash, temperature)
+            cached = lookup(key)
+            if cached is not None:
+                return cached
+            out = chain.invoke(inputs)
+            store(key, out)
+            return out
+
+        async def ainvoke(inputs):
+            key = self.key(name, inputs, model, p_hash, temperature)
+            cached = lookup(key)
+            if cached is not None:
+                return cached
+            out = await chain.ainvoke(inputs)
+            store(key, out)
+            return out
+
+        def stream(inputs):
+            key = self.key(name, inputs, model, p_hash, temperature)
+            cached = lookup(key)
+            if cached is not None:
+                yield cached
+                return
+            chunks = []
+            for chunk in chain.stream(inputs):
+                chunks.append(chunk)
+                yield chunk
+            self.put(key, name, p_hash, encode(''.join(chunks)))  # not reached if the reader stops early
+
+        async def astream(inputs):
+            key = self.key(name, inputs, model, p_hash, temperature)
+            cached = lookup(key)
+            if cached is not None:
+                yield cached
+                return
+            chunks = []
+            async for chunk in chain.astream(inputs):
+                chunks.append(chunk)
+                yield chunk
+            self.put(key, name, p_hash, encode(''.join(chunks)))
+
+        if streaming:
+            return RunnableLambda(stream, afunc=astream, name=f'cached_{name}')
+        return RunnableLambda(invoke, afunc=ainvoke, name=f'cached_{name}')
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """The on-disk cache shared by the Gemini-backed chains (opened on first use)."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache()
+        return _default_cache
@@ -0,0 +1,34 @@
+import threading
+
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+# --- Shared Gemini Clients ---
+# Building a ChatGoogleGenerativeAI opens a new gRPC channel, which means a fresh
+# TLS handshake on its first request. The registry builds one base model and
+# derives every other (temperature, rate limiter) variant from it with
+# model_copy. The copies share its client, so every chain in the process reuses
+# the same long-lived connection.
+MODEL_NAME = "gemini-pro-latest"
+
+_models = {}
+_lock = threading.Lock()
+
+
+def get_chat_model(temperature: float = 0, rate_limiter=None) -> ChatGoogleGenerativeAI:
+    """The process-wide Gemini chat model for a temperature (and optional rate limiter); requires GOOGLE_API_KEY."""
+    with _lock:
+        key = (temperature, id(rate_limiter))
+        if key not in _models:
+            if not _models:
+                model = ChatGoogleGenerativeAI(model=MODEL_NAME, temperature=temperature, rate_limiter=rate_limiter)
+            else:
+                base = next(iter(_models.values()))[0]
+                model = base.model_copy(update={'temperature': temperature, 'rate_limiter': rate_limiter})
+            _models[key] = (model, rate_limiter)  # holding the limiter keeps its id from being reused
+        return _models[key][0]
+
+
+def clear_chat_models():
+    """Drops the shared models (e.g. after the API key changes); the next call builds a new channel."""
+    with _lock:
+        _models.clear()
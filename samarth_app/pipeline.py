@@ -0,0 +1,425 @@
+import asyncio
+import json
+import threading
+import time
+from contextlib import nullcontext
+
+# --- LangChain Imports ---
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+
+# --- Query Types and Input Models ---
+from samarth_app.schemas import (
+    QueryType, RouteQuery, StateInput, DistrictInput, TrendInput, PolicyInput, CombinedQuery, QueryResult,
+)
+
+# --- Import ALL Our Specialist Data Tools ---
+from samarth_app.data_tools import (
+    get_state_comparison_data,
+    find_district_production_extrema,
+    get_trend_analysis_data,
+    get_policy_analysis_data,
+)
+from samarth_app.fast_path import stats as fast_path_stats, try_fast_path
+from samarth_app.llm_cache import LLMCache, get_llm_cache
+from samarth_app.llm_clients import get_chat_model
+from samarth_app.telemetry import current_span, span, trace
+
+# --- ARCHITECTURE SETUP: THE ROUTER (with Few-Shot Examples for Accuracy) ---
+# This prompt includes examples to make the router much more accurate.
+ROUTER_SYSTEM_PROMPT = f"""You are an expert at routing a user's query. Classify it into one of the following categories.
+
+Here are some examples to guide you:
+
+- User Query: "Compare the rainfall and top 3 cereals in Gujarat and Rajasthan for 2011."
+- Classification: `{QueryType.STATE_COMPARISON.value}`
+
+- User Query: "Identify the district in Uttar Pradesh with the highest production of Wheat and compare with the lowest in Punjab for the same year."
+- Classification: `{QueryType.DISTRICT_EXTREMA.value}`
+
+- User Query: "Analyze the production trend of Pulses in Maharashtra over the last decade."
+- Classification: `{QueryType.TREND_ANALYSIS.value}`
+
+- User Query: "What are the data-backed arguments to promote Bajra over Sugarcane?"
+- Classification: `{QueryType.POLICY_ADVICE.value}`
+"""
+router_prompt = ChatPromptTemplate.from_messages([("system", ROUTER_SYSTEM_PROMPT), ("human", "{query}")])
+
+
+# --- SPECIALIST DEFINITIONS (Parsers and Formatters) ---
+
+# Specialist 1: State Comparison
+STATE_EXTRACTION = "Extract the list of states, the single year, the number of top crops, and an optional crop type from the user's query."
+parser_state_prompt = ChatPromptTemplate.from_messages([("system", STATE_EXTRACTION), ("human", "{query}")])
+def format_state_comparison(json_string):
+    data = json.loads(json_string)
+    report = "### State-Level Comparison\n"
+    for state, details in data.items():
+        if state == "data_sources_used": continue
+        report += f"\n**Results for {state.title()}:**\n- **Normal Annual Rainfall:** {details.get('normal_annual_rainfall_mm', 'N/A')} mm\n- **Top Crops by Production:**\n"
+        if details.get('top_crops'):
+            for crop in details['top_crops']: report += f"  - {crop.get('Crop', '').title()}: {int(crop.get('Production', 0)):,} tonnes\n"
+        else: report += "  - No crop data found for the specified criteria.\n"
+    if "data_sources_used" in data:
+        report += "\n---\n*Sources:*\n"; [report := report + f"- *{s}*\n" for s in data["data_sources_used"]]
+    return report
+
+# Specialist 2: District Extrema
+DISTRICT_EXTRACTION = "Extract the two states, the specific crop, and the single year."
+parser_district_prompt = ChatPromptTemplate.from_messages([("system", DISTRICT_EXTRACTION), ("human", "{query}")])
+def format_district_comparison(h_json, l_json):
+    h, l = json.loads(h_json), json.loads(l_json)
+    if "error" in h or "error" in l: return f"Error:\n- Highest: {h.get('error', 'N/A')}\n- Lowest: {l.get('error', 'N/A')}"
+    report = f"""### District-Level Production Comparison\nFor **{h['year']}**:\n- The district with the **highest** production of **{h['crop']}** in **{h['state']}** was **{h['district']}** ({h['production_tonnes']:,} tonnes).\n- The district with the **lowest** (non-zero) production of **{l['crop']}** in **{l['state']}** was **{l['district']}** ({l['production_tonnes']:,} tonnes)."""
+    if "data_sources_used" in h:
+        report += "\n\n---\n*Source:*\n"; [report := report + f"- *{s}*\n" for s in h["data_sources_used"]]
+    return report
+
+# Specialist 3: Trend Analysis
+TREND_EXTRACTION = "Extract the region, crop type, start and end year for the trend analysis."
+parser_trend_prompt = ChatPromptTemplate.from_messages([("system", TREND_EXTRACTION), ("human", "{query}")])
+def format_trend_analysis(json_string):
+    data = json.loads(json_string)
+    if "error" in data: return f"Error: {data['error']}"
+    report = f"### Production Trend for {data['crop_type']} in {data['region']} ({data['period']})\n"
+    for item in data.get('production_trend_tonnes', []): report += f"- **{item['Crop_Year']}**: {int(item['Production']):,} tonnes\n"
+    report += f"\n**Correlation Context:**\n- The normal annual rainfall for this region is **{data.get('normal_annual_rainfall_mm_for_correlation', 'N/A')} mm**. *({data.get('note', '')})*"
+    if "data_sources_used" in data:
+        report += "\n\n---\n*Sources:*\n"; [report := report + f"- *{s}*\n" for s in data["data_sources_used"]]
+    return report
+
+# Specialist 4: Policy Advice
+POLICY_EXTRACTION = "Extract the region, the two crops for comparison, and the number of years from the policy query."
+parser_policy_prompt = ChatPromptTemplate.from_messages([("system", POLICY_EXTRACTION), ("human", "{query}")])
+synthesis_prompt = ChatPromptTemplate.from_messages([
+    ("system", "You are an expert policy advisor. Your task is to use the provided data to generate three distinct, compelling, data-backed arguments to support a policy decision. Frame the arguments clearly and concisely."),
+    ("human", """**Policy Proposal:** Promote the cultivation of **{crop_a}** over **{crop_b}** in **{region}**.
+        \n**Supporting Data:**\n```json\n{evidence}\n```\nPlease generate the three most compelling, data-backed arguments based *only* on the data provided.""")
+])
+SYNTHESIS_TEMPERATURE = 0.3
+def synthesize_arguments(evidence_json: str, crop_a: str, crop_b: str, region: str, chains: "PipelineChains" = None, on_token=None) -> str:
+    """Takes raw data and uses an LLM to generate reasoned arguments.
+
+    With on_token, the answer is streamed: on_token(chunk) is called for each piece of
+    text as it arrives, and the time to the first one is recorded on the current span.
+    """
+    inputs = {"crop_a": crop_a, "crop_b": crop_b, "region": region, "evidence": evidence_json}
+    synthesis = (chains or get_chains()).synthesis
+    if on_token is None:
+        return synthesis.invoke(inputs)
+    start, chunks = time.perf_counter(), []
+    for chunk in synthesis.stream(inputs):
+        if not chunks:
+            _record_first_token(start)
+        chunks.append(chunk)
+        on_token(chunk)
+    return ''.join(chunks)
+
+async def asynthesize_arguments(evidence_json: str, crop_a: str, crop_b: str, region: str, chains: "PipelineChains" = None, on_token=None) -> str:
+    """Async counterpart of synthesize_arguments."""
+    inputs = {"crop_a": crop_a, "crop_b": crop_b, "region": region, "evidence": evidence_json}
+    synthesis = (chains or get_chains()).synthesis
+    if on_token is None:
+        return await synthesis.ainvoke(inputs)
+    start, chunks = time.perf_counter(), []
+    async for chunk in synthesis.astream(inputs):
+        if not chunks:
+            _record_first_token(start)
+        chunks.append(chunk)
+        on_token(chunk)
+    return ''.join(chunks)
+
+def _record_first_token(start: float):
+    s = current_span()
+    if s is not None:
+        s.set(ttft_s=time.perf_counter() - start)
+
+# --- Single-Call Mode: Combined Route + Extract ---
+combined_prompt = ChatPromptTemplate.from_messages([
+    ("system", ROUTER_SYSTEM_PROMPT + f"""
+In the same answer, extract the arguments for the category you chose:
+- `{QueryType.STATE_COMPARISON.value}`: {STATE_EXTRACTION}
+- `{QueryType.DISTRICT_EXTREMA.value}`: {DISTRICT_EXTRACTION}
+- `{QueryType.TREND_ANALYSIS.value}`: {TREND_EXTRACTION}
+- `{QueryType.POLICY_ADVICE.value}`: {POLICY_EXTRACTION}
+- `{QueryType.UNKNOWN.value}`: no arguments.
+Fill only the argument field named after the category.
+"""),
+    ("human", "{query}")
+])
+
+UNKNOWN_QUERY_MESSAGE = "I am currently equipped to handle four types of queries: State Comparisons, District Comparisons, Trend Analysis, and Policy Advice. Please try rephrasing your question to fit one of these formats."
+POLICY_REPORT_HEADING = "### Policy Recommendation Arguments\n\n"
+
+
+# --- Chains ---
+class PipelineChains:
+    """The router, parser, combined and synthesis chains, bound to one chat model (a stub in offline runs).
+
+    Synthesis may use its own model (Gemini's runs at a higher temperature). With a
+    cache, every chain answers repeated questions from it instead of the model.
+    """
+
+    def __init__(self, llm, cache: LLMCache = None, synthesis_llm=None):
+        def chain(name, prompt, schema):
+            runnable = prompt | llm.with_structured_output(schema)
+            return cache.wrap(name, prompt, llm, runnable, schema) if cache is not None else runnable
+        synthesis_llm = synthesis_llm or llm
+        self.synthesis = synthesis_prompt | synthesis_llm | StrOutputParser()
+        if cache is not None:
+            self.synthesis = cache.wrap('synthesis', synthesis_prompt, synthesis_llm, self.synthesis, streaming=True)
+        self.router = chain('router', router_prompt, RouteQuery)
+        self.combined = chain('combined', combined_prompt, CombinedQuery)
+        self.parsers = {
+            QueryType.STATE_COMPARISON: chain('parser_state', parser_state_prompt, StateInput),
+            QueryType.DISTRICT_EXTREMA: chain('parser_district', parser_district_prompt, DistrictInput),
+            QueryType.TREND_ANALYSIS: chain('parser_trend', parser_trend_prompt, TrendInput),
+            QueryType.POLICY_ADVICE: chain('parser_policy', parser_policy_prompt, PolicyInput),
+        }
+
+_default_chains = None
+_default_chains_lock = threading.Lock()
+def get_chains() -> PipelineChains:
+    """The process-wide Gemini-backed, cached chains, built on first use (requires GOOGLE_API_KEY).
+
+    Both models come from samarth_app.llm_clients, so they share one gRPC channel.
+    """
+    global _default_chains
+    with _default_chains_lock:
+        if _default_chains is None:
+            _default_chains = PipelineChains(
+                get_chat_model(0), cache=get_llm_cache(), synthesis_llm=get_chat_model(SYNTHESIS_TEMPERATURE),
+            )
+        return _default_chains
+
+
+# --- Query Execution ---
+# Spinner labels for each stage, used by the Streamlit UI.
+STAGE_LABELS = {
+    'routing': "1. Routing query to the correct analytical tool...",
+    'parsing': "2. Parsing query and fetching data...",
+    'synthesis': "3. Synthesizing data-backed arguments...",
+}
+
+def fetch_report(query_type: QueryType, args) -> str:
+    """Runs the data tools for parsed arguments and formats the report (policy queries return the raw evidence JSON)."""
+    if query_type == QueryType.STATE_COMPARISON:
+        data = get_state_comparison_data(states=args.states, year=args.year, top_n=args.top_n, crop_type=args.crop_type)
+        with span('format'):
+            return format_state_comparison(data)
+    if query_type == QueryType.DISTRICT_EXTREMA:
+        h_json = find_district_production_extrema(state=args.state_1, year=args.year, crop=args.crop_1, find='highest')
+        l_json = find_district_production_extrema(state=args.state_2, year=args.year, crop=args.crop_1, find='lowest') # Use crop_1 for both
+        with span('format'):
+            return format_district_comparison(h_json, l_json)
+    if query_type == QueryType.TREND_ANALYSIS:
+        data = get_trend_analysis_data(region=args.region, crop_type=args.crop_type, start_year=args.start_year, end_year=args.end_year)
+        with span('format'):
+            return format_trend_analysis(data)
+    if query_type == QueryType.POLICY_ADVICE:
+        return get_policy_analysis_data(region=args.region, crop_a=args.crop_a, crop_b=args.crop_b, years=args.years)
+    raise ValueError(f"No data tools for query type {query_type}.")
+
+def warm_worker():
+    """Process-pool initializer: loads the datasets once per worker process, before its first report."""
+    import samarth_app.data_tools  # noqa: F401
+
+def route_and_parse(question: str, chains: PipelineChains = None, combined: bool = False, stage=None, fast_path: bool = True):
+    """Classifies the question and extracts its arguments.
+
+    With fast_path, the local gazetteer parser (samarth_app.fast_path) answers
+    template-shaped questions without any LLM call. Otherwise two-stage mode calls
+    the router, then the matching parser; combined mode makes a single
+    structured-output call, falling back to the parser if the model left the chosen
+    variant empty. Returns (query_type, args, llm_calls, timings).
+    """
+    if fast_path:
+        t = time.perf_counter()
+        with span('fast_path') as s:
+            parsed = try_fast_path(question)
+            s.set(hit=parsed is not None)
+        if parsed is not None:
+            return (*parsed, 0, {'fast_path': time.perf_counter() - t})
+    query_type, args, calls, timings = _llm_route_and_parse(question, chains, combined, stage)
+    if fast_path:
+        fast_path_stats.record_miss(sum(timings.values()))
+    return query_type, args, calls, timings
+
+def _llm_route_and_parse(question: str, chains: PipelineChains, combined: bool, stage):
+    chains = chains or get_chains()
+    stage = stage or (lambda name: nullcontext())
+    inputs, timings = {"query": question}, {}
+    t = time.perf_counter()
+    with stage('routing'), span('routing', combined=combined):
+        if combined:
+            query = chains.combined.invoke(inputs)
+            query_type, args = query.query_type, query.selected_args()
+        else:
+            query_type, args = chains.router.invoke(inputs).query_type, None
+    timings['routing'] = time.perf_counter() - t  # includes argument extraction in combined mode
+    calls = 1
+    if query_type == QueryType.UNKNOWN or args is not None:
+        return query_type, args, calls, timings
+    with stage('parsing'), span('parsing', query_type=query_type.value):
+        t = time.perf_counter()
+        args = chains.parsers[query_type].invoke(inputs)
+        timings['parsing'] = time.perf_counter() - t
+    return query_type, args, calls + 1, timings
+
+def run_query(question: str, chains: PipelineChains = None, stage=None, combined: bool = False, fast_path: bool = True, on_token=None) -> QueryResult:
+    """Serial pipeline: route, parse, fetch data, then synthesize for policy queries.
+
+    stage(name) may return a context manager wrapped around each stage (e.g. a spinner).
+    on_token(chunk) receives the synthesized arguments as they stream in (see
+    synthesize_arguments). The whole query is traced; its spans come back on the result.
+    """
+    with trace('query', mode='serial', combined=combined, question=question) as root:
+        result = _run_query(question, chains, stage, combined, fast_path, on_token)
+        root.set(query_type=result.query_type.value)
+    result.spans = [s.to_dict() for s in root.children]
+    return result
+
+def _run_query(question: str, chains: PipelineChains, stage, combined: bool, fast_path: bool, on_token) -> QueryResult:
+    stage = stage or (lambda name: nullcontext())
+    start = time.perf_counter()
+    chains = chains or get_chains()
+    query_type, args, _, timings = route_and_parse(question, chains, combined, stage, fast_path)
+    if query_type == QueryType.UNKNOWN:
+        return QueryResult(query_type, UNKNOWN_QUERY_MESSAGE, timings={**timings, 'total': time.perf_counter() - start})
+
+    with stage('parsing'):
+        t = time.perf_counter()
+        with span('data', query_type=query_type.value):
+            report = fetch_report(query_type, args)
+        timings['data'] = time.perf_counter() - t
+        if query_type == QueryType.POLICY_ADVICE:
+            with stage('synthesis'), span('synthesis', streamed=on_token is not None) as s:
+                t = time.perf_counter()
+                report = POLICY_REPORT_HEADING + synthesize_arguments(report, crop_a=args.crop_a, crop_b=args.crop_b, region=args.region, chains=chains, on_token=on_token)
+                timings['synthesis'] = time.perf_counter() - t
+            if 'ttft_s' in s.attrs:
+                timings['first_token'] = s.attrs['ttft_s']
+
+    timings['total'] = time.perf_counter() - start
+    return QueryResult(query_type, report, args, timings)
+
+
+# --- Concurrent (asyncio) Execution ---
+# Cheap keyword hints used to guess which parsers to start before the router answers.
+ROUTE_HINTS = {
+    QueryType.DISTRICT_EXTREMA: ('district', 'highest', 'lowest'),
+    QueryType.TREND_ANALYSIS: ('trend', 'decade', 'over the last', 'between'),
+    QueryType.POLICY_ADVICE: ('policy', 'promote', 'argument', 'recommend'),
+    QueryType.STATE_COMPARISON: ('compare', 'top', 'rainfall'),
+}
+SPECULATIVE_PARSERS = 2
+
+def likely_query_types(question: str) -> list[QueryType]:
+    """Query types ordered by how many of their hint words appear in the question."""
+    text = question.lower()
+    scores = {qt: sum(hint in text for hint in hints) for qt, hints in ROUTE_HINTS.items()}
+    return sorted(scores, key=lambda qt: -scores[qt])
+
+async def afetch_report(query_type: QueryType, args) -> str:
+    """Async fetch_report: data tools run in worker threads, the two extrema lookups concurrently."""
+    if query_type == QueryType.DISTRICT_EXTREMA:
+        h_json, l_json = await asyncio.gather(
+            asyncio.to_thread(find_district_production_extrema, state=args.state_1, year=args.year, crop=args.crop_1, find='highest'),
+            asyncio.to_thread(find_district_production_extrema, state=args.state_2, year=args.year, crop=args.crop_1, find='lowest'),
+        )
+        with span('format'):
+            return format_district_comparison(h_json, l_json)
+    return await asyncio.to_thread(fetch_report, query_type, args)
+
+async def aroute_and_parse(question: str, chains: PipelineChains = None, combined: bool = False, speculate: int = SPECULATIVE_PARSERS,
+                           fast_path: bool = True, llm_slot=None):
+    """Async route_and_parse. Fast-path hits skip the LLM entirely. In two-stage mode the
+    router and the `speculate` most likely parsers start together; once the route is known
+    the other parsers are cancelled, and if the winning parser was not started
+    speculatively it runs after the router. llm_slot() may return an async context
+    manager held around the LLM calls only (e.g. a concurrency limit), so fast-path
+    hits never wait for it.
+
+    Returns (query_type, args, timings, speculation_hit).
+    """
+    if fast_path:
+        t = time.perf_counter()
+        with span('fast_path') as s:
+            parsed = try_fast_path(question)
+            s.set(hit=parsed is not None)
+        if parsed is not None:
+            return (*parsed, {'fast_path': time.perf_counter() - t}, None)
+    async with (llm_slot or nullcontext)():
+        query_type, args, timings, speculation_hit = await _allm_route_and_parse(question, chains, combined, speculate)
+    if fast_path:
+        fast_path_stats.record_miss(sum(timings.values()))
+    return query_type, args, timings, speculation_hit
+
+async def _allm_route_and_parse(question: str, chains: PipelineChains, combined: bool, speculate: int):
+    chains = chains or get_chains()
+    inputs, timings, start = {"query": question}, {}, time.perf_counter()
+    if combined:
+        with span('routing', combined=True):
+            query = await chains.combined.ainvoke(inputs)
+        timings['routing'] = time.perf_counter() - start  # includes argument extraction
+        args = query.selected_args()
+        if query.query_type != QueryType.UNKNOWN and args is None:
+            t = time.perf_counter()
+            with span('parsing', query_type=query.query_type.value):
+                args = await chains.parsers[query.query_type].ainvoke(inputs)
+            timings['parsing'] = time.perf_counter() - t
+        return query.query_type, args, timings, None
+
+    async def parse(qt: QueryType, speculative: bool):
+        with span('parsing', query_type=qt.value, speculative=speculative):
+            return await chains.parsers[qt].ainvoke(inputs)
+
+    parser_tasks = {qt: asyncio.create_task(parse(qt, True)) for qt in likely_query_types(question)[:speculate]}
+    try:
+        with span('routing', combined=False):
+            query_type = (await chains.router.ainvoke(inputs)).query_type
+        timings['routing'] = time.perf_counter() - start
+        losers = [task for qt, task in parser_tasks.items() if qt != query_type]
+        for task in losers:
+            task.cancel()
+        await asyncio.gather(*losers, return_exceptions=True)
+        if query_type == QueryType.UNKNOWN:
+            return query_type, None, timings, None
+
+        t = time.perf_counter()
+        speculation_hit = query_type in parser_tasks
+        args = await (parser_tasks[query_type] if speculation_hit else parse(query_type, False))
+        timings['parsing'] = time.perf_counter() - t  # only the wait left after routing
+        return query_type, args, timings, speculation_hit
+    finally:
+        for task in parser_tasks.values():
+            task.cancel()
+
+async def arun_query(question: str, chains: PipelineChains = None, speculate: int = SPECULATIVE_PARSERS, combined: bool = False, fast_path: bool = True, on_token=None) -> QueryResult:
+    """Concurrent pipeline: speculative routing/parsing, then data tools in worker threads."""
+    with trace('query', mode='concurrent', combined=combined, question=question) as root:
+        result = await _arun_query(question, chains, speculate, combined, fast_path, on_token)
+        root.set(query_type=result.query_type.value)
+    result.spans = [s.to_dict() for s in root.children]
+    return result
+
+async def _arun_query(question: str, chains: PipelineChains, speculate: int, combined: bool, fast_path: bool, on_token) -> QueryResult:
+    start = time.perf_counter()
+    query_type, args, timings, speculation_hit = await aroute_and_parse(question, chains, combined, speculate, fast_path)
+    if query_type == QueryType.UNKNOWN:
+        return QueryResult(query_type, UNKNOWN_QUERY_MESSAGE, timings={**timings, 'total': time.perf_counter() - start})
+
+    t = time.perf_counter()
+    with span('data', query_type=query_type.value):
+        report = await afetch_report(query_type, args)
+    timings['data'] = time.perf_counter() - t
+    if query_type == QueryType.POLICY_ADVICE:
+        t = time.perf_counter()
+        with span('synthesis', streamed=on_token is not None) as s:
+            report = POLICY_REPORT_HEADING + await asynthesize_arguments(report, crop_a=args.crop_a, crop_b=args.crop_b, region=args.region, chains=chains, on_token=on_token)
+        timings['synthesis'] = time.perf_counter() - t
+        if 'ttft_s' in s.attrs:
+            timings['first_token'] = s.attrs['ttft_s']
+
+    timings['total'] = time.perf_counter() - start
+    return QueryResult(query_type, report, args, timings, speculation_hit)
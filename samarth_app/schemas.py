@@ -0,0 +1,56 @@
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+# --- Query Types (the router's output) ---
+class QueryType(str, Enum):
+    STATE_COMPARISON = "state_comparison"
+    DISTRICT_EXTREMA = "district_extrema"
+    TREND_ANALYSIS = "trend_analysis"
+    POLICY_ADVICE = "policy_advice"
+    UNKNOWN = "unknown"
+
+class RouteQuery(BaseModel):
+    query_type: QueryType = Field(..., description="The type of query the user is asking.")
+
+
+# --- Specialist Inputs (the parsers' outputs) ---
+class StateInput(BaseModel):
+    states: List[str]; year: int; top_n: int; crop_type: Optional[str] = None
+class DistrictInput(BaseModel):
+    state_1: str; crop_1: str; state_2: str; crop_2: str; year: int
+class TrendInput(BaseModel):
+    region: str; crop_type: str; start_year: int; end_year: int
+class PolicyInput(BaseModel):
+    region: str; crop_a: str; crop_b: str; years: int
+
+# --- Single-Call Mode: Combined Route + Extract ---
+# One structured-output call returns the query type plus the arguments for it: a
+# discriminated union of the four input schemas and `unknown`. Gemini function
+# declarations cannot express anyOf, so the union travels as a tag plus one
+# optional field per variant, named after the tag.
+class CombinedQuery(BaseModel):
+    query_type: QueryType = Field(..., description="The type of query the user is asking.")
+    state_comparison: Optional[StateInput] = Field(None, description="Arguments, only for state_comparison queries.")
+    district_extrema: Optional[DistrictInput] = Field(None, description="Arguments, only for district_extrema queries.")
+    trend_analysis: Optional[TrendInput] = Field(None, description="Arguments, only for trend_analysis queries.")
+    policy_advice: Optional[PolicyInput] = Field(None, description="Arguments, only for policy_advice queries.")
+
+    def selected_args(self):
+        """The arguments of the variant named by query_type (None for unknown or if missing)."""
+        return None if self.query_type == QueryType.UNKNOWN else getattr(self, self.query_type.value)
+
+
+# --- What a query returns ---
+# A plain dataclass, not a pipeline type, so the thin client (app.py with
+# SAMARTH_API_URL set) can build one without importing the pipeline or the data.
+@dataclass
+class QueryResult:
+    query_type: QueryType
+    report: str
+    args: Optional[BaseModel] = None
+    timings: dict = field(default_factory=dict)  # stage -> seconds
+    speculation_hit: Optional[bool] = None  # concurrent mode: was the winning parser already running?
+    spans: list = field(default_factory=list)  # the query's trace, as span dicts (see samarth_app.telemetry)
@@ -0,0 +1,211 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+
+from samarth_app.llm_cache import normalize_query
+from samarth_app.pipeline import (
+    POLICY_REPORT_HEADING, UNKNOWN_QUERY_MESSAGE, PipelineChains, QueryType,
+    afetch_report, aroute_and_parse, asynthesize_arguments, fetch_report, get_chains, warm_worker,
+)
+from samarth_app.telemetry import span, trace
+
+# --- Query Service ---
+# The engine behind the HTTP API (server.py). It answers free-text questions and
+# the four analyses from already-parsed arguments. Three rules keep it steady under
+# load:
+#   - LLM stages (routing, parsing, synthesis) wait for one of `llm_concurrency`
+#     slots, as in the batch runner.
+#   - Data tools and report formatting run in a pool of spawned worker processes,
+#     so pandas work never blocks the event loop. With workers=0 they run in
+#     threads of this process.
+#   - Identical requests that arrive while one is still being answered share its
+#     answer (singleflight). At most `max_in_flight` answers are computed at once:
+#     each holds its admission until it finishes, even if every caller has given
+#     up waiting, and stops after `timeout` seconds. Requests that would start
+#     another one are turned away at once with ServiceBusy instead of queueing
+#     without bound.
+# Limits default from the environment, like the data backend.
+WORKERS = int(os.getenv('SAMARTH_WORKERS', min(4, os.cpu_count() or 1)))
+LLM_CONCURRENCY = int(os.getenv('SAMARTH_LLM_CONCURRENCY', 4))
+MAX_IN_FLIGHT = int(os.getenv('SAMARTH_MAX_IN_FLIGHT', 64))
+REQUEST_TIMEOUT_SECONDS = float(os.getenv('SAMARTH_REQUEST_TIMEOUT', 120))
+
+
+class ServiceBusy(Exception):
+    """Raised when `max_in_flight` requests are already being answered."""
+
+
+class Singleflight:
+    """Runs one computation per key at a time; callers with the same key wait for it.
+
+    The computation is shielded: a caller that gives up (a client disconnect or a
+    timeout) does not cancel it for the others. Not thread-safe; use it from one
+    event loop.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.leaders, self.coalesced = 0, 0
+
+    async def do(self, key, compute) -> tuple:
+        """(result, shared): shared is True if the result came from another caller's computation.
+
+        compute() returns an awaitable; if it raises instead, nothing is registered.
+        """
+        future = self._calls.get(key)
+        shared = future is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            future = self._calls[key] = asyncio.ensure_future(compute())
+            self.leaders += 1
+            future.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(future), shared
+
+    def _finish(self, key, future):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        if not future.cancelled():
+            future.exception()  # retrieved, so an error nobody awaited is not logged as lost
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+def _timed_fetch_report(query_type: QueryType, args) -> tuple[str, float]:
+    """fetch_report, with the seconds it took inside the worker."""
+    start = time.perf_counter()
+    return fetch_report(query_type, args), time.perf_counter() - start
+
+
+class QueryService:
+    """Answers questions and analyses with bounded concurrency. Create and use it inside one event loop.
+
+    Chains default to the process-wide Gemini chains, built on the first LLM call,
+    so the analyses that need no LLM also run without an API key. Each worker
+    process runs initializer(*initargs) once; the default loads the datasets.
+    """
+
+    def __init__(self, chains: PipelineChains = None, workers: int = WORKERS, llm_concurrency: int = LLM_CONCURRENCY,
+                 max_in_flight: int = MAX_IN_FLIGHT, timeout: float = REQUEST_TIMEOUT_SECONDS,
+                 initializer=None, initargs: tuple = ()):
+        self._chains = chains
+        # Spawned (not forked) workers: the parent may already hold gRPC threads.
+        self.pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=initializer or warm_worker, initargs=initargs) if workers else None
+        self.workers, self.max_in_flight, self.timeout = workers, max_in_flight, timeout
+        self.llm_slots = asyncio.Semaphore(llm_concurrency)
+        self.singleflight = Singleflight()
+        self.in_flight, self.served, self.rejected, self.failed = 0, 0, 0, 0
+
+    async def warm(self):
+        """Starts the worker processes, which load the datasets, before the first request needs them."""
+        if self.pool is not None:
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(self.pool, warm_worker) for _ in range(self.workers)))
+
+    @property
+    def chains(self) -> PipelineChains:
+        return self._chains or get_chains()
+
+    def _admit(self, compute) -> asyncio.Task:
+        """Starts a computation if fewer than max_in_flight are running, else raises ServiceBusy."""
+        if self.in_flight >= self.max_in_flight:
+            self.rejected += 1
+            raise ServiceBusy(f"{self.in_flight} requests in flight; retry shortly.")
+        self.in_flight += 1
+        task = asyncio.ensure_future(asyncio.wait_for(compute(), self.timeout))
+        task.add_done_callback(self._release)
+        return task
+
+    def _release(self, task: asyncio.Task):
+        self.in_flight -= 1
+        if task.cancelled() or task.exception() is not None:
+            self.failed += 1
+        else:
+            self.served += 1
+
+    async def ask(self, question: str, combined: bool = False, fast_path: bool = True) -> dict:
+        """Routes, parses and answers a free-text question.
+
+        Returns a record with query_type, args, report, timings, latency_s, spans
+        and coalesced. Besides the pipeline stages, timings hold llm_queue (waiting
+        for LLM slots) and data_queue (waiting for a worker). Raises ServiceBusy,
+        asyncio.TimeoutError, or whatever the pipeline raised.
+        """
+        key = ('query', normalize_query(question), combined, fast_path)
+        return await self._run(key, lambda: self._answer(question, combined, fast_path))
+
+    async def analyze(self, query_type: QueryType, args) -> dict:
+        """Answers one analysis from parsed arguments (a StateInput, DistrictInput, TrendInput or PolicyInput)."""
+        key = ('analysis', query_type.value, args.model_dump_json())
+        return await self._run(key, lambda: self._traced('analysis', self._complete(query_type, args, {}), query_type=query_type.value))
+
+    async def _run(self, key: tuple, compute) -> dict:
+        start = time.perf_counter()
+        record, shared = await self.singleflight.do(key, lambda: self._admit(compute))
+        return {**record, 'latency_s': time.perf_counter() - start, 'coalesced': shared}
+
+    async def _traced(self, name: str, answering, **attrs) -> dict:
+        start = time.perf_counter()
+        with trace(name, mode='service', **attrs) as root:
+            record = await answering
+            root.set(query_type=record['query_type'])
+        record['timings']['total'] = time.perf_counter() - start
+        record['spans'] = [s.to_dict() for s in root.children]
+        return record
+
+    async def _answer(self, question: str, combined: bool, fast_path: bool) -> dict:
+        async def answering():
+            waits = {}
+            query_type, args, timings, speculation_hit = await aroute_and_parse(
+                question, self._chains, combined, fast_path=fast_path, llm_slot=lambda: self._llm_slot(waits))
+            timings.update(waits)
+            if query_type == QueryType.UNKNOWN:
+                return {'query_type': query_type.value, 'args': None, 'report': UNKNOWN_QUERY_MESSAGE, 'timings': timings}
+            return {**await self._complete(query_type, args, timings), 'speculation_hit': speculation_hit}
+        return await self._traced('query', answering(), combined=combined, question=question)
+
+    async def _complete(self, query_type: QueryType, args, timings: dict) -> dict:
+        """Data tools, report formatting and (for policy queries) synthesis."""
+        t = time.perf_counter()
+        with span('data', query_type=query_type.value):  # with a pool, the tool spans stay in the worker process
+            report, timings['data'] = await self._report(query_type, args)
+        timings['data_queue'] = time.perf_counter() - t - timings['data']
+        if query_type == QueryType.POLICY_ADVICE:
+            async with self._llm_slot(timings):
+                t = time.perf_counter()
+                with span('synthesis'):
+                    report = POLICY_REPORT_HEADING + await asynthesize_arguments(
+                        report, crop_a=args.crop_a, crop_b=args.crop_b, region=args.region, chains=self.chains)
+                timings['synthesis'] = time.perf_counter() - t
+        return {'query_type': query_type.value, 'args': args.model_dump(), 'report': report, 'timings': timings}
+
+    @asynccontextmanager
+    async def _llm_slot(self, timings: dict):
+        """Holds an LLM slot, adding the wait for it to timings['llm_queue']."""
+        t = time.perf_counter()
+        async with self.llm_slots:
+            timings['llm_queue'] = timings.get('llm_queue', 0.0) + time.perf_counter() - t
+            yield
+
+    async def _report(self, query_type: QueryType, args) -> tuple[str, float]:
+        """(report, seconds spent computing it)."""
+        if self.pool is None:
+            t = time.perf_counter()
+            return await afetch_report(query_type, args), time.perf_counter() - t
+        return await asyncio.get_running_loop().run_in_executor(self.pool, _timed_fetch_report, query_type, args)
+
+    def stats(self) -> dict:
+        return {
+            'in_flight': self.in_flight, 'max_in_flight': self.max_in_flight, 'workers': self.workers,
+            'served': self.served, 'rejected': self.rejected, 'failed': self.failed,
+            'computed': self.singleflight.leaders, 'coalesced': self.singleflight.coalesced,
+        }
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
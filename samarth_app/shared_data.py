@@ -0,0 +1,103 @@
+import glob
+import hashlib
+import json
+import os
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+
+from samarth_app.dataset_io import SCHEMA_VERSION, artifact_path, load_dataset, read_table, write_table
+
+try:
+    import fcntl
+except ImportError:  # Windows: segment builds are not serialized, at worst two workers build the same file
+    fcntl = None
+
+# --- Compact, Host-Shared Datasets ---
+# Every worker process used to hold its own copy of the datasets: strings as
+# Python objects and every column the cleaner wrote. The compact form keeps
+# only the columns the tools read. Strings become categoricals with sorted
+# categories, so code order is name order. Integers are downcast to the
+# smallest type that holds them. Float measures stay float64, because sums and
+# means over float32 would change the answers. The first process to load a
+# dataset publishes the compact frame as an uncompressed Arrow file in shared
+# memory (/dev/shm where available). Every process, the publisher included,
+# then memory-maps that file and wraps its buffers without copying. A host
+# therefore holds one copy however many workers it runs, and the arrays are
+# read-only.
+SHARED_DIR = os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'samarth')
+
+
+def compact_frame(df: pd.DataFrame, columns: list[str] = None) -> pd.DataFrame:
+    """df restricted to `columns`, with strings as sorted categoricals and integers downcast (values unchanged)."""
+    if columns is not None:
+        df = df[[column for column in columns if column in df.columns]]
+    compact = {}
+    for name, column in df.items():
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            categories = column.cat.categories
+            compact[name] = column if list(categories) == sorted(categories) else column.cat.reorder_categories(sorted(categories))
+        elif pd.api.types.is_object_dtype(column) or pd.api.types.is_string_dtype(column):
+            compact[name] = pd.Categorical(column, categories=sorted(column.dropna().unique()))
+        elif pd.api.types.is_integer_dtype(column):
+            compact[name] = pd.to_numeric(column, downcast='integer')
+        else:
+            compact[name] = column
+    return pd.DataFrame(compact, index=pd.RangeIndex(len(df)))
+
+
+def segment_path(name: str, source_paths: list[str], columns: list[str], directory: str = SHARED_DIR) -> str:
+    """Path of the shared segment for a dataset; it changes whenever a source file or the column set does."""
+    signature = [SCHEMA_VERSION, columns]
+    for path in source_paths:
+        st = os.stat(path) if os.path.exists(path) else None
+        signature.append([path, st.st_mtime_ns, st.st_size] if st else [path, None])
+    digest = hashlib.sha256(json.dumps(signature).encode()).hexdigest()[:16]
+    return os.path.join(directory, f'{name}-{digest}.arrow')
+
+
+def publish(df: pd.DataFrame, path: str):
+    """Writes df as a single-chunk, uncompressed Arrow file at path, atomically."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    write_table(df, tmp)
+    os.replace(tmp, path)
+
+
+def attach(path: str) -> pd.DataFrame:
+    """Memory-maps a published segment as a DataFrame whose columns are read-only views of the shared pages."""
+    return read_table(path).to_pandas(split_blocks=True)
+
+
+def _remove_stale(name: str, keep: str):
+    for path in glob.glob(os.path.join(os.path.dirname(keep), f'{name}-*.arrow')):
+        if path != keep:
+            try:
+                os.remove(path)  # processes still mapping it keep their pages until they reload
+            except OSError:
+                pass
+
+
+def load_shared(name: str, csv_path: str, columns: list[str], directory: str = SHARED_DIR) -> pd.DataFrame:
+    """The compact form of a processed dataset, attached from (and if needed first published to) shared memory.
+
+    Raises FileNotFoundError when neither the CSV nor its Arrow artifact exists.
+    """
+    sources = [csv_path, artifact_path(csv_path)]
+    if not any(os.path.exists(path) for path in sources):
+        raise FileNotFoundError(csv_path)
+    path = segment_path(name, sources, columns, directory)
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f'{name}.lock'), 'w') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)  # one worker builds, the others wait and attach
+            if not os.path.exists(path):
+                publish(compact_frame(load_dataset(csv_path), columns), path)
+                _remove_stale(name, path)
+    try:
+        return attach(path)
+    except (OSError, ValueError, pa.ArrowInvalid) as e:
+        print(f"⚠️ Could not attach the shared '{name}' dataset, loading a private copy: {e}")
+        return compact_frame(load_dataset(csv_path), columns)
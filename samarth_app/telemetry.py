@@ -0,0 +1,185 @@
+import asyncio
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+# --- Spans, Traces and Metrics ---
+# Each query runs inside a root span (a trace). Pipeline stages and data-tool
+# calls open child spans, which record their duration plus attributes such as
+# rows_scanned and result_bytes. The current span lives in a context variable,
+# so it follows asyncio tasks and asyncio.to_thread workers. Every finished span
+# is added to the Prometheus-style metrics. Traces are written as JSON lines
+# only after enable_export().
+TELEMETRY_DIR = os.path.join('data', 'telemetry')
+TRACE_FILE_NAME = 'traces.jsonl'
+METRICS_FILE_NAME = 'metrics.prom'
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current_span = contextvars.ContextVar('samarth_current_span', default=None)
+
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_id: str = None, attrs: dict = None, root: "Span" = None):
+        self.name, self.trace_id, self.parent_id = name, trace_id, parent_id
+        self._root = root  # the trace this span belongs to (None for detached spans)
+        self.span_id = uuid.uuid4().hex[:16]
+        self.attrs = dict(attrs or {})
+        self.start_time, self._start = time.time(), time.perf_counter()
+        self.duration_s, self.error = None, None
+        self.children = []  # only filled on root spans: every span of the trace, in finishing order
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, key: str, amount: float):
+        self.attrs[key] = self.attrs.get(key, 0) + amount
+
+    def to_dict(self) -> dict:
+        return {
+            'trace_id': self.trace_id, 'span_id': self.span_id, 'parent_id': self.parent_id, 'name': self.name,
+            'start_time': self.start_time, 'duration_s': self.duration_s, 'error': self.error, **self.attrs,
+        }
+
+
+class Metrics:
+    """Duration histograms and row/byte counters per span name, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = defaultdict(lambda: [0] * len(DURATION_BUCKETS))
+        self._count, self._sum = defaultdict(int), defaultdict(float)
+        self._errors, self._rows, self._bytes = defaultdict(int), defaultdict(int), defaultdict(int)
+
+    def observe(self, span: Span):
+        with self._lock:
+            name = span.name
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if span.duration_s <= bound:
+                    self._buckets[name][i] += 1
+            self._count[name] += 1
+            self._sum[name] += span.duration_s
+            self._errors[name] += span.error is not None
+            self._rows[name] += span.attrs.get('rows_scanned', 0)
+            self._bytes[name] += span.attrs.get('result_bytes', 0)
+
+    def render(self) -> str:
+        with self._lock:
+            lines = ['# HELP samarth_span_duration_seconds Duration of pipeline stages and data-tool calls.',
+                     '# TYPE samarth_span_duration_seconds histogram']
+            for name in sorted(self._count):
+                for bound, count in zip(DURATION_BUCKETS, self._buckets[name]):
+                    lines.append(f'samarth_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+                lines.append(f'samarth_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {self._count[name]}')
+                lines.append(f'samarth_span_duration_seconds_sum{{span="{name}"}} {self._sum[name]:.6f}')
+                lines.append(f'samarth_span_duration_seconds_count{{span="{name}"}} {self._count[name]}')
+            for metric, help_text, values in (
+                ('samarth_span_errors_total', 'Spans that ended with an exception.', self._errors),
+                ('samarth_rows_scanned_total', 'Dataset rows examined by data-tool calls.', self._rows),
+                ('samarth_result_bytes_total', 'Bytes of JSON returned by data-tool calls.', self._bytes),
+            ):
+                lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} counter']
+                lines += [f'{metric}{{span="{name}"}} {values[name]}' for name in sorted(values) if values[name]]
+            return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+_export_dir = None
+_export_lock = threading.Lock()
+
+
+def enable_export(directory: str = TELEMETRY_DIR):
+    """Appends every finished trace to <directory>/traces.jsonl and rewrites <directory>/metrics.prom."""
+    global _export_dir
+    os.makedirs(directory, exist_ok=True)
+    _export_dir = directory
+
+
+def _export(root: Span):
+    if _export_dir is None:
+        return
+    with _export_lock:
+        with open(os.path.join(_export_dir, TRACE_FILE_NAME), 'a') as f:
+            for s in root.children:
+                f.write(json.dumps(s.to_dict(), default=str) + '\n')
+        metrics_path = os.path.join(_export_dir, METRICS_FILE_NAME)
+        with open(metrics_path + '.tmp', 'w') as f:
+            f.write(metrics.render())
+        os.replace(metrics_path + '.tmp', metrics_path)  # scrapers never see a half-written file
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Times a block as a child of the current span (or as a detached span outside any trace)."""
+    parent = _current_span.get()
+    s = Span(name, parent.trace_id if parent else None, parent.span_id if parent else None, attrs, parent._root if parent else None)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except asyncio.CancelledError:
+        s.set(cancelled=True)  # e.g. a losing speculative parse; not an error
+        raise
+    except BaseException as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        s.duration_s = time.perf_counter() - s._start
+        metrics.observe(s)
+        if s._root is not None:
+            s._root.children.append(s)
+
+
+@contextmanager
+def trace(name: str, **attrs):
+    """Root span of one query; its spans are exported when it ends."""
+    root = Span(name, uuid.uuid4().hex, None, attrs)
+    root._root = root
+    token = _current_span.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        root.duration_s = time.perf_counter() - root._start
+        metrics.observe(root)
+        root.children.append(root)
+        _export(root)
+
+
+def current_span():
+    return _current_span.get()
+
+
+def add_rows(count: int):
+    """Adds to rows_scanned on the current span (a no-op outside spans)."""
+    s = _current_span.get()
+    if s is not None:
+        s.add('rows_scanned', int(count))
+
+
+@contextmanager
+def profiled(enabled: bool = True, top: int = 25):
+    """Profiles the block with cProfile; the yielded dict gets the top functions by cumulative time as 'text'."""
+    report = {'text': ''}
+    if not enabled:
+        yield report
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield report
+    finally:
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(top)
+        report['text'] = out.getvalue()
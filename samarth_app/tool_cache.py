@@ -0,0 +1,120 @@
+import functools
+import os
+import threading
+from collections import Counter, OrderedDict
+
+from samarth_app.dataset_io import file_sha256
+from samarth_app.telemetry import span
+
+# --- Memoized Data-Tool Results ---
+# The data tools return JSON strings that depend only on their (canonicalized)
+# arguments and the loaded datasets. ToolCache keeps the most recent ones; a
+# DatasetWatcher tells the tools when the processed files on disk have changed
+# so the data can be reloaded and the cached strings dropped.
+MAX_ENTRIES = 1024
+
+
+class ToolCache:
+    """Bounded LRU of tool results keyed on (tool name, canonical arguments), with per-tool hit counters."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits, self.misses = Counter(), Counter()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits[key[0]] += 1
+                return self._entries[key]
+            self.misses[key[0]] += 1
+            return None
+
+    def put(self, key: tuple, value: str):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses = sum(self.hits.values()), sum(self.misses.values())
+            return {
+                'hits': hits, 'misses': misses, 'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+                'entries': len(self._entries),
+                'by_tool': {tool: {'hits': self.hits[tool], 'misses': self.misses[tool]} for tool in sorted(self.hits | self.misses)},
+            }
+
+
+class DatasetWatcher:
+    """Detects content changes in a set of files.
+
+    Each check stats the files (mtime, size); nothing is read up front. A file whose
+    stamp moved is hashed, and once a file has a known hash a rewrite with identical
+    bytes does not count as a change. Its first stamp change always does, since
+    there is no earlier content to compare with.
+    """
+
+    def __init__(self, paths: list[str]):
+        self.paths = list(paths)
+        self._stamps = [self._stamp(path) for path in self.paths]
+        self._hashes = [None] * len(self.paths)  # filled in as stamps change
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stamp(path: str):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def changed(self) -> bool:
+        """True once per content change since the previous check."""
+        with self._lock:
+            changed = False
+            for i, path in enumerate(self.paths):
+                stamp = self._stamp(path)
+                if stamp == self._stamps[i]:
+                    continue
+                self._stamps[i] = stamp
+                digest = file_sha256(path) if stamp is not None else None
+                changed |= digest is None or digest != self._hashes[i]
+                self._hashes[i] = digest
+            return changed
+
+
+def memoized(cache: ToolCache, canonicalize, before=None):
+    """Decorator: serves a tool from `cache`.
+
+    canonicalize(*args, **kwargs) returns (key, call_kwargs). The key identifies the
+    result, and on a miss the tool runs with call_kwargs, which are derived from the key
+    alone so equal keys always produce equal results. before() runs ahead of each
+    lookup, e.g. to reload changed datasets. Each call is a `tool:<name>` span carrying
+    cache_hit and result_bytes. The undecorated tool stays available as `.uncached`.
+    """
+    def decorate(tool):
+        @functools.wraps(tool)
+        def wrapper(*args, **kwargs):
+            with span(f'tool:{tool.__name__}') as s:
+                if before is not None:
+                    before()
+                key, call_kwargs = canonicalize(*args, **kwargs)
+                key = (tool.__name__, *key)
+                result = cache.get(key)
+                s.set(cache_hit=result is not None)
+                if result is None:
+                    result = tool(**call_kwargs)
+                    cache.put(key, result)
+                s.set(result_bytes=len(result))
+                return result
+        wrapper.uncached = tool
+        return wrapper
+    return decorate
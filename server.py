@@ -0,0 +1,138 @@
+"""Headless HTTP API: the four analyses and free-text questions, served over ASGI.
+
+uvicorn server:app --host 0.0.0.0 --port 8000
+python server.py --port 8000 --workers 4 --max-in-flight 64
+
+Endpoints (JSON in, JSON out):
+  POST /query                          {"question": ..., "combined": false, "fast_path": true, "debug": false}
+  POST /analyses/state_comparison      StateInput fields (see samarth_app/schemas.py)
+  POST /analyses/district_extrema      DistrictInput fields
+  POST /analyses/trend_analysis        TrendInput fields
+  POST /analyses/policy_advice         PolicyInput fields (calls Gemini for the synthesis)
+  GET  /health, /stats, /metrics       liveness, service and cache counters, Prometheus text
+
+Each answer is a record with query_type, args, report, timings, latency_s and
+coalesced (true if an identical in-flight request computed it). Requests over the
+in-flight limit get 503 with Retry-After, and requests over the timeout get 504.
+Run one process per host: its data-tool workers share the loaded datasets.
+"""
+import argparse
+import asyncio
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel
+
+from samarth_app.data_tools import tool_cache
+from samarth_app.fast_path import stats as fast_path_stats
+from samarth_app.llm_cache import get_llm_cache
+from samarth_app.pipeline import PipelineChains
+from samarth_app.schemas import DistrictInput, PolicyInput, QueryType, StateInput, TrendInput
+from samarth_app.service import LLM_CONCURRENCY, MAX_IN_FLIGHT, REQUEST_TIMEOUT_SECONDS, WORKERS, QueryService, ServiceBusy
+from samarth_app.telemetry import TELEMETRY_DIR, enable_export, metrics
+
+ANALYSIS_INPUTS = {
+    QueryType.STATE_COMPARISON: StateInput,
+    QueryType.DISTRICT_EXTREMA: DistrictInput,
+    QueryType.TREND_ANALYSIS: TrendInput,
+    QueryType.POLICY_ADVICE: PolicyInput,
+}
+RETRY_AFTER_SECONDS = 1
+
+
+class QuestionRequest(BaseModel):
+    question: str
+    combined: bool = False  # single-call routing + extraction
+    fast_path: bool = True
+    debug: bool = False  # include the query's spans in the answer
+
+
+def create_app(chains: PipelineChains = None, workers: int = WORKERS, llm_concurrency: int = LLM_CONCURRENCY,
+               max_in_flight: int = MAX_IN_FLIGHT, timeout: float = REQUEST_TIMEOUT_SECONDS,
+               initializer=None, initargs: tuple = ()) -> FastAPI:
+    """The ASGI app. Its QueryService (and worker pool) lives for the app's lifespan; see QueryService for the arguments."""
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        app.state.service = QueryService(chains, workers, llm_concurrency, max_in_flight, timeout, initializer, initargs)
+        await app.state.service.warm()
+        try:
+            yield
+        finally:
+            app.state.service.close()
+
+    app = FastAPI(title="Project Samarth", lifespan=lifespan)
+
+    async def answer(call, debug: bool = False) -> dict:
+        try:
+            record = await call
+        except ServiceBusy as e:
+            raise HTTPException(503, str(e), headers={'Retry-After': str(RETRY_AFTER_SECONDS)})
+        except asyncio.TimeoutError:
+            raise HTTPException(504, f"No answer within {app.state.service.timeout:g}s.")
+        except Exception as e:
+            raise HTTPException(500, f"{type(e).__name__}: {e}")
+        return record if debug else {key: value for key, value in record.items() if key != 'spans'}
+
+    @app.post('/query')
+    async def query(request: QuestionRequest) -> JSONResponse:
+        return JSONResponse(await answer(app.state.service.ask(request.question, request.combined, request.fast_path), request.debug))
+
+    def analysis_endpoint(query_type: QueryType, schema: type):
+        async def endpoint(args: schema) -> JSONResponse:
+            return JSONResponse(await answer(app.state.service.analyze(query_type, args)))
+        return endpoint
+
+    for query_type, schema in ANALYSIS_INPUTS.items():
+        app.post(f'/analyses/{query_type.value}', name=query_type.value)(analysis_endpoint(query_type, schema))
+
+    @app.get('/health')
+    async def health() -> dict:
+        return {'status': 'ok', 'in_flight': app.state.service.in_flight}
+
+    @app.get('/stats')
+    async def stats() -> dict:
+        # With workers, the tool cache here only sees the calls made in this process.
+        return {'service': app.state.service.stats(), 'fast_path': fast_path_stats.snapshot(),
+                'llm_cache': get_llm_cache().stats(), 'tool_cache': tool_cache.stats()}
+
+    @app.get('/metrics')
+    async def prometheus_metrics() -> PlainTextResponse:
+        lines = []
+        for name, value in app.state.service.stats().items():
+            kind = 'gauge' if name in ('in_flight', 'max_in_flight', 'workers') else 'counter'
+            metric = f'samarth_service_{name}' + ('_total' if kind == 'counter' else '')
+            lines += [f'# TYPE {metric} {kind}', f'{metric} {value}']
+        return PlainTextResponse(metrics.render() + '\n'.join(lines) + '\n')
+
+    return app
+
+
+load_dotenv()
+app = create_app()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=WORKERS, help="Processes for the data tools (0: threads in the API process).")
+    parser.add_argument('--llm-concurrency', type=int, default=LLM_CONCURRENCY, help="Requests in their LLM stages at once.")
+    parser.add_argument('--max-in-flight', type=int, default=MAX_IN_FLIGHT, help="Requests answered at once; more get 503.")
+    parser.add_argument('--timeout', type=float, default=REQUEST_TIMEOUT_SECONDS, help="Seconds before a request gets 504.")
+    parser.add_argument('--telemetry', nargs='?', const=TELEMETRY_DIR, metavar='DIR',
+                        help=f"Export span traces (JSONL) and Prometheus metrics to DIR (default {TELEMETRY_DIR}).")
+    cli_args = parser.parse_args()
+
+    import uvicorn
+
+    if cli_args.telemetry:
+        enable_export(cli_args.telemetry)
+    uvicorn.run(create_app(None, cli_args.workers, cli_args.llm_concurrency, cli_args.max_in_flight, cli_args.timeout),
+                host=cli_args.host, port=cli_args.port)
+
+
+if __name__ == "__main__":
+    main()
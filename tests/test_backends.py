@@ -0,0 +1,86 @@
+import pandas as pd
+import pytest
+
+from benchmarks.bench_backends import batch_cases, equivalence_cases
+from benchmarks.synthetic import make_crop_df, make_rain_df
+from samarth_app import data_tools
+from samarth_app.aggregates import AggregateCube
+from samarth_app.backends import DuckDBBackend, PandasBackend, write_parquet_dataset
+from samarth_app.crop_store import CropStore
+
+TOOLS = ['state_comparison', 'district_extrema', 'trend_analysis', 'policy_analysis', 'batch']
+
+
+@pytest.fixture(scope='module')
+def outputs(tmp_path_factory):
+    """name -> {backend: tool output} for the benchmark's equivalence grid and batch calls, over synthetic rows."""
+    pytest.importorskip('duckdb')
+    saved = data_tools.datasets
+    rain_df = make_rain_df(districts_per_state=5)
+    crop_df = make_crop_df(20_000, rain_df)
+    parquet_dir = str(tmp_path_factory.mktemp('parquet'))
+    write_parquet_dataset(crop_df, rain_df, parquet_dir)
+    data_tools.set_datasets(crop_df, rain_df)
+    cases = {**equivalence_cases(), **{name: lambda call=call: call(0) for name, call in batch_cases().items()}}
+    results = {name: {} for name in cases}
+    try:
+        for backend_name, backend in {'pandas': data_tools.backend, 'duckdb': DuckDBBackend(parquet_dir)}.items():
+            data_tools.set_backend(backend)
+            for name, call in cases.items():
+                results[name][backend_name] = call()
+    finally:
+        data_tools.swap_datasets(saved)
+    return results
+
+
+def same(a, b) -> bool:
+    return a.equals(b) if isinstance(a, pd.DataFrame) else a == b
+
+
+@pytest.mark.parametrize('tool', TOOLS)
+def test_backends_agree(outputs, tool):
+    cases = {name: result for name, result in outputs.items() if name.startswith(tool)}
+    assert cases
+    differing = [name for name, result in cases.items() if not same(result['pandas'], result['duckdb'])]
+    assert not differing, f"{len(differing)}/{len(cases)} outputs differ, e.g. {differing[0]}"
+
+
+def test_count_rows(tmp_path):
+    pytest.importorskip('duckdb')
+    rain_df = make_rain_df(districts_per_state=2)
+    crop_df = make_crop_df(2_000, rain_df)
+    write_parquet_dataset(crop_df, rain_df, str(tmp_path))
+    backends = [PandasBackend(CropStore(crop_df), AggregateCube.from_frames(crop_df, rain_df)), DuckDBBackend(str(tmp_path))]
+    first = crop_df.iloc[0]
+    for state, year, crop in [(first['State_Name'], first['Crop_Year'], first['Crop']), ('KERALA', 2005, 'RICE'),
+                              ('KERALA', 2005, 'QUINOA'), ('ATLANTIS', 2005, 'RICE')]:
+        expected = int(((crop_df['State_Name'] == state) & (crop_df['Crop_Year'] == year) & (crop_df['Crop'] == crop)).sum())
+        assert [backend.count_rows(state, int(year), crop) for backend in backends] == [expected, expected]
+
+
+def test_datasets_swap_as_one_object():
+    rain_df = make_rain_df(districts_per_state=2)
+    saved = data_tools.datasets
+    try:
+        data_tools.set_datasets(make_crop_df(2_000, rain_df), rain_df)
+        swapped = data_tools.datasets
+        assert swapped is not saved
+        assert swapped.backend.crop_store is swapped.crop_store and swapped.crop_store.frame is swapped.crop_df
+        assert all(getattr(data_tools, name) is getattr(swapped, name) for name in ('crop_df', 'rain_df', 'backend', 'entity_index'))
+        duckdb_like = object()
+        data_tools.set_backend(duckdb_like)
+        assert data_tools.datasets.backend is duckdb_like and data_tools.datasets.crop_df is swapped.crop_df
+    finally:
+        assert data_tools.swap_datasets(saved).backend is duckdb_like
+    assert data_tools.datasets is saved
+
+
+def test_only_one_thread_reloads(monkeypatch):
+    def reload():
+        raise AssertionError("reloaded while another reload was running")
+    monkeypatch.setattr(data_tools._watcher, 'changed', lambda: True)
+    monkeypatch.setattr(data_tools, 'load_datasets', reload)
+    with data_tools._reload_lock:  # another thread is reloading
+        data_tools._reload_if_changed()  # answers from the current datasets instead of waiting
+    with pytest.raises(AssertionError):
+        data_tools._reload_if_changed()
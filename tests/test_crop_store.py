@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_crop_df, make_rain_df
+from samarth_app.crop_store import CropStore
+from samarth_app.shared_data import compact_frame
+
+
+@pytest.fixture(scope='module', params=['object', 'compact'])
+def crop_df(request):
+    """Synthetic crop rows, as cleaned (object strings) and as compacted for the tools (categoricals)."""
+    df = make_crop_df(20_000, make_rain_df(districts_per_state=3))
+    return df if request.param == 'object' else compact_frame(df)
+
+
+def mask(crop_df, state, start_year, end_year, crops=None, season=None):
+    """The boolean-mask filter the store replaces."""
+    selected = (crop_df['State_Name'] == state) & crop_df['Crop_Year'].between(start_year, end_year)
+    if crops is not None:
+        selected &= crop_df['Crop'].isin(crops)
+    if season is not None:
+        selected &= crop_df['Season'] == season
+    return crop_df[selected]
+
+
+CASES = [
+    ('KERALA', 2005, 2005, None),
+    ('KERALA', 2005, 2005, ['RICE']),
+    ('KERALA', 2005, 2005, ['RICE', 'WHEAT', 'JOWAR']),
+    ('MAHARASHTRA', 1997, 2015, None),
+    ('MAHARASHTRA', 2005, 2014, ['GRAM', 'MOONG(GREEN GRAM)', 'URAD']),
+    ('PUNJAB', 2011, 2015, ['BAJRA', 'SUGARCANE']),
+    ('PUNJAB', 2010, 2010, ['RICE', 'QUINOA']),  # one unknown crop
+    ('PUNJAB', 2010, 2010, ['QUINOA']),  # only unknown crops
+    ('PUNJAB', 2010, 2010, []),
+    ('ATLANTIS', 2010, 2010, None),  # unknown state
+    ('KERALA', 1980, 1990, None),  # years before the data
+    ('KERALA', 2030, 2040, ['RICE']),  # years after it
+    ('KERALA', 2010, 2005, None),  # empty range
+]
+
+
+@pytest.mark.parametrize('state, start_year, end_year, crops', CASES)
+def test_rows_match_the_mask(crop_df, state, start_year, end_year, crops):
+    expected = mask(crop_df, state, start_year, end_year, crops)
+    pd.testing.assert_frame_equal(CropStore(crop_df).rows(state, start_year, end_year, crops=crops), expected)
+
+
+def test_rows_then_season_filter_match_the_mask(crop_df):
+    store = CropStore(crop_df)
+    for season in ['KHARIF', 'RABI', 'WHOLE YEAR']:
+        rows = store.rows('MAHARASHTRA', 2000, 2010, crops=['RICE', 'JOWAR', 'GRAM'])
+        pd.testing.assert_frame_equal(rows[rows['Season'] == season], mask(crop_df, 'MAHARASHTRA', 2000, 2010, ['RICE', 'JOWAR', 'GRAM'], season))
+
+
+def test_single_year_default(crop_df):
+    pd.testing.assert_frame_equal(CropStore(crop_df).rows('KERALA', 2008), mask(crop_df, 'KERALA', 2008, 2008))
+
+
+@pytest.mark.parametrize('state, year, crop', [('KERALA', 2005, 'RICE'), ('MAHARASHTRA', 2014, 'JOWAR'),
+                                               ('KERALA', 2005, 'QUINOA'), ('ATLANTIS', 2005, 'RICE'), ('KERALA', 1980, 'RICE')])
+def test_count_matches_the_mask(crop_df, state, year, crop):
+    assert CropStore(crop_df).count(state, year, crop) == len(mask(crop_df, state, year, year, [crop]))
+
+
+def test_latest_year_and_empty_store(crop_df):
+    assert CropStore(crop_df).latest_year() == crop_df['Crop_Year'].max()
+    empty = CropStore(crop_df.iloc[:0])
+    assert empty.empty and empty.latest_year() is None
+    assert empty.rows('KERALA', 2005).empty and empty.count('KERALA', 2005, 'RICE') == 0
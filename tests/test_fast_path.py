@@ -0,0 +1,36 @@
+import pytest
+
+from benchmarks.synthetic import make_crop_df, make_rain_df
+from samarth_app.fast_path import FastPathRouter, Gazetteer
+from samarth_app.schemas import QueryType
+
+
+@pytest.fixture(scope='module')
+def router():
+    rain_df = make_rain_df(districts_per_state=3)
+    return FastPathRouter(Gazetteer(make_crop_df(5_000, rain_df), rain_df))
+
+
+def test_state_comparison(router):
+    query_type, args = router.parse("Compare the rainfall and the top 3 cereals in Punjab and Kerala for 2010.")
+    assert query_type == QueryType.STATE_COMPARISON
+    assert (args.states, args.year, args.top_n, args.crop_type) == (['Punjab', 'Kerala'], 2010, 3, 'Cereals')
+
+
+def test_policy_advice(router):
+    query_type, args = router.parse("What are the arguments to promote Rice over Wheat in Punjab based on the last 5 years?")
+    assert query_type == QueryType.POLICY_ADVICE
+    assert (args.region, args.crop_a, args.crop_b, args.years) == ('Punjab', 'Rice', 'Wheat', 5)
+
+
+@pytest.mark.parametrize('question', [
+    "Compare the rainfall and the top 3 cereals excluding Punjab for 2010.",
+    "Compare the rainfall and the top 3 cereals in all states except Punjab for 2010.",
+    "Compare the rainfall and the top 3 cereals in states other than Kerala for 2010.",
+    "Compare the top 3 cereals in Punjab but not Kerala for 2010.",
+    "Compare the top 3 cereals in Punjab and Kerala for 2010, but don't include rice.",
+    "What are the arguments against promoting Rice over Wheat in Punjab based on the last 5 years?",
+    "What are the arguments to promote Rice over Wheat in Punjab without irrigation, based on the last 5 years?",
+])
+def test_negations_and_exclusions_go_to_the_llm(router, question):
+    assert router.parse(question) is None
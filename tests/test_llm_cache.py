@@ -0,0 +1,116 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.prompts import ChatPromptTemplate
+
+from samarth_app import llm_cache
+from samarth_app.fake_llm import FakeChatModel, question_of
+from samarth_app.llm_cache import LLMCache, normalize_query
+from samarth_app.schemas import QueryType, RouteQuery
+
+PROMPT = ChatPromptTemplate.from_messages([('system', 'Route the question.'), ('human', '{query}')])
+GEMINI = SimpleNamespace(model='gemini-test', temperature=0)
+
+
+@pytest.fixture
+def cache():
+    return LLMCache(':memory:')
+
+
+def route(answers: dict):
+    """A router chain on a stub model answering from `answers` (question -> query type, or None)."""
+    llm = FakeChatModel(responder=lambda schema, messages: answers[question_of(messages)])
+    return llm, PROMPT | llm.with_structured_output(RouteQuery)
+
+
+def test_normalize_query():
+    assert normalize_query("  Compare Punjab   and KERALA?! ") == normalize_query("compare punjab and kerala") == 'compare punjab and kerala'
+    assert normalize_query("Compare Kerala and Punjab") != normalize_query("Compare Punjab and Kerala")
+
+
+def test_hits_share_normalized_questions(cache):
+    llm, chain = route({'Tell me a joke.': RouteQuery(query_type=QueryType.UNKNOWN)})
+    cached = cache.wrap('router', PROMPT, GEMINI, chain, RouteQuery)
+    assert cached.invoke({'query': 'Tell me a joke.'}).query_type == QueryType.UNKNOWN
+    assert cached.invoke({'query': '  tell me a JOKE '}) == RouteQuery(query_type=QueryType.UNKNOWN)
+    assert llm.calls['RouteQuery'] == 1
+    assert cache.stats()['by_chain'] == {'router': {'hits': 1, 'misses': 1}}
+
+
+def test_ttl_expiry(cache, monkeypatch):
+    clock = [1_000.0]
+    monkeypatch.setattr(llm_cache.time, 'time', lambda: clock[0])
+    cache.ttl_seconds = 60
+    cache.put('k', 'router', 'h', '"v"')
+    clock[0] += 59
+    assert cache.get('k') == '"v"'
+    clock[0] += 2
+    assert cache.get('k') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_lru_eviction_by_entries_and_bytes(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(llm_cache.time, 'time', lambda: clock[0])
+    cache = LLMCache(':memory:', max_entries=2)
+    for key in 'ab':
+        clock[0] += 1
+        cache.put(key, 'router', 'h', '"x"')
+    clock[0] += 1
+    cache.get('a')  # b is now the least recently used
+    clock[0] += 1
+    cache.put('c', 'router', 'h', '"x"')
+    assert [cache.get(key) is not None for key in 'abc'] == [True, False, True]
+
+    cache = LLMCache(':memory:', max_bytes=10)
+    for key in 'abc':
+        clock[0] += 1
+        cache.put(key, 'router', 'h', '"four"')  # 6 bytes each
+    assert [cache.get(key) is not None for key in 'abc'] == [False, False, True]
+
+
+def test_prompt_and_model_changes_invalidate(cache):
+    answers = {'Tell me a joke.': RouteQuery(query_type=QueryType.UNKNOWN)}
+    llm, chain = route(answers)
+    cache.wrap('router', PROMPT, GEMINI, chain, RouteQuery).invoke({'query': 'Tell me a joke.'})
+
+    other_model = cache.wrap('router', PROMPT, SimpleNamespace(model='gemini-other', temperature=0), chain, RouteQuery)
+    other_model.invoke({'query': 'Tell me a joke.'})
+    assert llm.calls['RouteQuery'] == 2  # a different model is a different key
+    assert cache.stats()['entries'] == 2
+
+    edited = ChatPromptTemplate.from_messages([('system', 'Route the question carefully.'), ('human', '{query}')])
+    cache.wrap('router', edited, GEMINI, edited | llm.with_structured_output(RouteQuery), RouteQuery).invoke({'query': 'Tell me a joke.'})
+    assert llm.calls['RouteQuery'] == 3
+    assert cache.stats()['entries'] == 1  # the old prompt's rows were dropped
+
+
+def test_none_answers_are_not_stored(cache):
+    llm, chain = route({'Hmm': None})
+    cached = cache.wrap('router', PROMPT, GEMINI, chain, RouteQuery)
+    assert cached.invoke({'query': 'Hmm'}) is None
+    assert cached.invoke({'query': 'Hmm'}) is None
+    assert llm.calls['RouteQuery'] == 2
+    assert cache.stats()['entries'] == 0
+
+
+def test_undecodable_rows_are_replaced(cache):
+    llm, chain = route({'Tell me a joke.': RouteQuery(query_type=QueryType.UNKNOWN)})
+    cached = cache.wrap('router', PROMPT, GEMINI, chain, RouteQuery)
+    key = cache.key('router', {'query': 'Tell me a joke.'}, GEMINI.model, llm_cache.prompt_hash(PROMPT, RouteQuery), GEMINI.temperature)
+    cache.put(key, 'router', llm_cache.prompt_hash(PROMPT, RouteQuery), '{"query_type": "no_such_type"}')
+
+    assert cached.invoke({'query': 'Tell me a joke.'}).query_type == QueryType.UNKNOWN
+    assert llm.calls['RouteQuery'] == 1
+    assert cache.stats()['by_chain'] == {'router': {'hits': 0, 'misses': 1}}
+    assert cached.invoke({'query': 'Tell me a joke.'}).query_type == QueryType.UNKNOWN
+    assert llm.calls['RouteQuery'] == 1  # the good answer replaced the bad row
+
+
+def test_async_path_shares_the_cache(cache):
+    llm, chain = route({'Tell me a joke.': RouteQuery(query_type=QueryType.UNKNOWN)})
+    cached = cache.wrap('router', PROMPT, GEMINI, chain, RouteQuery)
+    asyncio.run(cached.ainvoke({'query': 'Tell me a joke.'}))
+    assert cached.invoke({'query': 'tell me a joke'}).query_type == QueryType.UNKNOWN
+    assert llm.calls['RouteQuery'] == 1
@@ -0,0 +1,108 @@
+import asyncio
+
+import httpx
+import pytest
+
+import server
+from samarth_app.fake_llm import FakeChatModel, question_of
+from samarth_app.pipeline import PipelineChains
+from samarth_app.schemas import QueryType, RouteQuery
+from samarth_app.service import QueryService, ServiceBusy
+
+
+def unknown_router(failing: tuple = ()) -> FakeChatModel:
+    """A stub that routes every question to unknown, so answers need no data; questions in `failing` raise."""
+    def respond(schema, messages):
+        if question_of(messages) in failing:
+            raise RuntimeError("the router failed")
+        return RouteQuery(query_type=QueryType.UNKNOWN)
+    return FakeChatModel(responder=respond, structured_latency=0.05)
+
+
+def serve(llm: FakeChatModel, **limits) -> QueryService:
+    return QueryService(PipelineChains(llm), workers=0, **limits)
+
+
+async def ask_all(service: QueryService, questions: list[str]) -> list:
+    return await asyncio.gather(*(service.ask(q, fast_path=False) for q in questions), return_exceptions=True)
+
+
+def test_identical_questions_share_one_answer():
+    llm = unknown_router()
+
+    async def run():
+        service = serve(llm)
+        return service, await ask_all(service, ["Which crop grows best?"] * 5 + ["which crop grows best"])
+
+    service, records = asyncio.run(run())
+    assert [r['query_type'] for r in records] == ['unknown'] * 6
+    assert sorted(r['coalesced'] for r in records) == [False] + [True] * 5
+    assert llm.calls['RouteQuery'] == 1
+    stats = service.stats()
+    assert (stats['computed'], stats['coalesced'], stats['served'], stats['in_flight']) == (1, 5, 1, 0)
+
+
+def test_requests_beyond_max_in_flight_are_rejected():
+    async def run():
+        service = serve(unknown_router(), max_in_flight=2)
+        return service, await ask_all(service, ["first", "second", "third", "first"])
+
+    service, records = asyncio.run(run())
+    assert isinstance(records[2], ServiceBusy)
+    assert records[3]['coalesced']  # joining a running answer needs no admission
+    stats = service.stats()
+    assert (stats['served'], stats['rejected'], stats['in_flight']) == (2, 1, 0)
+
+
+def test_slow_answers_time_out_and_release_their_admission():
+    llm = unknown_router()
+    llm.structured_latency = 1.0
+
+    async def run():
+        service = serve(llm, max_in_flight=1, timeout=0.05)
+        first = await ask_all(service, ["slow"])
+        llm.structured_latency = 0.0
+        return service, first + await ask_all(service, ["fast"])
+
+    service, records = asyncio.run(run())
+    assert isinstance(records[0], asyncio.TimeoutError)
+    assert records[1]['query_type'] == 'unknown'
+    stats = service.stats()
+    assert (stats['failed'], stats['served'], stats['rejected'], stats['in_flight']) == (1, 1, 0, 0)
+
+
+def test_in_flight_counts_running_answers_until_they_finish():
+    async def run():
+        service = serve(unknown_router(failing=("broken",)))
+        tasks = [asyncio.ensure_future(service.ask(q, fast_path=False)) for q in ("one", "two", "two", "broken")]
+        await asyncio.sleep(0.01)
+        running = service.in_flight
+        records = await asyncio.gather(*tasks, return_exceptions=True)
+        return service, running, records
+
+    service, running, records = asyncio.run(run())
+    assert running == 3
+    assert isinstance(records[3], RuntimeError)
+    stats = service.stats()
+    assert (stats['in_flight'], stats['served'], stats['failed'], stats['computed']) == (0, 2, 1, 3)
+
+
+@pytest.mark.parametrize('limits, status', [({'max_in_flight': 1}, 503), ({'timeout': 0.05}, 504)])
+def test_http_status_for_busy_and_slow_answers(limits, status):
+    llm = unknown_router()
+    llm.structured_latency = 0.5
+    app = server.create_app(PipelineChains(llm), workers=0, **limits)
+
+    async def run():
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://samarth') as client:
+                responses = await asyncio.gather(*(client.post('/query', json={'question': q, 'fast_path': False})
+                                                   for q in ("first", "second")))
+                return responses, (await client.get('/health')).json()
+
+    responses, health = asyncio.run(run())
+    failed = [r for r in responses if r.status_code == status]
+    assert failed and 'detail' in failed[0].json()
+    if status == 503:
+        assert failed[0].headers['retry-after']
+    assert health['in_flight'] == 0
@@ -0,0 +1,27 @@
+import os
+
+from samarth_app.tool_cache import DatasetWatcher
+
+
+def touch(path, content: bytes, mtime_ns: int):
+    path.write_bytes(content)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_dataset_watcher(tmp_path):
+    data = tmp_path / 'rain.csv'
+    touch(data, b'a,b\n1,2\n', 1_000_000_000)
+    watcher = DatasetWatcher([str(data), str(tmp_path / 'missing.arrow')])
+    assert not watcher.changed()
+
+    touch(data, b'a,b\n1,3\n', 2_000_000_000)
+    assert watcher.changed()
+    assert not watcher.changed()  # reported once
+
+    touch(data, b'a,b\n1,3\n', 3_000_000_000)
+    assert not watcher.changed()  # same bytes, new mtime
+
+    data.unlink()
+    assert watcher.changed()
+    (tmp_path / 'missing.arrow').write_bytes(b'x')
+    assert watcher.changed()